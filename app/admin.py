@@ -3,6 +3,7 @@ from django.contrib import admin
 # Register your models here.
 from app.models import *
 
+admin.site.register(Region)
 admin.site.register(Covid19Data)
 admin.site.register(TimeSeriesData)
 admin.site.register(FileUpload)
\ No newline at end of file
@@ -0,0 +1,175 @@
+from datetime import timedelta
+import math
+import numpy as np
+from django.db.models import Sum
+from .cache import TIME_SERIES_DATA
+from .columnar import get_store
+from .models import TimeSeriesData
+from .rollups import METRICS
+
+# Days of the rolling windows unless the request sets one
+DEFAULT_WINDOW = 7
+MAX_WINDOW = 365
+
+# Per-capita rates are given per this many people
+PER_CAPITA = 100000
+
+# Decimals kept of the derived float values; more is noise on a chart
+DECIMALS = 3
+
+
+def get_series(country=None, province=None, start_date=None, end_date=None):
+    """
+    Returns the daily cumulative totals of a province, a country or the world.
+
+    A country's totals are summed from the columnar store when it is current, and
+    with a GROUP BY date query otherwise. Days without rows inside the span of the
+    series carry the previous totals forward, so the series has one value per day.
+
+    Args:
+        country (str, optional): The country_region; the world without one.
+        province (str, optional): The province_state within the country.
+        start_date (date, optional): The first day, with end_date.
+        end_date (date, optional): The last day.
+
+    Returns:
+        tuple: The consecutive datetime64[D] days, and a dict of float64 arrays by metric.
+    """
+    store = get_store(TIME_SERIES_DATA) if province is None else None
+    if store is not None:
+        days, series = store.country_series(country, start_date, end_date)
+    else:
+        data = TimeSeriesData.objects.order_by()
+        if country is not None:
+            data = data.filter(region__country_region=country)
+        if province is not None:
+            data = data.filter(region__province_state=province)
+        if start_date is not None:
+            data = data.filter(date__range=(start_date, end_date))
+        rows = list(data.values('date').annotate(**{metric: Sum(metric) for metric in METRICS})
+                    .order_by('date').values_list('date', *METRICS))
+        days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        series = {metric: np.fromiter((row[position] or 0 for row in rows), np.int64, len(rows))
+                  for position, metric in enumerate(METRICS, 1)}
+    if not len(days):
+        return days, {metric: np.zeros(0) for metric in METRICS}
+
+    offsets = (days - days[0]).astype(np.int64)
+    latest = np.full(offsets[-1] + 1, -1)
+    latest[offsets] = np.arange(len(offsets))
+    latest = np.maximum.accumulate(latest)  # The last day with rows, at or before each day
+    return days[0] + np.arange(len(latest)), {metric: series[metric][latest].astype(np.float64) for metric in METRICS}
+
+
+def derive_metrics(cumulative, window=DEFAULT_WINDOW, population=None):
+    """
+    Returns the metrics derived from a daily cumulative series, as arrays of the same length.
+
+    Values that need days before the start of the series are NaN.
+
+    Args:
+        cumulative (ndarray): The cumulative counts, one per consecutive day.
+        window (int): The days of the rolling mean and of the growth estimate.
+        population (int, optional): The population, for per-capita rates.
+
+    Returns:
+        dict: Arrays by key template, to format with the metric: {metric} (cumulative),
+            new_{metric} (daily delta), new_{metric}_avg (rolling mean of the deltas),
+            {metric}_growth_rate (mean daily exponential growth over the window),
+            {metric}_doubling_days (days to double at that growth, NaN unless growing),
+            and with a population {metric}_per_100k and new_{metric}_avg_per_100k.
+    """
+    lagged = np.full_like(cumulative, np.nan)
+    lagged[window:] = cumulative[:-window]
+    new_avg = (cumulative - lagged) / window  # The mean of the last window deltas, telescoped
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(lagged > 0, np.log(cumulative / lagged) / window, np.nan)
+        doubling = np.where(growth > 0, math.log(2) / growth, np.nan)
+    derived = {
+        '{metric}': cumulative,
+        'new_{metric}': np.diff(cumulative, prepend=np.nan),
+        'new_{metric}_avg': new_avg,
+        '{metric}_growth_rate': growth,
+        '{metric}_doubling_days': doubling,
+    }
+    if population:
+        derived['{metric}_per_100k'] = cumulative * PER_CAPITA / population
+        derived['new_{metric}_avg_per_100k'] = new_avg * PER_CAPITA / population
+    return derived
+
+
+def get_buckets(length, points):
+    """
+    Returns the start offsets of the consecutive buckets that downsample a series to at most points values.
+
+    Buckets are aligned on the end of the series, so the last bucket ends on the last day.
+    """
+    size = max(-(-length // points), 1) if points else 1
+    return np.arange(length - 1, -1, -size)[::-1] - size + 1, size
+
+
+def downsample(values, starts, size, summed=False):
+    """
+    Returns one value per bucket: the sum of its values when summed, else its last value.
+
+    Sums are NaN when a day of the bucket is unknown.
+    """
+    if size == 1:
+        return values
+    if summed:
+        return np.add.reduceat(values, np.maximum(starts, 0))
+    return values[starts + size - 1]
+
+
+def to_list(values, decimals=None):
+    """
+    Returns the values of an array as a JSON-ready list, with NaN as None: integers
+    without decimals, and floats rounded to them otherwise.
+    """
+    if decimals is None:
+        return [None if value != value else int(value) for value in values.tolist()]
+    return [None if value != value else value for value in np.round(values, decimals).tolist()]
+
+
+def analytics(country=None, province=None, start_date=None, end_date=None, metrics=METRICS,
+              window=DEFAULT_WINDOW, population=None, points=None):
+    """
+    Computes the daily deltas, rolling means, growth rates, doubling times and per-capita
+    rates of a region's time series, vectorized over the whole series with NumPy.
+
+    The series is read from window days before start_date, so the derived values of
+    the first requested days are known. With points, the days are grouped into
+    equal buckets ending on the last day: daily deltas are summed per bucket, and
+    the other values are taken on the bucket's last day.
+
+    Args:
+        country (str, optional): The country_region; the world without one.
+        province (str, optional): The province_state within the country.
+        start_date (date, optional): The first day returned, with end_date.
+        end_date (date, optional): The last day returned.
+        metrics (tuple): The metrics to derive values of, among rollups.METRICS.
+        window (int): The days of the rolling windows.
+        population (int, optional): The population, for per-capita rates.
+        points (int, optional): The most values returned per series.
+
+    Returns:
+        dict: The parameters, 'dates' (the last day of every bucket) and one list per
+            <metric>, new_<metric>, new_<metric>_avg, <metric>_growth_rate,
+            <metric>_doubling_days and, with a population, <metric>_per_100k and
+            new_<metric>_avg_per_100k, aligned with 'dates'.
+    """
+    read_from = start_date - timedelta(days=window) if start_date is not None else None
+    days, series = get_series(country, province, read_from, end_date)
+    first = np.searchsorted(days, np.datetime64(start_date, 'D')) if start_date is not None else 0
+    days = days[first:]
+    starts, size = get_buckets(len(days), points)
+    result = {
+        'country': country, 'province': province, 'window': window, 'population': population, 'bucket_days': size,
+        'dates': [day.isoformat() for day in days[starts + size - 1].astype(object)] if len(days) else [],
+    }
+    for metric in metrics:
+        for template, values in derive_metrics(series[metric], window, population).items():
+            counts = template in ('{metric}', 'new_{metric}')
+            values = downsample(values[first:], starts, size, summed=template == 'new_{metric}')
+            result[template.format(metric=metric)] = to_list(values, None if counts else DECIMALS)
+    return result
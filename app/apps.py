@@ -1,7 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
 
+    def ready(self):
+        """
+        Connects the signal handlers that invalidate cached responses and configure database connections,
+        and with FILE_JOBS_RESUME_ON_START, starts the in-process job runner on the files left queued.
+        """
+        from . import db, signals  # noqa: F401
+        if getattr(settings, 'FILE_JOBS_RESUME_ON_START', False):
+            from .jobs import resume_jobs
+            resume_jobs()
+
@@ -0,0 +1,224 @@
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .models import DataVersion
+
+# Dataset names used as DataVersion.name
+COVID19_DATA = 'covid19data'
+TIME_SERIES_DATA = 'timeseriesdata'
+
+
+def bump_data_version(name):
+    """
+    Mark a dataset as changed, invalidating every cached response built from it.
+
+    The version lives in the database, so the bump commits together with the
+    data and is seen by every process.
+
+    Args:
+        name (str): The dataset name.
+    """
+    updated = DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        DataVersion.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+def get_data_version(name):
+    """
+    Returns the current version token and last modification time of a dataset.
+
+    Args:
+        name (str): The dataset name.
+
+    Returns:
+        tuple: (token, updated_at); updated_at is None for a dataset that never changed.
+    """
+    return get_version_token(DataVersion.objects.filter(name=name).values_list('version', 'updated_at').first())
+
+
+async def aget_data_version(name):
+    """
+    The async counterpart of get_data_version.
+    """
+    return get_version_token(await DataVersion.objects.filter(name=name).values_list('version', 'updated_at').afirst())
+
+
+def get_version_token(row):
+    """
+    Returns the (token, updated_at) of a (version, updated_at) DataVersion row, or of no row.
+    """
+    if row is None:
+        return '0', None
+    version, updated_at = row
+    # The timestamp keeps tokens unique even if a rolled back bump reuses a version number
+    return f'{version}.{updated_at.timestamp()}', updated_at
+
+
+def get_response_cache_key(request, name, token):
+    """
+    Returns the cache key of a response, built from the path and the sorted query params.
+    """
+    params = '&'.join(f'{key}={value}' for key, value in sorted(request.GET.items()))
+    digest = hashlib.md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return f'response:{name}:{token}:{digest}'
+
+
+def get_validators(request, name, token, updated_at):
+    """
+    Returns the cache key, ETag and Last-Modified timestamp of a response for a dataset version.
+    """
+    key = get_response_cache_key(request, name, token)
+    etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+    return key, etag, int(updated_at.timestamp()) if updated_at else None
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Add the validators and the revalidation policy to a response, and return it.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)  # Browsers may keep it but must revalidate
+    return response
+
+
+def get_cached_response(request, name, build_response, cache_entry, from_cache_entry):
+    """
+    Serve a GET request from the cache, revalidating with ETag and Last-Modified.
+
+    Args:
+        request (HttpRequest): The request.
+        name (str): The dataset the response is built from.
+        build_response (callable): Builds the response when it is not cached.
+        cache_entry (callable): Returns the cacheable part of a built response.
+        from_cache_entry (callable): Rebuilds a response from a cache entry.
+
+    Returns:
+        HttpResponse: A 304 response, the cached response, or a freshly built one.
+    """
+    key, etag, last_modified = get_validators(request, name, *get_data_version(name))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        entry = cache.get(key)
+        if entry is None:
+            response = build_response()
+            if response.status_code != 200:
+                return response
+            if response.streaming:
+                response.streaming_content = cache_stream(key, response.streaming_content, response['Content-Type'])
+            else:
+                cache.set(key, cache_entry(response))
+        else:
+            response = from_cache_entry(entry)
+    return set_validators(response, etag, last_modified)
+
+
+async def aget_cached_response(request, name, build_response, cache_entry, from_cache_entry):
+    """
+    The async counterpart of get_cached_response, for async views: build_response is
+    awaited, and the version lookup and cache reads and writes do not block the event loop.
+    """
+    key, etag, last_modified = get_validators(request, name, *await aget_data_version(name))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        entry = await cache.aget(key)
+        if entry is None:
+            response = await build_response()
+            if response.status_code != 200:
+                return response
+            if response.streaming and response.is_async:
+                response.streaming_content = acache_stream(key, response.streaming_content, response['Content-Type'])
+            elif response.streaming:
+                response.streaming_content = cache_stream(key, response.streaming_content, response['Content-Type'])
+            else:
+                await cache.aset(key, cache_entry(response))
+        else:
+            response = from_cache_entry(entry)
+    return set_validators(response, etag, last_modified)
+
+
+def cache_stream(key, streaming_content, content_type):
+    """
+    Yields the chunks of a streaming response and caches its content once fully sent.
+
+    The entry has the same (content, content type) form as cache_data_response entries.
+    """
+    chunks = []
+    for chunk in streaming_content:
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, (b''.join(chunks), content_type))
+
+
+async def acache_stream(key, streaming_content, content_type):
+    """
+    The async counterpart of cache_stream, for responses streamed from an async iterator.
+    """
+    chunks = []
+    async for chunk in streaming_content:
+        chunks.append(chunk)
+        yield chunk
+    await cache.aset(key, (b''.join(chunks), content_type))
+
+
+def cache_data_response(name):
+    """
+    Decorator caching the GET responses of a function view that reads a dataset.
+
+    Async views get an async wrapper, so Django keeps calling them on the event loop.
+
+    Args:
+        name (str): The dataset the view reads.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view_func(request, *args, **kwargs)
+                return await aget_cached_response(
+                    request, name,
+                    lambda: view_func(request, *args, **kwargs),
+                    lambda response: (response.content, response['Content-Type']),
+                    lambda entry: HttpResponse(entry[0], content_type=entry[1]),
+                )
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            return get_cached_response(
+                request, name,
+                lambda: view_func(request, *args, **kwargs),
+                lambda response: (response.content, response['Content-Type']),
+                lambda entry: HttpResponse(entry[0], content_type=entry[1]),
+            )
+        return wrapper
+    return decorator
+
+
+class CachedListMixin:
+    """
+    ViewSet mixin caching the list responses, keyed by the dataset version and the query params.
+    """
+    data_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns the cached list response, building it on a miss.
+        """
+        return get_cached_response(
+            request, self.data_version_name,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs),
+            lambda response: response.data,
+            lambda entry: Response(entry),
+        )
@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+import threading
+import time
+from itertools import islice
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from .cache import COVID19_DATA, TIME_SERIES_DATA, get_data_version
+from .models import Covid19Data, Region, TimeSeriesData
+from .rollups import METRICS, PERIOD_KEYS
+
+# Model and date field of each dataset the store can hold
+STORE_MODELS = {
+    COVID19_DATA: (Covid19Data, 'observation_date'),
+    TIME_SERIES_DATA: (TimeSeriesData, 'date'),
+}
+
+# Rows read from the database at a time while building
+BUILD_CHUNK_ROWS = 100000
+
+# Stores opened by this process, by dataset name
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store_root():
+    """
+    Returns the directory of the columnar store, or None when the store is disabled.
+    """
+    return getattr(settings, 'COLUMNAR_STORE_DIR', None) or None
+
+
+def get_period_starts(days, granularity):
+    """
+    Returns the first day of the period containing each day.
+
+    Args:
+        days (ndarray): datetime64[D] days.
+        granularity (str): One of rollups.GRANULARITIES; weeks start on Monday.
+    """
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        return days - (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    unit = 'M' if granularity == 'month' else 'Y'
+    return days.astype(f'datetime64[{unit}]').astype('datetime64[D]')
+
+
+class ColumnarStore:
+    """
+    A read-only, memory-mapped columnar copy of a dataset.
+
+    Each metric is an int64 .npy array of shape (regions, days), with missing values
+    stored as 0, next to a boolean array marking the (region, day) cells that have a
+    row. Regions are sorted by country, so a country's regions are contiguous. The
+    arrays are opened with mmap, so worker processes share the pages of the OS page
+    cache instead of each holding a copy, and slicing them copies nothing.
+    """
+    def __init__(self, directory):
+        """
+        Open the store built in a directory.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as file:
+            self.meta = json.load(file)
+        with open(os.path.join(directory, 'regions.json'), encoding='utf-8') as file:
+            self.regions = [tuple(region) for region in json.load(file)]
+        self.arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                       for name in METRICS + ('present',)}
+        first_date = self.meta['first_date']
+        self.first_date = np.datetime64(first_date, 'D') if first_date else None
+        self.days = (self.first_date + np.arange(self.meta['dates'])) if first_date else np.array([], 'datetime64[D]')
+        countries = [country for country, _ in self.regions]
+        self.country_starts = np.array([index for index, country in enumerate(countries)
+                                        if index == 0 or country != countries[index - 1]], dtype=np.intp)
+        self.countries = [countries[index] for index in self.country_starts]
+
+    @property
+    def version(self):
+        """
+        Returns the data version token of the dataset the store was built from.
+        """
+        return self.meta['version']
+
+    def get_day_range(self, start_date=None, end_date=None):
+        """
+        Returns the slice of day offsets inside [start_date, end_date]; the whole store without a range.
+        """
+        if start_date is None or self.first_date is None:
+            return slice(0, len(self.days))
+        start = int((np.datetime64(start_date, 'D') - self.first_date).astype(np.int64))
+        end = int((np.datetime64(end_date, 'D') - self.first_date).astype(np.int64)) + 1
+        return slice(min(max(start, 0), len(self.days)), min(max(end, 0), len(self.days)))
+
+    def get_country_regions(self, country):
+        """
+        Returns the slice of the regions of a country, or None when the store has none.
+        """
+        if country not in self.countries:
+            return None
+        index = self.countries.index(country)
+        return slice(self.country_starts[index],
+                     self.country_starts[index + 1] if index + 1 < len(self.countries) else len(self.regions))
+
+    def totals(self, start_date=None, end_date=None, by_country=False, granularity='month', country=None):
+        """
+        Yields totals per day, week, month or year, as rollups.rollup_totals does from the rollups.
+
+        The sums are vectorized over the memory-mapped arrays: regions are summed per
+        country with reduceat over their contiguous blocks, and days per period with
+        reduceat over the contiguous days of each period.
+
+        With a country, only its regions are summed, into a single series.
+
+        Yields:
+            dict: The period label under PERIOD_KEYS[granularity] and total_<metric>
+                keys (after country_region when by_country), ordered by country and period.
+        """
+        days = self.get_day_range(start_date, end_date)
+        regions = slice(None)
+        if country is not None:
+            regions, by_country = self.get_country_regions(country), False
+        if days.start >= days.stop or regions is None:
+            return
+        periods = get_period_starts(self.days[days], granularity)
+        period_starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        labels = [period.strftime(PERIOD_KEYS[granularity][1]) for period in periods[period_starts].astype(object)]
+
+        def reduce(array):
+            block = array[regions, days]
+            grouped = np.add.reduceat(block, self.country_starts, axis=0) if by_country else block.sum(axis=0, keepdims=True)
+            return np.add.reduceat(grouped, period_starts, axis=1)
+
+        present = reduce(self.arrays['present'])  # Adding booleans is a logical or
+        totals = {metric: reduce(self.arrays[metric]) for metric in METRICS}
+        groups = self.countries if by_country else [None]
+        period_key = PERIOD_KEYS[granularity][0]
+        for group, country in enumerate(groups):
+            if by_country and not country:
+                continue  # As in the rollups, where an empty country_region holds the global totals
+            for period in np.flatnonzero(present[group]):
+                record = {'country_region': country} if by_country else {}
+                record[period_key] = labels[period]
+                record.update({f'total_{metric}': int(totals[metric][group, period]) for metric in METRICS})
+                yield record
+
+    def country_series(self, country=None, start_date=None, end_date=None):
+        """
+        Returns the daily totals of a country, or of the world without a country.
+
+        Returns:
+            tuple: The datetime64[D] days that have data, and a dict of int64 arrays by metric.
+        """
+        days = self.get_day_range(start_date, end_date)
+        regions = slice(None) if country is None else self.get_country_regions(country)
+        if regions is None:
+            return self.days[:0], {metric: np.zeros(0, np.int64) for metric in METRICS}
+        present = self.arrays['present'][regions, days].any(axis=0)
+        return self.days[days][present], {metric: self.arrays[metric][regions, days].sum(axis=0)[present] for metric in METRICS}
+
+
+def build_store(name):
+    """
+    Rebuild the columnar store of a dataset from the database and make it current.
+
+    The arrays are written straight to disk with open_memmap, in a new directory, and
+    published by atomically replacing the <name>.current pointer file; processes
+    reading the previous build keep their mappings. The data version is read in the
+    same transaction as the rows, so the store is ignored as soon as the data changes.
+
+    Args:
+        name (str): One of STORE_MODELS.
+
+    Returns:
+        ColumnarStore: The new store, or None when the store is disabled or the data changed while building.
+    """
+    root = get_store_root()
+    if root is None:
+        return None
+    model, date_field = STORE_MODELS[name]
+    os.makedirs(root, exist_ok=True)
+    directory = os.path.join(root, f'{name}-{time.time_ns()}')
+    os.makedirs(directory)
+    with transaction.atomic():
+        version = get_data_version(name)[0]
+        data = model.objects.order_by()
+        bounds = data.aggregate(first=Min(date_field), last=Max(date_field))
+        names = Region.objects.filter(pk__in=data.values('region_id')).values_list('id', 'country_region', 'province_state')
+        names = sorted(names, key=lambda region: (region[1], region[2] or ''))
+        regions = [(country, province) for _, country, province in names]
+        index = {pk: position for position, (pk, _, _) in enumerate(names)}  # Row of each region id
+        first_date = bounds['first']
+        shape = (len(regions), (bounds['last'] - first_date).days + 1 if first_date else 0)
+        arrays = {metric: np.lib.format.open_memmap(os.path.join(directory, f'{metric}.npy'), 'w+', np.int64, shape)
+                  for metric in METRICS}
+        arrays['present'] = np.lib.format.open_memmap(os.path.join(directory, 'present.npy'), 'w+', np.bool_, shape)
+        rows = data.values_list(date_field, 'region_id', *METRICS).iterator(chunk_size=BUILD_CHUNK_ROWS)
+        while chunk := list(islice(rows, BUILD_CHUNK_ROWS)):
+            row_index = np.fromiter((index[row[1]] for row in chunk), np.intp, len(chunk))
+            day_index = np.fromiter(((row[0] - first_date).days for row in chunk), np.intp, len(chunk))
+            for position, metric in enumerate(METRICS, 2):
+                values = np.fromiter((row[position] or 0 for row in chunk), np.int64, len(chunk))
+                np.add.at(arrays[metric], (row_index, day_index), values)  # Sums duplicate rows, like the rollups
+            arrays['present'][row_index, day_index] = True
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    with open(os.path.join(directory, 'regions.json'), 'w', encoding='utf-8') as file:
+        json.dump(regions, file)
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump({'version': version, 'first_date': first_date.isoformat() if first_date else None,
+                   'dates': shape[1], 'regions': shape[0], 'built_at': timezone.now().isoformat()}, file)
+
+    pointer = os.path.join(root, f'{name}.current')
+    with open(f'{pointer}.{os.getpid()}.tmp', 'w', encoding='utf-8') as file:
+        file.write(os.path.basename(directory))
+    os.replace(f'{pointer}.{os.getpid()}.tmp', pointer)
+    for entry in os.listdir(root):
+        if entry.startswith(f'{name}-') and entry != os.path.basename(directory):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return get_store(name)
+
+
+def refresh_stores(*names):
+    """
+    Rebuild the columnar stores of some datasets after they changed, when the store is enabled.
+    """
+    if get_store_root() is not None:
+        for name in names:
+            build_store(name)
+
+
+def get_store(name):
+    """
+    Returns the current columnar store of a dataset, or None when the store is disabled,
+    not built yet, or older than the data.
+
+    Args:
+        name (str): One of STORE_MODELS.
+    """
+    root = get_store_root()
+    if root is None:
+        return None
+    try:
+        with open(os.path.join(root, f'{name}.current'), encoding='utf-8') as file:
+            directory = os.path.join(root, file.read().strip())
+        with _lock:
+            store = _stores.get(name)
+            if store is None or store.directory != directory:
+                store = _stores[name] = ColumnarStore(directory)
+    except FileNotFoundError:  # Not built yet, or replaced by a build while being opened
+        return None
+    return store if store.version == get_data_version(name)[0] else None
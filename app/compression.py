@@ -0,0 +1,88 @@
+from functools import wraps
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # Optional; responses are gzipped without it
+    brotli = None
+
+# Responses shorter than this are sent as they are, as compressing them saves less than it costs
+MIN_COMPRESS_SIZE = 200
+
+# Brotli quality of the compressed responses; 11 is the smallest output but many times slower
+BROTLI_QUALITY = 5
+
+
+def get_accepted_encodings(request):
+    """
+    Returns the quality value of every coding of the Accept-Encoding header of a request, by lowercase name.
+    """
+    qualities = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0  # A malformed weight does not make a coding acceptable
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def accepts_encoding(request, encoding):
+    """
+    Returns whether the Accept-Encoding header of a request accepts an encoding, either by
+    name or through *, with a quality value above 0; q=0 means "not acceptable".
+    """
+    qualities = get_accepted_encodings(request)
+    return qualities.get(encoding, qualities.get('*', 0)) > 0
+
+
+def compress_response(request, response):
+    """
+    Compress the content of a response with brotli or gzip, whichever the client accepts,
+    preferring brotli when the brotli package is installed.
+
+    As with django.middleware.gzip.GZipMiddleware, streaming and short responses are
+    left alone, compressing must save bytes, and a strong ETag is made weak.
+
+    Returns:
+        HttpResponse: The response, compressed in place when that was worth it.
+    """
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.streaming or response.has_header('Content-Encoding') or len(response.content) < MIN_COMPRESS_SIZE:
+        return response
+    if brotli is not None and accepts_encoding(request, 'br'):
+        encoding, content = 'br', brotli.compress(response.content, quality=BROTLI_QUALITY)
+    elif accepts_encoding(request, 'gzip'):
+        encoding, content = 'gzip', compress_string(response.content)
+    else:
+        return response
+    if len(content) >= len(response.content):
+        return response
+
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag  # The bytes now differ between encodings
+    return response
+
+
+def compressed(view_func):
+    """
+    Decorator compressing the responses of a view with compress_response.
+
+    Put it above cache_data_response, so the cache holds one uncompressed copy for every encoding.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        return compress_response(request, view_func(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to every new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def supports_copy(connection):
+    """
+    Returns whether a connection can load rows with COPY, which needs PostgreSQL through psycopg 3.
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3  # Imports the installed driver
+    return is_psycopg3
+
+
+def bulk_insert(model, objs, batch_size=None, using='default'):
+    """
+    Insert unsaved instances through the backend's fastest bulk path.
+
+    On PostgreSQL with psycopg 3 the rows are streamed with COPY; elsewhere they
+    are inserted with bulk_create. Unlike bulk_create, the instances' primary keys
+    are not set after a COPY.
+
+    Args:
+        model (Model): The model class to insert into.
+        objs (list): The unsaved instances.
+        batch_size (int, optional): Rows per INSERT statement for bulk_create.
+        using (str): The database alias.
+    """
+    connection = connections[using]
+    if not objs:
+        return
+    if not supports_copy(connection):
+        model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+        return
+
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    sql = f'COPY {quote(model._meta.db_table)} ({", ".join(quote(field.column) for field in fields)}) FROM STDIN'
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for obj in objs:
+                copy.write_row([field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields])
@@ -0,0 +1,170 @@
+import csv
+import io
+import itertools
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Content type and file extension of each export format
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+# Formats needing the optional pyarrow package
+ARROW_FORMATS = ('parquet', 'arrow')
+
+# Rows fetched from the database cursor and encoded at a time
+EXPORT_CHUNK_ROWS = 2000
+
+
+def iter_row_chunks(queryset, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yields lists of up to chunk_rows value tuples, fetched from a database cursor.
+
+    Args:
+        queryset (QuerySet): The rows to export.
+        fields (list): The field names, in output order.
+        chunk_rows (int): The number of rows per list.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_rows)
+    while chunk := list(itertools.islice(rows, chunk_rows)):
+        yield chunk
+
+
+def csv_chunks(queryset, fields):
+    """
+    Yields the rows as CSV text, with a header line.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in iter_row_chunks(queryset, fields):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # Header of an empty export
+
+
+def ndjson_chunks(queryset, fields):
+    """
+    Yields the rows as newline-delimited JSON objects.
+    """
+    encode = DjangoJSONEncoder().encode
+    for chunk in iter_row_chunks(queryset, fields):
+        yield ''.join(encode(dict(zip(fields, row))) + '\n' for row in chunk)
+
+
+class StreamSink:
+    """
+    Write-only file object collecting what pyarrow writes until the stream drains it.
+
+    It keeps track of the position, which the Parquet writer needs for its footer,
+    without holding more than the pending bytes.
+    """
+    closed = False
+
+    def __init__(self):
+        self.position = 0
+        self.pending = []
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        """
+        Returns and forgets the bytes written since the last call.
+        """
+        data = b''.join(self.pending)
+        self.pending = []
+        return data
+
+
+def get_arrow_schema(queryset, fields):
+    """
+    Returns the Arrow schema of the given fields or annotations of a queryset.
+    """
+    import pyarrow as pa
+
+    types = {
+        'AutoField': pa.int64(), 'BigAutoField': pa.int64(), 'IntegerField': pa.int64(),
+        'BigIntegerField': pa.int64(), 'PositiveIntegerField': pa.int64(),
+        'DateField': pa.date32(), 'DateTimeField': pa.timestamp('us', tz='UTC'),
+        'FloatField': pa.float64(),
+    }
+    annotations = queryset.query.annotations
+    return pa.schema([
+        (name, types.get((annotations[name].output_field if name in annotations
+                          else queryset.model._meta.get_field(name)).get_internal_type(), pa.string()))
+        for name in fields
+    ])
+
+
+def arrow_chunks(queryset, fields, output):
+    """
+    Yields the rows as a Parquet file or an Arrow IPC stream, one record batch per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = get_arrow_schema(queryset, fields)
+    sink = StreamSink()
+    writer = pq.ParquetWriter(sink, schema) if output == 'parquet' else pa.ipc.new_stream(sink, schema)
+    for chunk in iter_row_chunks(queryset, fields):
+        columns = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_response(queryset, fields, output, filename):
+    """
+    Stream a queryset as a file download, encoding rows as they are fetched.
+
+    Memory use is bounded by EXPORT_CHUNK_ROWS whatever the number of rows.
+
+    Args:
+        queryset (QuerySet): The filtered and ordered rows to export.
+        fields (list): The field names, in output order.
+        output (str): One of EXPORT_FORMATS.
+        filename (str): The download name, without extension.
+
+    Returns:
+        StreamingHttpResponse: The export.
+
+    Raises:
+        ValueError: If the format is unknown, or needs pyarrow and it is not installed.
+    """
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f'output must be one of {", ".join(EXPORT_FORMATS)}')
+    if output in ARROW_FORMATS:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError(f'{output} export requires the pyarrow package')
+        chunks = arrow_chunks(queryset, fields, output)
+    elif output == 'csv':
+        chunks = csv_chunks(queryset, fields)
+    else:
+        chunks = ndjson_chunks(queryset, fields)
+
+    content_type, extension = EXPORT_FORMATS[output]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
@@ -0,0 +1,81 @@
+import hashlib
+import pandas as pd
+from django.db.models import Q
+from .models import IngestionFingerprint
+
+# IngestionFingerprint.key of the hash of a whole file
+FILE_KEY = 'file'
+
+
+def get_file_digest(filepath, block_size=2 ** 20):
+    """
+    Returns the SHA-256 hex digest of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        while block := file.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_row_digests(frame):
+    """
+    Returns the hex digest of every row of a frame, hashing all its columns.
+    """
+    return pd.util.hash_pandas_object(frame, index=False).map('{:016x}'.format).tolist()
+
+
+def get_fingerprint(source, key):
+    """
+    Returns the recorded digest of a source and key, or None.
+    """
+    return IngestionFingerprint.objects.filter(source=source, key=key).values_list('digest', flat=True).first()
+
+
+def get_fingerprints(source, start_key=None, end_key=None):
+    """
+    Returns the recorded digests of a source by key, optionally limited to keys in [start_key, end_key).
+    """
+    queryset = IngestionFingerprint.objects.filter(source=source)
+    if start_key is not None:
+        queryset = queryset.filter(key__gte=start_key, key__lt=end_key)
+    return dict(queryset.values_list('key', 'digest').iterator())
+
+
+def save_fingerprints(source, digests, batch_size=5000):
+    """
+    Record digests of a source, replacing the previous digest of each key.
+
+    Args:
+        source (str): The dataset name.
+        digests (dict): Digest by key.
+        batch_size (int): Rows per INSERT statement.
+    """
+    IngestionFingerprint.objects.bulk_create(
+        [IngestionFingerprint(source=source, key=key, digest=digest) for key, digest in digests.items()],
+        batch_size=batch_size, update_conflicts=True, unique_fields=['source', 'key'], update_fields=['digest', 'updated_at'],
+    )
+
+
+def forget_fingerprints(sources):
+    """
+    Delete the recorded digests of some sources, so their next load rewrites every row.
+    """
+    IngestionFingerprint.objects.filter(source__in=sources).delete()
+
+
+def forget_date_fingerprints(sources, dates):
+    """
+    Delete the recorded digests of some sources for a range of dates and of their whole files,
+    so the next load of any file rewrites the rows of those dates. Called when rows are written
+    outside the loader, which would otherwise skip a file or row whose digest is unchanged.
+
+    Args:
+        sources (list): The dataset names.
+        dates (list): The dates of the written rows.
+    """
+    # Row keys start with the ISO date, and '~' sorts after the '|' that follows it in covid_19_data keys
+    start_key, end_key = min(dates).isoformat(), max(dates).isoformat() + '~'
+    IngestionFingerprint.objects.filter(source__in=sources).filter(
+        Q(key=FILE_KEY) | Q(key__startswith=f'{FILE_KEY}:') | Q(key__gte=start_key, key__lt=end_key)
+    ).delete()
@@ -0,0 +1,200 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import FileUpload
+import logging
+
+logger = logging.getLogger(__name__)
+
+# FileUpload.status values used by the job queue
+STATUS_UPLOADING = 'Uploading'
+STATUS_QUEUED = 'Queued'
+STATUS_PROCESSING = 'Processing'
+STATUS_PROCESSED = 'Processed'
+STATUS_FAILED = 'Failed'
+
+_executor = None
+
+
+def enqueue_file(file_upload):
+    """
+    Queue an uploaded file for background processing.
+
+    The queue lives in the FileUpload table itself, so a job survives a restart
+    and can be picked up either by the in-process worker or by the
+    run_file_jobs management command.
+
+    Args:
+        file_upload (FileUpload): The uploaded file to process.
+    """
+    file_upload.status = STATUS_QUEUED
+    file_upload.bytes_ingested = 0
+    file_upload.rows_done = 0
+    file_upload.rows_failed = 0
+    file_upload.duration = None
+    file_upload.error = ''
+    file_upload.queued_at = timezone.now()
+    file_upload.started_at = None
+    file_upload.heartbeat_at = None
+    file_upload.finished_at = None
+    file_upload.save()
+    if getattr(settings, 'FILE_JOBS_RUN_IN_PROCESS', True):
+        transaction.on_commit(start_worker)
+
+
+def enqueue_upload(file_upload):
+    """
+    Queue a chunked upload that is still uploading, so newly arrived parts are assembled and,
+    when the loader supports it, loaded while the remaining parts upload.
+
+    Does nothing while a job already works on the upload; that job checks for new
+    parts when it finishes.
+
+    Args:
+        file_upload (FileUpload): The chunked upload.
+
+    Returns:
+        bool: Whether the upload was queued.
+    """
+    queued = FileUpload.objects.filter(pk=file_upload.pk, status=STATUS_UPLOADING).update(
+        status=STATUS_QUEUED, queued_at=timezone.now(), started_at=None, heartbeat_at=None, finished_at=None)
+    if queued and getattr(settings, 'FILE_JOBS_RUN_IN_PROCESS', True):
+        transaction.on_commit(start_worker)
+    return bool(queued)
+
+
+def start_worker():
+    """
+    Drain the queue on a background thread of the current process.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'FILE_JOBS_WORKERS', 1),
+                                       thread_name_prefix='file-jobs')
+    _executor.submit(_run_in_thread)
+
+
+def resume_jobs():
+    """
+    Drain the files left queued by a previous process, or abandoned in Processing by a worker
+    that crashed, when the queue runs in the web process; otherwise those files wait for the next
+    upload to start the worker. Called when the apps load with FILE_JOBS_RESUME_ON_START, which
+    is meant for a single process: every process calling this would poll the same queue.
+    """
+    if getattr(settings, 'FILE_JOBS_RUN_IN_PROCESS', True):
+        start_worker()
+
+
+def requeue_stale_jobs():
+    """
+    Move the files whose job has not reported progress for FILE_JOBS_STALE_AFTER seconds back to
+    Queued. A job reports progress after every batch it writes, so such a job belongs to a worker
+    that died, and its file would otherwise stay in Processing forever.
+
+    Returns:
+        int: The number of files queued again.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'FILE_JOBS_STALE_AFTER', 600))
+    stale = FileUpload.objects.filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+                                      status=STATUS_PROCESSING)
+    # A whole file is loaded again from the start; a chunked upload resumes after its last ingested byte
+    count = stale.filter(chunked=False).update(status=STATUS_QUEUED, queued_at=now, started_at=None, heartbeat_at=None,
+                                               rows_done=0, rows_failed=0)
+    count += stale.update(status=STATUS_QUEUED, queued_at=now, started_at=None, heartbeat_at=None)
+    if count:
+        logger.warning(f'Queued {count} file(s) again whose job stopped reporting progress')
+    return count
+
+
+def _run_in_thread():
+    """
+    Run the pending jobs and release the thread's database connections.
+    """
+    try:
+        run_pending_jobs()
+    except Exception:
+        logger.exception('File job worker crashed')
+    finally:
+        connections.close_all()
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued file to Processing.
+
+    Returns:
+        FileUpload: The claimed file, or None if the queue is empty.
+    """
+    candidates = FileUpload.objects.filter(status=STATUS_QUEUED).order_by('queued_at', 'id')
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        # The status filter makes the claim safe when several workers poll the queue
+        now = timezone.now()
+        claimed = FileUpload.objects.filter(pk=pk, status=STATUS_QUEUED).update(
+            status=STATUS_PROCESSING, started_at=now, heartbeat_at=now)
+        if claimed:
+            return FileUpload.objects.get(pk=pk)
+    return None
+
+
+def run_job(file_upload):
+    """
+    Process a claimed file and persist its progress and outcome.
+
+    Args:
+        file_upload (FileUpload): The claimed file.
+    """
+    # Imported here to keep pandas off the request path of the views enqueuing jobs
+    from .process_excel_file import ProcessExcelFile
+
+    # Rows of earlier runs on the same chunked upload, which only load the rows that arrived since
+    rows_done, rows_failed = file_upload.rows_done, file_upload.rows_failed
+
+    def report(stats):
+        FileUpload.objects.filter(pk=file_upload.pk).update(rows_done=rows_done + stats.rows,
+                                                            rows_failed=rows_failed + stats.failed,
+                                                            heartbeat_at=timezone.now())
+
+    finished = True
+    try:
+        if file_upload.chunked:
+            stats, finished = ProcessExcelFile().process_chunked_upload(file_upload, progress=report)
+        else:
+            stats = ProcessExcelFile().process_upload(file_upload, progress=report)
+    except Exception as e:
+        logger.error(f"Error processing file {file_upload.pk}: {e}")
+        file_upload.status = STATUS_FAILED
+        file_upload.error = str(e)
+    else:
+        file_upload.status = STATUS_PROCESSED if finished else STATUS_UPLOADING
+        if stats is not None:
+            file_upload.rows_done = rows_done + stats.rows
+            file_upload.rows_failed = rows_failed + stats.failed
+    file_upload.finished_at = timezone.now()
+    file_upload.duration = (file_upload.finished_at - file_upload.started_at).total_seconds()
+    file_upload.save(update_fields=['status', 'error', 'rows_done', 'rows_failed', 'finished_at', 'duration'])
+    if file_upload.status == STATUS_UPLOADING:
+        # Parts that arrived, or a completion that was recorded, while this job ran were not queued
+        file_upload.refresh_from_db(fields=['part_count'])
+        if file_upload.part_count is not None or file_upload.parts.filter(number=file_upload.parts_assembled + 1).exists():
+            enqueue_upload(file_upload)
+
+
+def run_pending_jobs():
+    """
+    Queue the abandoned files again, then process queued files until the queue is empty.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    requeue_stale_jobs()
+    count = 0
+    while True:
+        file_upload = claim_next_job()
+        if file_upload is None:
+            return count
+        run_job(file_upload)
+        count += 1
@@ -0,0 +1,265 @@
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+import django
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from app.models import Covid19Data, Covid19Rollup, IngestionFingerprint, TimeSeriesData
+from app.process_excel_file import ProcessExcelFile
+from app.synthetic import DATA_TYPES, SyntheticDataset
+
+# Version of the results file layout
+RESULTS_VERSION = 1
+
+
+class Command(BaseCommand):
+    """
+    Django management command that times the loaders and the read APIs against a reproducible
+    synthetic dataset, and writes the results as JSON so runs can be compared.
+
+    The benchmark runs against a throwaway test database. Each benchmark is run --repeat
+    times and its median, minimum and maximum are reported; loaders start from empty
+    tables every time, and read APIs are timed with a cold and a warm response cache.
+    With --baseline, the medians are compared with a previous results file, and
+    --max-regression makes the command fail when a benchmark got slower than allowed.
+    """
+    help = 'Benchmark the loaders and read APIs on synthetic data and write the results as JSON'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--rows', type=int, default=10000, help='Rows of the synthetic dataset (regions times dates)')
+        parser.add_argument('--dates', type=int, default=100, help='Days, i.e. date columns of the time series files')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the median is reported')
+        parser.add_argument('--page-size', type=int, default=100, help='Page size of the list endpoint benchmarks')
+        parser.add_argument('--pages', type=int, default=10, help='Pages walked by the list endpoint benchmarks')
+        parser.add_argument('--output', default='benchmark-results.json', help='File to write the results to')
+        parser.add_argument('--baseline', help='Results file of a previous run to compare with')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='Fail when a median is more than this many percent slower than the baseline')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        dataset = SyntheticDataset.for_rows(kwargs['rows'], kwargs['dates'], kwargs['seed'])
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                started = time.perf_counter()
+                paths = dataset.write(directory)
+                self.stdout.write(f'Generated {dataset.rows} rows ({dataset.regions} regions x {dataset.dates} dates) '
+                                  f'in {time.perf_counter() - started:.2f}s')
+                results = self.benchmark_loaders(paths, dataset, kwargs['repeat'])
+            results += self.benchmark_apis(kwargs['repeat'], kwargs['page_size'], kwargs['pages'])
+            environment = self.get_environment()
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+        report = {
+            'version': RESULTS_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'environment': environment,
+            'parameters': {name: kwargs[name] for name in ('rows', 'dates', 'seed', 'repeat', 'page_size', 'pages')},
+            'results': results,
+        }
+        with open(kwargs['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(results)} results to {kwargs["output"]}'))
+        if kwargs['baseline']:
+            self.compare(results, kwargs['baseline'], kwargs['max_regression'])
+
+    def benchmark_loaders(self, paths, dataset, repeat):
+        """
+        Time the loaders on the synthetic files, each starting from empty tables.
+
+        The last runs leave every table loaded for the read API benchmarks.
+        """
+        loader = ProcessExcelFile()
+        time_series = {data_type: paths[data_type] for data_type in DATA_TYPES}
+        return [
+            self.measure('load_covid19_data', repeat, lambda: loader.load_covid19_data(paths['covid_19_data']).rows,
+                         setup=lambda: self.reset(Covid19Data, Covid19Rollup), expected_rows=dataset.rows),
+            self.measure('load_covid19_data (unchanged reload)', repeat,
+                         lambda: loader.load_covid19_data(paths['covid_19_data']).rows),
+            self.measure('load_time_series_data (confirmed)', repeat,
+                         lambda: loader.load_time_series_data(paths['confirmed'], 'confirmed').rows,
+                         setup=lambda: self.reset(TimeSeriesData), expected_rows=dataset.rows),
+            self.measure('load_time_series_files', repeat, lambda: loader.load_time_series_files(time_series).rows,
+                         setup=lambda: self.reset(TimeSeriesData), expected_rows=dataset.rows),
+        ]
+
+    def benchmark_apis(self, repeat, page_size, pages):
+        """
+        Time the aggregate, chart and analytics APIs and a walk through the paginated list endpoints, with a cold and a warm cache.
+        """
+        client = Client()
+        results = []
+        for cached in (False, True):
+            setup = None if cached else cache.clear
+            suffix = ' (cached)' if cached else ''
+            for name in ('covid19-data-api', 'covid19-country-data-api'):
+                for granularity in ('month', 'day'):
+                    results.append(self.measure(
+                        f'{name} granularity={granularity}{suffix}', repeat,
+                        lambda name=name, granularity=granularity: len(self.get_json(client, reverse(name), granularity=granularity)),
+                        setup=setup, count_queries=True))
+            results.append(self.measure(
+                f'analytics-api points=200{suffix}', repeat,
+                lambda: len(self.get_json(client, reverse('analytics-api'), points=200)['dates']),
+                setup=setup, count_queries=True))
+            results.append(self.measure(
+                f'chart-data-api granularity=day{suffix}', repeat,
+                lambda: len(self.get_json(client, reverse('chart-data-api'), granularity='day')['labels']),
+                setup=setup, count_queries=True))
+            for name in ('covid19data-list', 'timeseriesdata-list'):
+                results.append(self.measure(
+                    f'{name} {pages} pages of {page_size}{suffix}', repeat,
+                    lambda name=name: self.walk_pages(client, reverse(name), page_size, pages),
+                    setup=setup, count_queries=True))
+        return results
+
+    def measure(self, name, repeat, run, setup=None, expected_rows=None, count_queries=False):
+        """
+        Time a benchmark and return its result.
+
+        Args:
+            name (str): The benchmark name.
+            repeat (int): The number of timed runs.
+            run (callable): Runs the benchmark once and returns the number of rows it processed.
+            setup (callable, optional): Run before every run, outside the timing.
+            expected_rows (int, optional): Fail if a run processed a different number of rows.
+            count_queries (bool): Count the database queries of an extra, untimed run first.
+
+        Returns:
+            dict: The benchmark name, rows, timings in seconds, and rows per second of the median run.
+        """
+        result = {'name': name}
+        if count_queries:
+            if setup:
+                setup()
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            result['queries'] = len(queries)
+        timings = []
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):  # The loaders print a summary of every run
+                rows = run()
+            timings.append(time.perf_counter() - started)
+            if expected_rows is not None and rows != expected_rows:
+                raise CommandError(f'{name} processed {rows} rows instead of {expected_rows}')
+        median = statistics.median(timings)
+        result.update({
+            'rows': rows, 'median_seconds': median, 'min_seconds': min(timings), 'max_seconds': max(timings),
+            'rows_per_second': rows / median if median else None, 'timings': timings,
+        })
+        self.stdout.write(f'{name}: {median * 1000:.1f} ms median, {rows} rows'
+                          + (f', {result["queries"]} queries' if count_queries else ''))
+        return result
+
+    def reset(self, *models):
+        """
+        Empty the tables of some models, with their ingestion fingerprints, and the response cache.
+        """
+        tables = [model._meta.db_table for model in models + (IngestionFingerprint,)]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, reset_sequences=True))
+        cache.clear()
+
+    def get_json(self, client, path, **params):
+        """
+        Returns the decoded JSON body of a GET request, failing on errors.
+        """
+        response = client.get(path, params)
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return json.loads(content)
+
+    def walk_pages(self, client, path, page_size, pages):
+        """
+        Follow the cursor links of a list endpoint for some pages and return the number of rows read.
+        """
+        rows, params = 0, {'page_size': page_size}
+        for _ in range(pages):
+            page = self.get_json(client, path, **params)
+            rows += len(page['results'])
+            if not page['next']:
+                break
+            path, params = page['next'], {}
+        return rows
+
+    def get_environment(self):
+        """
+        Returns what the results depend on besides the code: versions, database and machine.
+        """
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                    text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'database': f'{connection.vendor} {".".join(map(str, connection.get_database_version()))}',
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        }
+
+    def compare(self, results, baseline_path, max_regression):
+        """
+        Print the change of every median against a baseline results file.
+
+        Raises:
+            CommandError: If max_regression is given and a benchmark got slower by more than that percentage.
+        """
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = {result['name']: result for result in json.load(file)['results']}
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {baseline_path}'))
+        for result in results:
+            before = baseline.get(result['name'])
+            if before is None:
+                self.stdout.write(f'  {result["name"]}: new')
+                continue
+            change = (result['median_seconds'] / before['median_seconds'] - 1) * 100 if before['median_seconds'] else 0
+            line = (f'  {result["name"]}: {before["median_seconds"] * 1000:.1f} ms -> '
+                    f'{result["median_seconds"] * 1000:.1f} ms ({change:+.0f}%)')
+            if max_regression is not None and change > max_regression:
+                regressions.append(result['name'])
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmarks regressed by more than {max_regression}%: '
+                               + ', '.join(regressions))
@@ -0,0 +1,131 @@
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+
+# The migrations right before and right after the indexes were added
+BEFORE = ('app', '0003_covid19_rollup')
+AFTER = ('app', '0004_query_indexes')
+
+
+class Command(BaseCommand):
+    """
+    Django management command that compares query plans and latencies of the read paths
+    before and after the migration adding the Covid19Data and TimeSeriesData indexes.
+
+    The benchmark runs against a throwaway test database filled with synthetic rows,
+    using the historical models of each migration so it keeps working as the models evolve.
+    """
+    help = 'Benchmark the date-range and country query paths before and after the index migration'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--rows', type=int, default=200000, help='Synthetic rows to add to each table')
+        parser.add_argument('--countries', type=int, default=200, help='Number of synthetic countries')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            apps = self.migrate(BEFORE)
+            self.seed(apps, kwargs['rows'], kwargs['countries'])
+            before = self.measure(self.get_queries(apps), kwargs['repeat'])
+            started = time.perf_counter()
+            apps = self.migrate(AFTER)
+            self.stdout.write(f'Index migration took {time.perf_counter() - started:.2f}s')
+            after = self.measure(self.get_queries(apps), kwargs['repeat'])
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+        for name in before:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('without indexes', before), ('with indexes', after)):
+                plan, latency = results[name]
+                self.stdout.write(f'  {label}: {latency * 1000:.2f} ms')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+            speedup = before[name][1] / after[name][1] if after[name][1] else 0
+            self.stdout.write(self.style.SUCCESS(f'  speedup: {speedup:.1f}x'))
+
+    def migrate(self, target):
+        """
+        Migrate the test database to target and return the historical apps at that state.
+        """
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        return executor.loader.project_state(target).apps
+
+    def seed(self, apps, rows, countries):
+        """
+        Insert synthetic rows: one per country and day, as in covid_19_data.csv.
+
+        Args:
+            apps (Apps): Historical apps providing the models.
+            rows (int): Number of rows to add to each table.
+            countries (int): Number of distinct countries.
+        """
+        Covid19Data = apps.get_model('app', 'Covid19Data')
+        TimeSeriesData = apps.get_model('app', 'TimeSeriesData')
+        first_day = date(2020, 1, 22)
+        last_update = datetime(2021, 5, 29, tzinfo=timezone.utc)
+        covid19_data, time_series = [], []
+        for i in range(rows):
+            day = first_day + timedelta(days=i // countries)
+            country = f'Country {i % countries}'
+            covid19_data.append(Covid19Data(observation_date=day, country_region=country, last_update=last_update,
+                                            confirmed=i, deaths=i // 50, recovered=i // 2))
+            time_series.append(TimeSeriesData(date=day, country_region=country, province_state=None,
+                                              confirmed=i, deaths=i // 50, recovered=i // 2))
+        Covid19Data.objects.bulk_create(covid19_data, batch_size=5000)
+        TimeSeriesData.objects.bulk_create(time_series, batch_size=5000)
+        self.stdout.write(f'Seeded {rows} rows into Covid19Data and TimeSeriesData')
+
+    def get_queries(self, apps):
+        """
+        Returns the read paths to benchmark, keyed by name, filtering on a month in the middle of the data.
+
+        Args:
+            apps (Apps): Historical apps providing the models.
+        """
+        Covid19Data = apps.get_model('app', 'Covid19Data')
+        TimeSeriesData = apps.get_model('app', 'TimeSeriesData')
+        start, end = date(2020, 1, 22) + timedelta(days=60), date(2020, 1, 22) + timedelta(days=90)
+        country = 'Country 0'
+        return {
+            'Covid19Data date range (list API)': Covid19Data.objects.filter(observation_date__range=[start, end]),
+            'Covid19Data country and date range': Covid19Data.objects.filter(country_region=country, observation_date__range=[start, end]),
+            'Covid19Data daily totals (rollup refresh)': Covid19Data.objects.filter(
+                observation_date__range=[start, end]).values('observation_date', 'country_region').annotate(total=Sum('confirmed')).order_by(),
+            'TimeSeriesData date range (list API)': TimeSeriesData.objects.filter(date__range=[start, end]),
+            'TimeSeriesData key lookup (loader)': TimeSeriesData.objects.filter(country_region=country, province_state=None, date=start),
+        }
+
+    def measure(self, queries, repeat):
+        """
+        Returns the query plan and median latency, in seconds, of each query.
+        """
+        results = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            results[name] = (queryset.explain(), statistics.median(timings))
+        return results
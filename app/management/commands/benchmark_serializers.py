@@ -0,0 +1,97 @@
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from app.models import Covid19Data, TimeSeriesData
+from app.regions import get_region_ids
+from app.serializers import Covid19DataSerializer, TimeSeriesDataSerializer, RowEncoder
+
+
+class Command(BaseCommand):
+    """
+    Django management command that compares the per-row cost of the list endpoints' read paths:
+    model instances through the ModelSerializers, against .values() rows through a RowEncoder.
+
+    The benchmark runs against a throwaway test database filled with synthetic rows and
+    checks that both paths render the same JSON.
+    """
+    help = 'Benchmark the per-row cost of the ModelSerializer and RowEncoder read paths'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--rows', type=int, default=20000, help='Synthetic rows to add to each table')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per read path; the median is reported')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(kwargs['rows'])
+            for model, serializer_class, ordering in (
+                    (Covid19Data, Covid19DataSerializer, ('observation_date', 'id')),
+                    (TimeSeriesData, TimeSeriesDataSerializer, ('date', 'id'))):
+                self.compare(model, serializer_class, ordering, kwargs['rows'], kwargs['repeat'])
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+    def seed(self, rows):
+        """
+        Insert synthetic rows, one per country and day.
+        """
+        first_day = date(2020, 1, 22)
+        last_update = datetime(2021, 5, 29, 17, 30, tzinfo=timezone.utc)
+        covid19_regions = get_region_ids((f'Country {i % 200}', None if i % 3 else f'Province {i % 7}') for i in range(rows))
+        time_series_regions = get_region_ids((f'Country {i % 200}', None) for i in range(rows))
+        Covid19Data.objects.bulk_create([
+            Covid19Data(observation_date=first_day + timedelta(days=i // 200), region_id=covid19_regions[i],
+                        last_update=last_update, confirmed=i, deaths=i // 50, recovered=i // 2)
+            for i in range(rows)
+        ], batch_size=5000)
+        TimeSeriesData.objects.bulk_create([
+            TimeSeriesData(date=first_day + timedelta(days=i // 200), region_id=time_series_regions[i],
+                           confirmed=i, deaths=i // 50, recovered=None if i % 5 else i // 2)
+            for i in range(rows)
+        ], batch_size=5000)
+        self.stdout.write(f'Seeded {rows} rows into Covid19Data and TimeSeriesData')
+
+    def compare(self, model, serializer_class, ordering, rows, repeat):
+        """
+        Time fetching and encoding every row of a model both ways, and check the outputs match.
+        """
+        queryset = model.objects.select_related('region').order_by(*ordering)
+        encoder = RowEncoder(serializer_class)
+        paths = {
+            'ModelSerializer': lambda: serializer_class(queryset.all(), many=True).data,
+            'RowEncoder': lambda: encoder.encode(queryset.values(*encoder.lookups)),
+        }
+        results = {}
+        for name, read in paths.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = read()
+                timings.append(time.perf_counter() - started)
+            results[name] = (JSONRenderer().render(data), statistics.median(timings))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(model.__name__))
+        for name, (_, latency) in results.items():
+            self.stdout.write(f'  {name}: {latency * 1e6 / rows:.2f} us/row ({latency * 1000:.1f} ms total)')
+        (before, before_latency), (after, after_latency) = results.values()
+        if before != after:
+            self.stdout.write(self.style.ERROR('  outputs differ'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'  identical output, speedup: {before_latency / after_latency:.1f}x'))
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from app.columnar import STORE_MODELS, build_store, get_store_root
+
+class Command(BaseCommand):
+    """
+    Django management command to rebuild the columnar store, e.g. after rows were changed through the API.
+    """
+    help = 'Rebuild the memory-mapped columnar store of Covid19Data and TimeSeriesData'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('datasets', nargs='*', help=f'Datasets to rebuild among {", ".join(STORE_MODELS)}; all of them by default')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        if get_store_root() is None:
+            raise CommandError('The columnar store is disabled; set COLUMNAR_STORE_DIR to enable it')
+        unknown = set(kwargs['datasets']) - set(STORE_MODELS)
+        if unknown:
+            raise CommandError(f'Unknown datasets: {", ".join(sorted(unknown))}')
+        for name in kwargs['datasets'] or STORE_MODELS:
+            started = time.perf_counter()
+            store = build_store(name)
+            if store is None:
+                self.stdout.write(self.style.WARNING(f'{name} changed while building; run the command again'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {store.meta["regions"]} regions x {store.meta["dates"]} dates '
+                f'built in {time.perf_counter() - started:.2f}s'))
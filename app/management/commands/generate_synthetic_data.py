@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+from app.synthetic import SyntheticDataset
+
+
+class Command(BaseCommand):
+    """
+    Django management command that writes a reproducible synthetic covid_19_data.csv and
+    time_series_covid_19_* files, e.g. to load with load_data at a chosen scale.
+    """
+    help = 'Write synthetic COVID-19 CSV files of about the given number of rows'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('directory', help='Directory to write the files into')
+        parser.add_argument('--rows', type=int, default=10000, help='Rows of covid_19_data.csv (regions times dates)')
+        parser.add_argument('--dates', type=int, default=100, help='Days, i.e. date columns of the time series files')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        dataset = SyntheticDataset.for_rows(kwargs['rows'], kwargs['dates'], kwargs['seed'])
+        started = time.perf_counter()
+        paths = dataset.write(kwargs['directory'])
+        self.stdout.write(f'Wrote {dataset.rows} rows ({dataset.regions} regions x {dataset.dates} dates) '
+                          f'in {time.perf_counter() - started:.2f}s:')
+        for path in paths.values():
+            self.stdout.write(f'  {path}')
@@ -1,12 +1,9 @@
-import csv
-from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from app.models import Covid19Data, TimeSeriesData
-import pandas as pd
 import os
 
-from app.process_excel_file import ProcessExcelFile
+from app.fingerprints import forget_fingerprints
+from app.process_excel_file import COVID19_SOURCE, TIME_SERIES_SOURCE, ProcessExcelFile
 
 class Command(BaseCommand, ProcessExcelFile):
     """
@@ -15,6 +12,18 @@ class Command(BaseCommand, ProcessExcelFile):
     """
     help = 'Load data from COVID-19 CSV files'  # Description of the command
 
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of rows written per batch')
+        parser.add_argument('--force', action='store_true',
+                            help='Rewrite every row, ignoring the hashes recorded by previous loads '
+                                 '(e.g. after rows were deleted from the database)')
+
     def handle(self, *args, **kwargs):
         """
         The entry point for the command. This method is called when the command is executed.
@@ -23,14 +32,15 @@ class Command(BaseCommand, ProcessExcelFile):
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
         """
-        # Load COVID-19 data from the specified CSV file into the Covid19Data model
-        self.load_covid19_data(os.path.join(settings.BASE_DIR, 'data/covid_19_data.csv'))
+        data_types = ('confirmed', 'deaths', 'recovered')
+        if kwargs.get('force'):
+            forget_fingerprints([COVID19_SOURCE] + [TIME_SERIES_SOURCE.format(data_type) for data_type in data_types])
 
-        # Load time series data for confirmed cases
-        self.load_time_series_data(os.path.join(settings.BASE_DIR, 'data/time_series_covid_19_confirmed.csv'), 'confirmed')
-
-        # Load time series data for deaths
-        self.load_time_series_data(os.path.join(settings.BASE_DIR, 'data/time_series_covid_19_deaths.csv'), 'deaths')
+        # Load COVID-19 data from the specified CSV file into the Covid19Data model
+        self.load_covid19_data(os.path.join(settings.BASE_DIR, 'data/covid_19_data.csv'), batch_size=kwargs.get('batch_size'))
 
-        # Load time series data for recovered cases
-        self.load_time_series_data(os.path.join(settings.BASE_DIR, 'data/time_series_covid_19_recovered.csv'), 'recovered')
\ No newline at end of file
+        # Load the confirmed, deaths and recovered time series in one merged pass
+        self.load_time_series_files({
+            data_type: os.path.join(settings.BASE_DIR, f'data/time_series_covid_19_{data_type}.csv')
+            for data_type in data_types
+        }, batch_size=kwargs.get('batch_size'))
@@ -0,0 +1,44 @@
+import glob
+import os
+from django.core.management.base import BaseCommand, CommandError
+
+from app.process_excel_file import ProcessExcelFile
+
+class Command(BaseCommand, ProcessExcelFile):
+    """
+    Django management command to load covid_19_data.csv-shaped files using a pool of parser processes.
+    """
+    help = 'Load COVID-19 CSV files (or directories of chunked files) in parallel'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('paths', nargs='+', help='CSV files, or directories of CSV files such as data/ShortFiles')
+        parser.add_argument('--workers', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of rows written per batch')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        filepaths = []
+        for path in kwargs['paths']:
+            if os.path.isdir(path):
+                filepaths.extend(sorted(glob.glob(os.path.join(path, '*.csv'))))
+            elif os.path.exists(path):
+                filepaths.append(path)
+            else:
+                raise CommandError(f'{path} does not exist')
+        if not filepaths:
+            raise CommandError('No CSV files to load')
+
+        stats = self.load_covid19_data_parallel(filepaths, workers=kwargs['workers'], batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Loaded {len(filepaths)} file(s): {stats}'))
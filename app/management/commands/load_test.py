@@ -0,0 +1,214 @@
+import asyncio
+import io
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from wsgiref.util import setup_testing_defaults
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+from app.process_excel_file import ProcessExcelFile
+from app.rollups import GRANULARITIES
+from app.synthetic import SyntheticDataset
+
+# The read endpoints requested by the simulated chart clients
+ENDPOINTS = ('covid19-data-api', 'covid19-country-data-api')
+
+
+class Command(BaseCommand):
+    """
+    Django management command that compares how many concurrent chart requests the
+    project serves over WSGI and over ASGI, in-process against a synthetic dataset.
+
+    Every client sends requests one after the other, each for a random date range so
+    that it misses the response cache. Over WSGI, the requests are handled by a pool
+    of --workers threads, as by a threaded WSGI server; over ASGI, they all run on one
+    event loop, as under uvicorn. --query-delay adds a fixed wait to every query, to
+    model a database across the network. Async views only gain when that wait is long:
+    below roughly 20 ms per query, the overhead of the event loop and of the async ORM's
+    threads makes ASGI slower than WSGI.
+    """
+    help = 'Load test the aggregate APIs over WSGI and ASGI and compare their throughput and latency'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--rows', type=int, default=10000, help='Rows of the synthetic dataset (regions times dates)')
+        parser.add_argument('--dates', type=int, default=100, help='Days of the synthetic dataset')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data and of the requests')
+        parser.add_argument('--requests', type=int, default=400, help='Requests sent in each mode')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clients sending requests at the same time')
+        parser.add_argument('--workers', type=int, default=4, help='Threads handling requests over WSGI')
+        parser.add_argument('--granularity', choices=GRANULARITIES, default='month',
+                            help='Granularity of the requested totals; month is what the chart page asks for')
+        parser.add_argument('--query-delay', type=float, default=0, help='Milliseconds added to every database query')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        if min(kwargs['requests'], kwargs['concurrency'], kwargs['workers']) < 1:
+            raise CommandError('--requests, --concurrency and --workers must be at least 1')
+        dataset = SyntheticDataset.for_rows(kwargs['rows'], kwargs['dates'], kwargs['seed'])
+        paths = self.get_paths(dataset, kwargs['requests'], kwargs['granularity'], random.Random(kwargs['seed']))
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        delay = kwargs['query_delay'] / 1000
+
+        def delay_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_query_delay(sender, connection, **kwargs):
+            # Put first: the connection opens inside the execute_wrapper() block of MetricsMiddleware,
+            # which removes the last wrapper on exit, so an appended one would replace its recorder
+            connection.execute_wrappers.insert(0, delay_query)
+
+        try:
+            # The rollups are what the async ORM reads; the columnar store would answer from memory
+            with override_settings(COLUMNAR_STORE_DIR=None), tempfile.TemporaryDirectory() as directory:
+                with redirect_stdout(io.StringIO()):  # The loader prints a summary
+                    ProcessExcelFile().load_covid19_data(dataset.write(directory)['covid_19_data'])
+                self.stdout.write(f'Loaded {dataset.rows} rows; sending {len(paths)} requests from '
+                                  f'{kwargs["concurrency"]} clients, {kwargs["query_delay"]:g} ms per query')
+                if delay:
+                    connection_created.connect(add_query_delay)
+                results = {
+                    'wsgi': self.run_wsgi(paths, kwargs['concurrency'], kwargs['workers']),
+                    'asgi': self.run_asgi(paths, kwargs['concurrency']),
+                }
+        finally:
+            connection_created.disconnect(add_query_delay)
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+        for mode, (seconds, latencies, errors) in results.items():
+            label = f'WSGI, {kwargs["workers"]} threads' if mode == 'wsgi' else 'ASGI, 1 event loop'
+            self.stdout.write(f'{label}: {len(latencies) / seconds:.1f} requests/s, '
+                              f'latency p50 {statistics.median(latencies) * 1000:.1f} ms, '
+                              f'p95 {self.percentile(latencies, 95) * 1000:.1f} ms, '
+                              f'max {max(latencies) * 1000:.1f} ms, {errors} errors')
+        gain = results['wsgi'][0] / results['asgi'][0]
+        self.stdout.write(self.style.SUCCESS(f'ASGI served the load {gain:.2f}x as fast as WSGI'))
+
+    def get_paths(self, dataset, count, granularity, rng):
+        """
+        Returns the paths of the requests, each for a random endpoint and date range of the dataset.
+        """
+        paths = []
+        for _ in range(count):
+            first, last = sorted(rng.sample(dataset.days, 2)) if len(dataset.days) > 1 else dataset.days * 2
+            paths.append(f'{reverse(rng.choice(ENDPOINTS))}?granularity={granularity}&start_date={first}&end_date={last}')
+        return paths
+
+    def run_wsgi(self, paths, concurrency, workers):
+        """
+        Send the requests to the WSGI application from concurrent clients, handled by a pool of threads.
+
+        Returns:
+            tuple: The seconds taken, the latency of every request, and the number of failed requests.
+        """
+        application = get_wsgi_application()
+        pending, latencies, errors, lock = iter(paths), [], [], threading.Lock()
+
+        def handle(path):
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path.split('?')[0], 'QUERY_STRING': path.split('?')[1]}
+            setup_testing_defaults(environ)
+            statuses = []
+            result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                for _ in result:
+                    pass
+            finally:
+                result.close()
+            return statuses[0].startswith('200')
+
+        def client(server):
+            while True:
+                with lock:
+                    path = next(pending, None)
+                if path is None:
+                    return
+                started = time.perf_counter()
+                ok = server.submit(handle, path).result()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    errors.append(not ok)
+
+        cache.clear()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as server, ThreadPoolExecutor(concurrency) as clients:
+            for future in [clients.submit(client, server) for _ in range(concurrency)]:
+                future.result()
+        return time.perf_counter() - started, latencies, sum(errors)
+
+    def run_asgi(self, paths, concurrency):
+        """
+        Send the requests to the ASGI application from concurrent clients, all on one event loop.
+
+        Returns:
+            tuple: The seconds taken, the latency of every request, and the number of failed requests.
+        """
+        application = get_asgi_application()
+        pending, latencies, errors = iter(paths), [], []
+
+        async def handle(path):
+            path, query = path.split('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            statuses = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.Event().wait()  # The client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await application(scope, receive, send)
+            return statuses == [200]
+
+        async def client():
+            for path in pending:
+                started = time.perf_counter()
+                ok = await handle(path)
+                latencies.append(time.perf_counter() - started)
+                errors.append(not ok)
+
+        async def run():
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+
+        cache.clear()
+        started = time.perf_counter()
+        asyncio.run(run())
+        return time.perf_counter() - started, latencies, sum(errors)
+
+    @staticmethod
+    def percentile(values, percent):
+        """
+        Returns the value below which the given percentage of the values fall.
+        """
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app.rollups import refresh_rollups
+
+class Command(BaseCommand):
+    """
+    Django management command to rebuild the daily and monthly rollups of Covid19Data.
+    """
+    help = 'Rebuild the Covid19Data rollups, optionally only for a range of observation dates'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--start-date', help='First observation date to refresh (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last observation date to refresh (YYYY-MM-DD)')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        start_date = parse_date(kwargs['start_date']) if kwargs['start_date'] else None
+        end_date = parse_date(kwargs['end_date']) if kwargs['end_date'] else None
+        if (start_date is None) != (end_date is None):
+            raise CommandError('--start-date and --end-date must be given together')
+        refresh_rollups(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS('Rollups refreshed successfully'))
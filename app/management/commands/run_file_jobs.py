@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+
+from app.jobs import run_pending_jobs
+
+class Command(BaseCommand):
+    """
+    Django management command that works through the queue of uploaded files.
+    """
+    help = 'Process queued FileUpload jobs'
+
+    def add_arguments(self, parser):
+        """
+        Add command-line arguments to the command.
+
+        Args:
+            parser (ArgumentParser): The parser for command-line arguments.
+        """
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command input.
+
+        Args:
+            *args: Variable arguments.
+            **kwargs: Keyword arguments.
+        """
+        while True:
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'Processed {count} queued file(s)'))
+            if kwargs['once']:
+                return
+            time.sleep(kwargs['interval'])
@@ -0,0 +1,209 @@
+import bisect
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+BATCH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PHASE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+
+class Metric:
+    """
+    Base class of the in-process metrics, one value per combination of label values.
+
+    Values are kept per process: behind several worker processes, scrape each one or
+    aggregate in the dashboard.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text.
+            labels (tuple): The label names.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def get_key(self, labels):
+        """
+        Returns the label values of a sample, in the metric's label order.
+        """
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def format_labels(self, key, extra=()):
+        """
+        Returns the {label="value",...} part of an exposition line.
+        """
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{label}="{escape(value)}"' for label, value in pairs) + '}'
+
+    def render(self):
+        """
+        Returns the exposition lines of the metric.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.extend(self.render_sample(key, value))
+        return lines
+
+    def render_sample(self, key, value):
+        """
+        Returns the exposition lines of one sample.
+        """
+        return [f'{self.name}{self.format_labels(key)} {format_number(value)}']
+
+    def clear(self):
+        """
+        Forget every sample.
+        """
+        with self.lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    """
+    A value that only goes up.
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Add amount to the sample with the given label values.
+        """
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that is set to the latest measurement.
+    """
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """
+        Set the sample with the given label values.
+        """
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Counts of observations per bucket, with their sum and count.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Count an observation in the sample with the given label values.
+        """
+        key = self.get_key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value)
+
+    def render_sample(self, key, value):
+        """
+        Returns the cumulative bucket, sum and count lines of one sample.
+        """
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{self.format_labels(key, [("le", format_number(bound))])} {cumulative}')
+        lines.append(f'{self.name}_sum{self.format_labels(key)} {format_number(total)}')
+        lines.append(f'{self.name}_count{self.format_labels(key)} {cumulative}')
+        return lines
+
+
+def escape(value):
+    """
+    Escapes a label value for the exposition format.
+    """
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_number(value):
+    """
+    Formats a sample value or bucket bound.
+    """
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce and send a response.',
+                            ('method', 'view', 'status'))
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'Database queries run per request.',
+                            ('method', 'view'), QUERY_COUNT_BUCKETS)
+REQUEST_QUERY_TIME = Histogram('http_request_db_query_duration_seconds', 'Time spent in database queries per request.',
+                               ('method', 'view'))
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Size of the response bodies.', ('method', 'view'), SIZE_BUCKETS)
+REPEATED_QUERIES = Counter('http_request_repeated_queries_total',
+                           'Requests repeating the same query often enough to suggest an N+1 pattern.', ('view',))
+
+INGEST_ROWS = Counter('ingest_rows_total', 'Rows written by ingestion.', ('source',))
+INGEST_FAILED_ROWS = Counter('ingest_failed_rows_total', 'Rows skipped by ingestion.', ('source',))
+INGEST_BATCH_DURATION = Histogram('ingest_batch_duration_seconds', 'Time to write an ingestion batch.', ('source',),
+                                  BATCH_BUCKETS)
+INGEST_PHASE_DURATION = Histogram('ingest_phase_duration_seconds', 'Time spent per ingestion phase and run.',
+                                  ('source', 'phase'), PHASE_BUCKETS)
+INGEST_ROWS_PER_SECOND = Gauge('ingest_rows_per_second', 'Throughput of the last ingestion run.', ('source',))
+
+
+def render_metrics():
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    return '\n'.join(line for metric in REGISTRY for line in metric.render()) + '\n'
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """
+    Write a structured log line: a JSON object with an event name and its fields.
+    """
+    logger.log(level, json.dumps({'event': event, **fields}, default=str))
+
+
+def record_ingestion(stats):
+    """
+    Record the outcome of an ingestion run in the metrics and the structured log.
+
+    Args:
+        stats (IngestStats): The stopped stats of the run.
+    """
+    INGEST_ROWS.inc(stats.rows, source=stats.name)
+    INGEST_FAILED_ROWS.inc(stats.failed, source=stats.name)
+    INGEST_ROWS_PER_SECOND.set(stats.rows_per_second, source=stats.name)
+    for phase, seconds in stats.phases.items():
+        INGEST_PHASE_DURATION.observe(seconds, source=stats.name, phase=phase)
+    log_event('ingest', source=stats.name, rows=stats.rows, unchanged=stats.unchanged, failed=stats.failed,
+              invalid=stats.invalid, batches=stats.batches, seconds=round(stats.elapsed, 3),
+              rows_per_second=round(stats.rows_per_second, 1),
+              phases={phase: round(seconds, 3) for phase, seconds in stats.phases.items()},
+              peak_memory=stats.peak_memory)
@@ -0,0 +1,181 @@
+import logging
+import time
+from collections import Counter as QueryCounts
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .metrics import (REPEATED_QUERIES, REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_QUERY_TIME, RESPONSE_SIZE,
+                      log_event)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting the queries of a request, their time, and repeats of the same SQL.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = QueryCounts()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+
+def add_query_recorder(recorder):
+    """
+    Install a QueryRecorder on the database connection of the current thread.
+    """
+    connection.execute_wrappers.append(recorder)
+
+
+def remove_query_recorder(recorder):
+    """
+    Remove a QueryRecorder installed by add_query_recorder.
+    """
+    connection.execute_wrappers.remove(recorder)
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording the latency, database queries and response size of every request,
+    per view, in app.metrics and as a structured log line.
+
+    Streaming responses are measured once fully sent, including the queries run while
+    streaming. Requests repeating the same SQL METRICS_REPEATED_QUERY_COUNT times or
+    more are logged as warnings, as that usually means a query per row (N+1).
+
+    It runs in async mode under ASGI, so async views stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.measure_stream(request, response, response.streaming_content, started, recorder)
+        else:
+            self.record(request, response, started, recorder, len(response.content))
+        return response
+
+    async def __acall__(self, request):
+        """
+        Records the metrics of a request in async mode.
+
+        The async ORM runs the queries of a request on a thread asgiref keeps for it,
+        so the recorder is installed on the connection of that thread.
+        """
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        await sync_to_async(add_query_recorder)(recorder)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(remove_query_recorder)(recorder)
+            raise
+        if response.streaming and response.is_async:
+            response.streaming_content = self.ameasure_stream(request, response, response.streaming_content, started, recorder)
+            return response
+        await sync_to_async(remove_query_recorder)(recorder)
+        if response.streaming:
+            response.streaming_content = self.measure_stream(request, response, response.streaming_content, started, recorder)
+        else:
+            self.record(request, response, started, recorder, len(response.content))
+        return response
+
+    async def ameasure_stream(self, request, response, chunks, started, recorder):
+        """
+        Yields the chunks of a response streamed from an async iterator, then records its metrics.
+        """
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            await sync_to_async(remove_query_recorder)(recorder)
+        self.record(request, response, started, recorder, size)
+
+    def measure_stream(self, request, response, chunks, started, recorder):
+        """
+        Yields the chunks of a streaming response, then records its metrics.
+        """
+        size = 0
+        with connection.execute_wrapper(recorder):
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        self.record(request, response, started, recorder, size)
+
+    def record(self, request, response, started, recorder, size):
+        """
+        Record the metrics of a finished request.
+        """
+        seconds = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUEST_LATENCY.observe(seconds, method=request.method, view=view, status=response.status_code)
+        REQUEST_QUERIES.observe(recorder.count, method=request.method, view=view)
+        REQUEST_QUERY_TIME.observe(recorder.seconds, method=request.method, view=view)
+        RESPONSE_SIZE.observe(size, method=request.method, view=view)
+
+        fields = {
+            'method': request.method, 'path': request.path, 'view': view, 'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 2), 'queries': recorder.count,
+            'query_ms': round(recorder.seconds * 1000, 2), 'bytes': size,
+        }
+        log_event('request', **fields)
+        sql, repeats = recorder.statements.most_common(1)[0] if recorder.statements else ('', 0)
+        if repeats >= getattr(settings, 'METRICS_REPEATED_QUERY_COUNT', 10):
+            REPEATED_QUERIES.inc(view=view)
+            log_event('repeated_query', logging.WARNING, view=view, repeats=repeats, sql=sql[:500])
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise's static file middleware, able to run in async mode as well.
+
+    WhiteNoise only runs synchronously, and under ASGI a synchronous middleware moves
+    every request that passes through it to a thread. Here the lookup of a static
+    file is done on the event loop, and only reading the file is done in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        """
+        Serves a static file, or passes the request on, in async mode.
+        """
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
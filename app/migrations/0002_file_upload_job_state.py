@@ -0,0 +1,148 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='The duration of the last processing job, in seconds.', null=True),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='error',
+            field=models.TextField(blank=True, default='', help_text='The error raised by the last failed processing job.'),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, help_text='The date and time the processing job finished.', null=True),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, help_text='The date and time the file was queued for processing.', null=True),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_done',
+            field=models.IntegerField(default=0, help_text='The number of rows written by the processing job so far.'),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_failed',
+            field=models.IntegerField(default=0, help_text='The number of rows the processing job skipped.'),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='The date and time the processing job started.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, help_text='The date and time the comment was created.'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='text',
+            field=models.TextField(help_text='The content of the comment.'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='The date and time the comment was last updated.'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='user',
+            field=models.CharField(help_text='The user who made the comment.', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='confirmed',
+            field=models.IntegerField(help_text='The number of confirmed cases.'),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='country_region',
+            field=models.CharField(help_text='The country or region of the observation.', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='deaths',
+            field=models.IntegerField(help_text='The number of deaths.'),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='last_update',
+            field=models.DateTimeField(help_text='The timestamp of the last update to this data.'),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='observation_date',
+            field=models.DateField(help_text='The date on which the data was observed.'),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='province_state',
+            field=models.CharField(blank=True, help_text='The province or state of the observation, if applicable.', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='recovered',
+            field=models.IntegerField(help_text='The number of recoveries.'),
+        ),
+        migrations.AlterField(
+            model_name='fileupload',
+            name='file',
+            field=models.FileField(help_text='The path to the uploaded file.', upload_to='uploads/'),
+        ),
+        migrations.AlterField(
+            model_name='fileupload',
+            name='status',
+            field=models.CharField(default='Uploaded', help_text='The current status of the file processing (e.g., Uploaded, Queued, Processing, Processed, Failed).', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='fileupload',
+            name='title',
+            field=models.CharField(help_text='The title or name of the file.', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='confirmed',
+            field=models.IntegerField(blank=True, help_text='The number of confirmed cases on this date.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='country_region',
+            field=models.CharField(help_text='The country or region for this entry.', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='date',
+            field=models.DateField(help_text='The date for this entry of the time series data.'),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='deaths',
+            field=models.IntegerField(blank=True, help_text='The number of deaths on this date.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='province_state',
+            field=models.CharField(blank=True, help_text='The province or state for this entry, if applicable.', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='recovered',
+            field=models.IntegerField(blank=True, help_text='The number of recoveries on this date.', null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:29
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    """
+    Backfill the daily and monthly rollups from the existing Covid19Data rows.
+    """
+    Covid19Data = apps.get_model('app', 'Covid19Data')
+    Covid19Rollup = apps.get_model('app', 'Covid19Rollup')
+    totals = {f'total_{metric}': Sum(metric) for metric in ('confirmed', 'deaths', 'recovered')}
+
+    def rollup(granularity, period_start, country_region, row):
+        return Covid19Rollup(
+            granularity=granularity, period_start=period_start, country_region=country_region,
+            confirmed=row['total_confirmed'] or 0, deaths=row['total_deaths'] or 0, recovered=row['total_recovered'] or 0)
+
+    rollups = [
+        rollup('day', row['observation_date'], row.get('country_region', ''), row)
+        for fields in (['observation_date', 'country_region'], ['observation_date'])
+        for row in Covid19Data.objects.values(*fields).annotate(**totals).order_by()
+    ]
+    Covid19Rollup.objects.bulk_create(rollups, batch_size=1000)
+    rollups = [
+        rollup('month', row['month'], row['country_region'], row)
+        for row in Covid19Rollup.objects.filter(granularity='day').annotate(month=TruncMonth('period_start')).values(
+            'month', 'country_region').annotate(**totals).order_by()
+    ]
+    Covid19Rollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_file_upload_job_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Covid19Rollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], help_text='Whether the row totals a day or a month.', max_length=5)),
+                ('period_start', models.DateField(help_text='The day, or the first day of the month, that the totals cover.')),
+                ('country_region', models.CharField(blank=True, default='', help_text='The country or region of the totals, or empty for global totals.', max_length=100)),
+                ('confirmed', models.BigIntegerField(default=0, help_text='The total number of confirmed cases.')),
+                ('deaths', models.BigIntegerField(default=0, help_text='The total number of deaths.')),
+                ('recovered', models.BigIntegerField(default=0, help_text='The total number of recoveries.')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='covid19rollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'country_region', 'period_start'), name='unique_covid19_rollup'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:30
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_time_series(apps, schema_editor):
+    """
+    Keep only the newest TimeSeriesData row of each (country_region, province_state, date) key.
+    """
+    TimeSeriesData = apps.get_model('app', 'TimeSeriesData')
+    duplicates = TimeSeriesData.objects.values('country_region', 'province_state', 'date').annotate(
+        keep=Max('id'), rows=Count('id')).filter(rows__gt=1).order_by()
+    for row in duplicates.iterator():
+        TimeSeriesData.objects.filter(
+            country_region=row['country_region'], province_state=row['province_state'], date=row['date']
+        ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_covid19_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='covid19data',
+            index=models.Index(fields=['observation_date'], name='covid19data_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='covid19data',
+            index=models.Index(fields=['country_region', 'observation_date'], name='covid19data_country_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeseriesdata',
+            index=models.Index(fields=['date'], name='timeseriesdata_date_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_time_series, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='timeseriesdata',
+            constraint=models.UniqueConstraint(fields=('country_region', 'province_state', 'date'), name='unique_timeseriesdata_region_date'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='The dataset the version belongs to (e.g., covid19data, timeseriesdata).', max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0, help_text='The number of times the dataset has changed.')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time the dataset last changed.')),
+            ],
+        ),
+    ]
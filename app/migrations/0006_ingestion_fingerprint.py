@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='The dataset the file holds (e.g., covid_19_data, time_series_covid_19_confirmed).', max_length=100)),
+                ('key', models.CharField(help_text="What the hash covers: 'file', a row key, or a date column.", max_length=255)),
+                ('digest', models.CharField(help_text='The hash of the content.', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time the hash was recorded.')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ingestionfingerprint',
+            constraint=models.UniqueConstraint(fields=('source', 'key'), name='unique_ingestion_fingerprint'),
+        ),
+    ]
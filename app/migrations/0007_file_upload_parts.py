@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_ingestion_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='bytes_ingested',
+            field=models.BigIntegerField(default=0, help_text='The offset of the first byte of the file not loaded yet.'),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='chunked',
+            field=models.BooleanField(default=False, help_text='Whether the file is uploaded in numbered parts.'),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='part_count',
+            field=models.PositiveIntegerField(blank=True, help_text='The number of parts of a chunked upload, set once every part was sent.', null=True),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='parts_assembled',
+            field=models.PositiveIntegerField(default=0, help_text='The number of leading parts appended to the file so far.'),
+        ),
+        migrations.CreateModel(
+            name='FileUploadPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(help_text='The position of the part in the file, starting at 1.')),
+                ('size', models.BigIntegerField(help_text='The size of the part in bytes.')),
+                ('sha256', models.CharField(help_text='The SHA-256 hex digest of the part, verified on receipt.', max_length=64)),
+                ('received_at', models.DateTimeField(auto_now=True, help_text='The date and time the part was last received.')),
+                ('file_upload', models.ForeignKey(help_text='The upload the part belongs to.', on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='app.fileupload')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='fileuploadpart',
+            constraint=models.UniqueConstraint(fields=('file_upload', 'number'), name='unique_file_upload_part'),
+        ),
+    ]
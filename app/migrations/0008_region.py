@@ -0,0 +1,131 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:02
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def link_regions(apps, schema_editor):
+    """
+    Create a Region per distinct (country_region, province_state) of the data rows, and point the rows at it.
+
+    The names are deduplicated here, as the unique_region index is only created at the
+    end of the migration. Each table is then updated in place by a single UPDATE with
+    a correlated subquery.
+    """
+    Region = apps.get_model('app', 'Region')
+    models = [apps.get_model('app', model_name) for model_name in ('Covid19Data', 'TimeSeriesData')]
+    regions = {
+        (country, province or None)
+        for model in models
+        for country, province in model.objects.values_list('country_region', 'province_state').distinct().order_by().iterator()
+    }
+    Region.objects.bulk_create([Region(country_region=country, province_state=province)
+                                for country, province in sorted(regions, key=lambda region: (region[0], region[1] or ''))],
+                               batch_size=1000)
+    region = Region.objects.annotate(province=Coalesce('province_state', Value(''))).filter(
+        country_region=OuterRef('country_region'),
+        province=Coalesce(OuterRef('province_state'), Value('')),
+    ).values('pk')[:1]
+    for model in models:
+        model.objects.update(region=Subquery(region))
+
+
+def unlink_regions(apps, schema_editor):
+    """
+    Copy the region names back onto the data rows.
+    """
+    Region = apps.get_model('app', 'Region')
+    for model_name in ('Covid19Data', 'TimeSeriesData'):
+        model = apps.get_model('app', model_name)
+        model.objects.update(
+            country_region=Subquery(Region.objects.filter(pk=OuterRef('region')).values('country_region')[:1]),
+            province_state=Subquery(Region.objects.filter(pk=OuterRef('region')).values('province_state')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_file_upload_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Region',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_region', models.CharField(help_text='The country or region.', max_length=100)),
+                ('province_state', models.CharField(blank=True, help_text='The province or state, if applicable.', max_length=100, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(models.F('country_region'), django.db.models.functions.comparison.Coalesce('province_state', models.Value('')), name='unique_region')],
+            },
+        ),
+        migrations.AddField(
+            model_name='covid19data',
+            name='region',
+            field=models.ForeignKey(help_text='The country or region, and province or state, of the observation.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='covid19_data', to='app.region'),
+        ),
+        migrations.AddField(
+            model_name='timeseriesdata',
+            name='region',
+            field=models.ForeignKey(help_text='The country or region, and province or state, for this entry.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='time_series_data', to='app.region'),
+        ),
+        # Nullable while the names are removed, so that reversing can add them back before filling them
+        migrations.AlterField(
+            model_name='covid19data',
+            name='country_region',
+            field=models.CharField(help_text='The country or region of the observation.', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='country_region',
+            field=models.CharField(help_text='The country or region for this entry.', max_length=100, null=True),
+        ),
+        migrations.RunPython(link_regions, unlink_regions),
+        migrations.RemoveIndex(
+            model_name='covid19data',
+            name='covid19data_country_date_idx',
+        ),
+        migrations.RemoveConstraint(
+            model_name='timeseriesdata',
+            name='unique_timeseriesdata_region_date',
+        ),
+        migrations.RemoveField(
+            model_name='covid19data',
+            name='country_region',
+        ),
+        migrations.RemoveField(
+            model_name='covid19data',
+            name='province_state',
+        ),
+        migrations.RemoveField(
+            model_name='timeseriesdata',
+            name='country_region',
+        ),
+        migrations.RemoveField(
+            model_name='timeseriesdata',
+            name='province_state',
+        ),
+        migrations.AlterField(
+            model_name='covid19data',
+            name='region',
+            field=models.ForeignKey(help_text='The country or region, and province or state, of the observation.', on_delete=django.db.models.deletion.PROTECT, related_name='covid19_data', to='app.region'),
+        ),
+        migrations.AlterField(
+            model_name='timeseriesdata',
+            name='region',
+            field=models.ForeignKey(help_text='The country or region, and province or state, for this entry.', on_delete=django.db.models.deletion.PROTECT, related_name='time_series_data', to='app.region'),
+        ),
+        migrations.AddIndex(
+            model_name='covid19data',
+            index=models.Index(fields=['region', 'observation_date'], name='covid19data_region_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeseriesdata',
+            constraint=models.UniqueConstraint(fields=('region', 'date'), name='unique_timeseriesdata_region_date'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_region'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='The date and time the processing job last reported progress.', null=True),
+        ),
+    ]
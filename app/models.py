@@ -1,4 +1,26 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+class Region(models.Model):
+    """
+    Model representing a country or region, or a province or state within it, referenced by the
+    data rows through a small integer key instead of repeating the names on every row.
+    """
+    country_region = models.CharField(max_length=100, help_text="The country or region.")
+    province_state = models.CharField(max_length=100, null=True, blank=True, help_text="The province or state, if applicable.")
+
+    class Meta:
+        constraints = [
+            # A missing province is NULL, which unique constraints would not compare as equal
+            models.UniqueConstraint('country_region', Coalesce('province_state', Value('')), name='unique_region'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the object, which is helpful for admin displays.
+        """
+        return f"{self.country_region} - {self.province_state}" if self.province_state else self.country_region
 
 class Covid19Data(models.Model):
     """
@@ -6,35 +28,47 @@ class Covid19Data(models.Model):
     regions, and case counts.
     """
     observation_date = models.DateField(help_text="The date on which the data was observed.")
-    province_state = models.CharField(max_length=100, null=True, blank=True, help_text="The province or state of the observation, if applicable.")
-    country_region = models.CharField(max_length=100, help_text="The country or region of the observation.")
+    region = models.ForeignKey(Region, on_delete=models.PROTECT, related_name='covid19_data', help_text="The country or region, and province or state, of the observation.")
     last_update = models.DateTimeField(help_text="The timestamp of the last update to this data.")
     confirmed = models.IntegerField(help_text="The number of confirmed cases.")
     deaths = models.IntegerField(help_text="The number of deaths.")
     recovered = models.IntegerField(help_text="The number of recoveries.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['observation_date'], name='covid19data_date_idx'),
+            models.Index(fields=['region', 'observation_date'], name='covid19data_region_date_idx'),
+        ]
+
     def __str__(self):
         """
         Returns a string representation of the object, which is helpful for admin displays.
         """
-        return f"{self.country_region} - {self.observation_date}"
+        return f"{self.region} - {self.observation_date}"
 
 class TimeSeriesData(models.Model):
     """
     Model to store time series data for COVID-19, allowing tracking of cases over time within specific regions.
     """
     date = models.DateField(help_text="The date for this entry of the time series data.")
-    country_region = models.CharField(max_length=100, help_text="The country or region for this entry.")
-    province_state = models.CharField(max_length=100, null=True, blank=True, help_text="The province or state for this entry, if applicable.")
+    region = models.ForeignKey(Region, on_delete=models.PROTECT, related_name='time_series_data', help_text="The country or region, and province or state, for this entry.")
     confirmed = models.IntegerField(null=True, blank=True, help_text="The number of confirmed cases on this date.")
     deaths = models.IntegerField(null=True, blank=True, help_text="The number of deaths on this date.")
     recovered = models.IntegerField(null=True, blank=True, help_text="The number of recoveries on this date.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='timeseriesdata_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'date'], name='unique_timeseriesdata_region_date'),
+        ]
+
     def __str__(self):
         """
         Returns a string representation of the object, which is helpful for admin displays.
         """
-        return f"{self.country_region} - {self.date}"
+        return f"{self.region} - {self.date}"
 
 class FileUpload(models.Model):
     """
@@ -43,7 +77,19 @@ class FileUpload(models.Model):
     """
     title = models.CharField(max_length=100, help_text="The title or name of the file.")
     file = models.FileField(upload_to='uploads/', help_text="The path to the uploaded file.")
-    status = models.CharField(max_length=50, default='Uploaded', help_text="The current status of the file processing (e.g., Uploaded, Processing, Completed).")
+    status = models.CharField(max_length=50, default='Uploaded', help_text="The current status of the file processing (e.g., Uploaded, Queued, Processing, Processed, Failed).")
+    rows_done = models.IntegerField(default=0, help_text="The number of rows written by the processing job so far.")
+    rows_failed = models.IntegerField(default=0, help_text="The number of rows the processing job skipped.")
+    duration = models.FloatField(null=True, blank=True, help_text="The duration of the last processing job, in seconds.")
+    error = models.TextField(blank=True, default='', help_text="The error raised by the last failed processing job.")
+    queued_at = models.DateTimeField(null=True, blank=True, help_text="The date and time the file was queued for processing.")
+    started_at = models.DateTimeField(null=True, blank=True, help_text="The date and time the processing job started.")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="The date and time the processing job last reported progress.")
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="The date and time the processing job finished.")
+    chunked = models.BooleanField(default=False, help_text="Whether the file is uploaded in numbered parts.")
+    part_count = models.PositiveIntegerField(null=True, blank=True, help_text="The number of parts of a chunked upload, set once every part was sent.")
+    parts_assembled = models.PositiveIntegerField(default=0, help_text="The number of leading parts appended to the file so far.")
+    bytes_ingested = models.BigIntegerField(default=0, help_text="The offset of the first byte of the file not loaded yet.")
 
     def __str__(self):
         """
@@ -51,6 +97,29 @@ class FileUpload(models.Model):
         """
         return self.title
 
+
+class FileUploadPart(models.Model):
+    """
+    Model to represent a received part of a chunked FileUpload. The part's own file is deleted once it is
+    appended to the upload's file; the row remains as the record of its size and checksum.
+    """
+    file_upload = models.ForeignKey(FileUpload, on_delete=models.CASCADE, related_name='parts', help_text="The upload the part belongs to.")
+    number = models.PositiveIntegerField(help_text="The position of the part in the file, starting at 1.")
+    size = models.BigIntegerField(help_text="The size of the part in bytes.")
+    sha256 = models.CharField(max_length=64, help_text="The SHA-256 hex digest of the part, verified on receipt.")
+    received_at = models.DateTimeField(auto_now=True, help_text="The date and time the part was last received.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['file_upload', 'number'], name='unique_file_upload_part'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the object, which is helpful for admin displays.
+        """
+        return f"{self.file_upload} - part {self.number}"
+
 class Comment(models.Model):
     """
     Model for storing comments made by users, potentially about the data or the application.
@@ -64,4 +133,69 @@ class Comment(models.Model):
         """
         Returns a string that includes the commenter's name, useful for admin displays.
         """
-        return f"Comment by {self.user}"
\ No newline at end of file
+        return f"Comment by {self.user}"
+
+class Covid19Rollup(models.Model):
+    """
+    Model holding precomputed totals of Covid19Data per day or per month, for the whole world
+    (empty country_region) and for each country, so aggregate queries do not scan the raw rows.
+    """
+    DAY = 'day'
+    MONTH = 'month'
+    GRANULARITY_CHOICES = [(DAY, 'Day'), (MONTH, 'Month')]
+
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES, help_text="Whether the row totals a day or a month.")
+    period_start = models.DateField(help_text="The day, or the first day of the month, that the totals cover.")
+    country_region = models.CharField(max_length=100, blank=True, default='', help_text="The country or region of the totals, or empty for global totals.")
+    confirmed = models.BigIntegerField(default=0, help_text="The total number of confirmed cases.")
+    deaths = models.BigIntegerField(default=0, help_text="The total number of deaths.")
+    recovered = models.BigIntegerField(default=0, help_text="The total number of recoveries.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'country_region', 'period_start'], name='unique_covid19_rollup'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the object, which is helpful for admin displays.
+        """
+        return f"{self.country_region or 'Global'} - {self.granularity} {self.period_start}"
+
+
+class DataVersion(models.Model):
+    """
+    Model holding a version counter per dataset, bumped whenever the dataset changes so that
+    cached API responses built from older data are no longer used.
+    """
+    name = models.CharField(max_length=50, unique=True, help_text="The dataset the version belongs to (e.g., covid19data, timeseriesdata).")
+    version = models.PositiveBigIntegerField(default=0, help_text="The number of times the dataset has changed.")
+    updated_at = models.DateTimeField(auto_now=True, help_text="The date and time the dataset last changed.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the object, which is helpful for admin displays.
+        """
+        return f"{self.name} v{self.version}"
+
+
+class IngestionFingerprint(models.Model):
+    """
+    Model holding the content hash of an ingested file, of one of its rows, or of one of its
+    date columns, so that re-ingesting a file only writes what changed since the last load.
+    """
+    source = models.CharField(max_length=100, help_text="The dataset the file holds (e.g., covid_19_data, time_series_covid_19_confirmed).")
+    key = models.CharField(max_length=255, help_text="What the hash covers: 'file', a row key, or a date column.")
+    digest = models.CharField(max_length=64, help_text="The hash of the content.")
+    updated_at = models.DateTimeField(auto_now=True, help_text="The date and time the hash was recorded.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'key'], name='unique_ingestion_fingerprint'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the object, which is helpful for admin displays.
+        """
+        return f"{self.source} - {self.key}"
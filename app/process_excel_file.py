@@ -0,0 +1,855 @@
+import hashlib
+import io
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from app.models import Covid19Data, TimeSeriesData
+from app.cache import COVID19_DATA, TIME_SERIES_DATA, bump_data_version
+from app.columnar import get_store_root, refresh_stores
+from app.db import bulk_insert
+from app.metrics import INGEST_BATCH_DURATION, record_ingestion
+from app.fingerprints import FILE_KEY, get_file_digest, get_fingerprint, get_fingerprints, get_row_digests, save_fingerprints
+from app.regions import get_region_ids
+from app.rollups import refresh_rollups
+from app.uploads import assemble_parts, get_complete_lines_end, get_upload_path, is_assembled
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Region columns of the wide time_series_covid_19_* files
+TIME_SERIES_ID_COLUMNS = ['Province/State', 'Country/Region']
+
+# Columns parsed from covid_19_data.csv, the ones identifying a row, and the Covid19Data fields rewritten when it changes
+COVID19_FIELDS = ['observation_date', 'province_state', 'country_region', 'last_update', 'confirmed', 'deaths', 'recovered']
+COVID19_KEY_FIELDS = ['observation_date', 'province_state', 'country_region']
+COVID19_UPDATE_FIELDS = ['last_update', 'confirmed', 'deaths', 'recovered']
+
+# IngestionFingerprint sources of the data files
+COVID19_SOURCE = 'covid_19_data'
+TIME_SERIES_SOURCE = 'time_series_covid_19_{}'
+
+# Date formats found in the COVID-19 files, in the order detect_date_format and parse_date_column try them
+DATE_FORMATS = ('%m/%d/%Y %H:%M', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S', '%m/%d/%y %H:%M', '%Y-%m-%dT%H:%M:%S', '%m/%d/%y')
+
+
+def get_peak_memory():
+    """
+    Returns the peak resident set size of the process in bytes, or None where it is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes
+
+
+def split_csv(filepath, parts):
+    """
+    Split the rows of a CSV file into byte ranges ending on line boundaries.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        parts (int): The number of ranges to aim for.
+
+    Returns:
+        list: (start, end) byte offsets covering every line after the header.
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as file:
+        file.readline()  # Skip the header row
+        start = file.tell()
+    return split_range(filepath, start, size, max((size - start) // parts, 1))
+
+
+def split_range(filepath, start, end, step):
+    """
+    Split the lines of a CSV file between two byte offsets into ranges of about step bytes.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        start (int): Offset of the first line.
+        end (int): Offset just past the last line, or the size of the file.
+        step (int): The size of the ranges to aim for.
+
+    Returns:
+        list: (start, end) byte offsets ending on line boundaries.
+    """
+    ranges = []
+    with open(filepath, 'rb') as file:
+        while start < end:
+            file.seek(min(start + step, end))
+            if file.tell() < end:
+                file.readline()  # Move to the end of the current line
+            stop = min(file.tell(), end)
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def parse_covid19_range(filepath, start, end):
+    """
+    Parse the covid_19_data.csv rows stored between two byte offsets.
+
+    Runs in the worker processes of ProcessExcelFile.load_covid19_data_parallel,
+    so it only parses and never touches the database.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        start (int): Offset of the first line.
+        end (int): Offset just past the last line.
+
+    Returns:
+        tuple: (frame, failed, invalid) as returned by ProcessExcelFile.parse_covid19_frame.
+    """
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start).decode('utf-8')
+    # Named columns, so a range starting with a short row pads it instead of taking its width for every row
+    df = pd.read_csv(io.StringIO(data), header=None, names=range(8), dtype=str, keep_default_na=False)
+    return ProcessExcelFile().parse_covid19_frame(df)
+
+
+class IngestStats:
+    """
+    Counters and timings collected while loading a file, used to report ingestion
+    throughput. When stopped they are recorded in app.metrics and the structured log.
+    """
+    def __init__(self, progress=None, name='ingest'):
+        """
+        Initialize the counters and start the clock.
+
+        Args:
+            progress (callable, optional): Called with the stats after every written batch.
+            name (str, optional): The dataset being loaded, used as the metrics label.
+        """
+        self.progress = progress
+        self.name = name
+        self.rows = 0
+        self.failed = 0
+        self.invalid = 0
+        self.unchanged = 0
+        self.batches = 0
+        self.phases = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.peak_memory = None
+
+    def record_batch(self, rows, seconds=None):
+        """
+        Count a written batch and report progress.
+
+        Args:
+            rows (int): The number of rows in the batch.
+            seconds (float, optional): The time it took to write the batch.
+        """
+        self.rows += rows
+        self.batches += 1
+        if seconds is not None:
+            INGEST_BATCH_DURATION.observe(seconds, source=self.name)
+        if self.progress:
+            self.progress(self)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager adding the time spent in its block to the named phase.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def stop(self):
+        """
+        Stop the clock, record the elapsed time and peak memory, and report the run.
+        """
+        self.elapsed = time.perf_counter() - self.started
+        self.peak_memory = get_peak_memory()
+        record_ingestion(self)
+        return self
+
+    @property
+    def rows_per_second(self):
+        """
+        Returns the ingestion throughput in rows per second.
+        """
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        """
+        Returns a human readable summary of the ingestion run.
+        """
+        summary = (f'{self.rows} rows in {self.batches} batches, {self.unchanged} unchanged, {self.failed} skipped, '
+                   f'{self.invalid} unparseable values stored as 0, '
+                   f'{self.elapsed:.2f}s ({self.rows_per_second:.0f} rows/s)')
+        if self.phases:
+            summary += ' [' + ', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.phases.items()) + ']'
+        if self.peak_memory:
+            summary += f', peak RSS {self.peak_memory / 2 ** 20:.0f} MB'
+        return summary
+
+
+class ProcessExcelFile:
+    """
+    This class provides methods to process Excel files containing COVID-19 data
+    and load them into the database.
+    """
+    def __init__(self):
+        """
+        Initialize the ProcessExcelFile instance.
+        """
+        pass
+
+    def get_batch_size(self, batch_size=None):
+        """
+        Returns the number of rows written per batch.
+
+        Args:
+            batch_size (int, optional): Explicit batch size; defaults to settings.INGEST_BATCH_SIZE.
+        """
+        return batch_size or getattr(settings, 'INGEST_BATCH_SIZE', 5000)
+
+    def process_upload(self, file_upload, batch_size=None, progress=None):
+        """
+        Load an uploaded file, choosing the loader from the file title.
+
+        Args:
+            file_upload (FileUpload): The uploaded file to load.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+
+        Raises:
+            FileNotFoundError: If the file is missing or empty.
+            ValueError: If the title does not match a known data file.
+        """
+        file_path = os.path.join(settings.MEDIA_ROOT, file_upload.file.name)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            raise FileNotFoundError(f'File {file_path} is empty or does not exist')
+
+        # Determine which type of data to load based on the file title
+        title = file_upload.title.lower()
+        if 'covid_19_data' in title:
+            return self.load_covid19_data(file_path, batch_size=batch_size, progress=progress)
+        for data_type in ('confirmed', 'deaths', 'recovered'):
+            if f'time_series_covid_19_{data_type}' in title:
+                return self.load_time_series_data(file_path, data_type, batch_size=batch_size, progress=progress)
+        raise ValueError(f'Cannot tell which data {file_upload.title} holds')
+
+    def process_chunked_upload(self, file_upload, batch_size=None, progress=None):
+        """
+        Assemble the parts of a chunked upload that arrived, and load what can be loaded so far.
+
+        covid_19_data files are loaded incrementally: each run loads the complete
+        lines appended since the last one, from FileUpload.bytes_ingested, so
+        ingestion starts while the remaining parts upload. Other files are loaded
+        whole once every part was assembled.
+
+        Args:
+            file_upload (FileUpload): The chunked upload.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+
+        Returns:
+            tuple: (stats, finished): the IngestStats of this run, or None when nothing
+                could be loaded yet, and whether the whole file is now loaded.
+        """
+        assemble_parts(file_upload)
+        finished = is_assembled(file_upload)
+        if 'covid_19_data' not in file_upload.title.lower():
+            return (self.process_upload(file_upload, batch_size, progress) if finished else None), finished
+
+        file_path = get_upload_path(file_upload)
+        start = file_upload.bytes_ingested
+        if start == 0:
+            with open(file_path, 'rb') as file:
+                header = file.readline()
+            start = len(header) if header.endswith(b'\n') else 0  # Rows start after a complete header
+        end = os.path.getsize(file_path) if finished else get_complete_lines_end(file_path)
+        if start == 0 or end <= start:
+            return None, finished
+        stats = self.load_covid19_range(file_path, start, end, batch_size=batch_size, progress=progress)
+        file_upload.bytes_ingested = end
+        file_upload.save(update_fields=['bytes_ingested'])
+        return stats, finished
+
+    def load_covid19_range(self, filepath, start, end, batch_size=None, progress=None, source=COVID19_SOURCE):
+        """
+        Load the covid_19_data.csv rows stored between two byte offsets of a file.
+
+        The range is parsed in blocks of INGEST_PARALLEL_CHUNK_BYTES and written
+        like load_covid19_data does, without recording a hash of the whole file.
+
+        Args:
+            filepath (str): The path to the CSV file.
+            start (int): Offset of the first line, after the header.
+            end (int): Offset just past the last line.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+            source (str, optional): The dataset the file holds, under which its row hashes are recorded.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+        """
+        batch_size = self.get_batch_size(batch_size)
+        block_bytes = getattr(settings, 'INGEST_PARALLEL_CHUNK_BYTES', 4 * 2 ** 20)
+        stats = IngestStats(progress, source)
+        first_date = last_date = None
+        for range_start, range_end in split_range(filepath, start, end, block_bytes):
+            with stats.phase('parse'):
+                frame, failed, invalid = parse_covid19_range(filepath, range_start, range_end)
+            stats.failed += failed
+            stats.invalid += invalid
+            for offset in range(0, len(frame), batch_size):
+                written = self.upsert_covid19_frame(frame.iloc[offset:offset + batch_size], source, stats)
+                if written is not None:
+                    first_date = min(first_date or written[0], written[0])
+                    last_date = max(last_date or written[1], written[1])
+        if first_date is not None:
+            self.refresh_covid19_dates(first_date, last_date, stats)
+        stats.stop()
+        print(f'COVID-19 data loaded successfully from bytes {start}-{end}: {stats}')
+        return stats
+
+    def load_covid19_data(self, filepath, batch_size=None, progress=None, source=COVID19_SOURCE):
+        """
+        Load COVID-19 data from a CSV file into the database.
+
+        The file is streamed in chunks of batch_size rows; each chunk is parsed
+        column by column and only its new and changed rows are written (see
+        upsert_covid19_frame), so memory stays flat regardless of the file size
+        and reloading a file costs time proportional to what changed. A file
+        identical to the last one loaded is skipped. The rollups of the written
+        dates are refreshed afterwards.
+
+        Args:
+            filepath (str): The path to the CSV file.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+            source (str, optional): The dataset the file holds, under which its hashes are recorded.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+        """
+        batch_size = self.get_batch_size(batch_size)
+        stats = IngestStats(progress, source)
+        with stats.phase('hash'):
+            file_digest = get_file_digest(filepath)
+        if get_fingerprint(source, FILE_KEY) == file_digest:
+            stats.stop()
+            print(f'COVID-19 data unchanged since the last load of {source}, nothing to do')
+            return stats
+        try:
+            reader = pd.read_csv(filepath, dtype=str, keep_default_na=False, chunksize=batch_size)
+        except pd.errors.EmptyDataError:
+            raise ValueError("CSV file is empty or incorrectly formatted")
+
+        first_date = last_date = None
+        date_formats = {}  # Detected once from the first chunk, reused for the rest of the file
+        with reader:
+            for chunk in reader:
+                with stats.phase('parse'):
+                    frame, failed, invalid = self.parse_covid19_frame(chunk, date_formats)
+                stats.failed += failed
+                stats.invalid += invalid
+                written = self.upsert_covid19_frame(frame, source, stats)
+                if written is not None:
+                    first_date = min(first_date or written[0], written[0])
+                    last_date = max(last_date or written[1], written[1])
+        if first_date is not None:
+            self.refresh_covid19_dates(first_date, last_date, stats)
+        save_fingerprints(source, {FILE_KEY: file_digest})
+        stats.stop()
+        print(f'COVID-19 data loaded successfully: {stats}')
+        return stats
+
+    def load_covid19_data_parallel(self, filepaths, workers=None, batch_size=None, progress=None, source=COVID19_SOURCE):
+        """
+        Load COVID-19 data from one or more CSV files, parsing them in parallel.
+
+        Each file is split into byte ranges that worker processes parse; the
+        parsed rows are funnelled back to this process, the single writer, which
+        writes their new and changed rows in batches so SQLite never sees
+        competing writers. At most two ranges per worker are in flight, which
+        bounds memory. Files identical to the last load of their name are skipped.
+
+        Args:
+            filepaths (list): Paths of covid_19_data.csv-shaped files, each with a header row.
+            workers (int, optional): Number of worker processes; defaults to the number of CPUs.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+            source (str, optional): The dataset the files hold, under which their hashes are recorded.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+        """
+        workers = workers or os.cpu_count() or 1
+        batch_size = self.get_batch_size(batch_size)
+        chunk_bytes = getattr(settings, 'INGEST_PARALLEL_CHUNK_BYTES', 4 * 2 ** 20)
+        stats = IngestStats(progress, source)
+        with stats.phase('hash'):
+            file_digests = {f'{FILE_KEY}:{os.path.basename(filepath)}': get_file_digest(filepath) for filepath in filepaths}
+        known = get_fingerprints(source, f'{FILE_KEY}:', f'{FILE_KEY};')
+        filepaths = [filepath for filepath, (key, digest) in zip(filepaths, file_digests.items()) if known.get(key) != digest]
+        tasks = iter([
+            (filepath, start, end)
+            for filepath in filepaths
+            for start, end in split_csv(filepath, max(workers, math.ceil(os.path.getsize(filepath) / chunk_bytes)))
+        ])
+
+        first_date = last_date = None
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            pending = {pool.submit(parse_covid19_range, *task) for task, _ in zip(tasks, range(workers * 2))}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    frame, failed, invalid = future.result()
+                    stats.failed += failed
+                    stats.invalid += invalid
+                    for start in range(0, len(frame), batch_size):
+                        written = self.upsert_covid19_frame(frame.iloc[start:start + batch_size], source, stats)
+                        if written is not None:
+                            first_date = min(first_date or written[0], written[0])
+                            last_date = max(last_date or written[1], written[1])
+                    task = next(tasks, None)
+                    if task is not None:
+                        pending.add(pool.submit(parse_covid19_range, *task))
+        if first_date is not None:
+            self.refresh_covid19_dates(first_date, last_date, stats)
+        save_fingerprints(source, file_digests)
+        stats.stop()
+        print(f'COVID-19 data loaded successfully with {workers} workers: {stats}')
+        return stats
+
+    def refresh_covid19_dates(self, first_date, last_date, stats):
+        """
+        Refresh the rollups of the observation dates a load wrote, and the columnar store when enabled.
+        """
+        with stats.phase('rollups'):
+            refresh_rollups(first_date, last_date)
+        if get_store_root() is not None:
+            with stats.phase('columnar'):
+                refresh_stores(COVID19_DATA)
+
+    def parse_covid19_frame(self, df, date_formats=None):
+        """
+        Parse a chunk of covid_19_data.csv rows, read as strings, into Covid19Data columns.
+
+        Columns are converted whole: dates with a format detected once per
+        column, counts with pd.to_numeric. Rows missing columns or holding an
+        unparseable date are dropped; unparseable counts are stored as 0. Both
+        are counted rather than silently absorbed.
+
+        Args:
+            df (DataFrame): The rows, by position (SNo, ObservationDate, Province/State,
+                Country/Region, Last Update, Confirmed, Deaths, Recovered).
+            date_formats (dict, optional): Detected date formats by column position;
+                filled on the first call and reused for later chunks.
+
+        Returns:
+            tuple: (frame, failed, invalid) where frame has the COVID19_FIELDS columns, with region names,
+                failed counts dropped rows and invalid counts counts stored as 0.
+        """
+        date_formats = {} if date_formats is None else date_formats
+        if df.shape[1] < 8:
+            return pd.DataFrame(columns=COVID19_FIELDS), len(df), 0
+        complete = df.iloc[:, 7].notna()  # Rows that don't have enough columns are padded with NaN
+        observation_date, date_formats[1] = self.parse_date_column(df.iloc[:, 1], date_formats.get(1))
+        last_update, date_formats[4] = self.parse_date_column(df.iloc[:, 4], date_formats.get(4))
+        valid = complete & observation_date.notna() & last_update.notna()
+
+        province_state = df.iloc[:, 2][valid]
+        frame = pd.DataFrame({
+            'observation_date': observation_date[valid].dt.date,
+            'province_state': province_state.where(province_state != '', None),
+            'country_region': df.iloc[:, 3][valid],
+            'last_update': last_update[valid].dt.tz_localize(timezone.get_default_timezone()),
+        })
+        invalid = 0
+        for field, position in (('confirmed', 5), ('deaths', 6), ('recovered', 7)):
+            frame[field], column_invalid = self.parse_int_column(df.iloc[:, position][valid])
+            invalid += column_invalid
+        return frame, int((~valid).sum()), invalid
+
+    def build_covid19_objects(self, frame):
+        """
+        Build unsaved Covid19Data instances from a frame returned by parse_covid19_frame,
+        with the region names resolved to Region ids.
+        """
+        region_ids = get_region_ids(zip(frame['country_region'].tolist(), frame['province_state'].tolist()))
+        columns = [frame[field].tolist() for field in COVID19_UPDATE_FIELDS]
+        return [
+            Covid19Data(observation_date=observation_date, region_id=region_id, **dict(zip(COVID19_UPDATE_FIELDS, values)))
+            for observation_date, region_id, *values in zip(frame['observation_date'].tolist(), region_ids, *columns)
+        ]
+
+    def get_covid19_keys(self, frame):
+        """
+        Returns the IngestionFingerprint keys of parsed covid_19_data rows, starting with their ISO date.
+        """
+        return (frame['observation_date'].astype(str) + '|' + frame['province_state'].fillna('') + '|'
+                + frame['country_region']).tolist()
+
+    def upsert_covid19_frame(self, frame, source, stats):
+        """
+        Write the rows of a parsed chunk that are new or changed since the last load of source.
+
+        Each row is hashed and compared with the hash recorded for its key (date,
+        province and country). Changed rows update the Covid19Data row with the
+        same key and new ones are inserted, so reloading never duplicates rows;
+        the rows and their new hashes are written in one transaction. New rows
+        go through bulk_insert, which uses COPY on PostgreSQL.
+
+        Args:
+            frame (DataFrame): Rows returned by parse_covid19_frame.
+            source (str): The dataset the rows belong to.
+            stats (IngestStats): Counters updated with the written and unchanged rows.
+
+        Returns:
+            tuple: The first and last dates of the written rows, or None if nothing changed.
+        """
+        frame = frame.drop_duplicates(subset=COVID19_KEY_FIELDS, keep='last')
+        if frame.empty:
+            return None
+        with stats.phase('diff'):
+            keys = self.get_covid19_keys(frame)
+            digests = get_row_digests(frame[COVID19_FIELDS])
+            known = get_fingerprints(source, min(keys)[:10], max(keys)[:10] + '~')  # Keys sort by date first
+            changed = [index for index, (key, digest) in enumerate(zip(keys, digests)) if known.get(key) != digest]
+            stats.unchanged += len(frame) - len(changed)
+            if not changed:
+                return None
+
+            frame = frame.iloc[changed]
+            first_date, last_date = frame['observation_date'].min(), frame['observation_date'].max()
+            existing = {
+                (observation_date, region_id): pk
+                for pk, observation_date, region_id in Covid19Data.objects.filter(
+                    observation_date__range=(first_date, last_date)
+                ).values_list('id', 'observation_date', 'region_id').iterator()
+            }
+            to_create, to_update = [], []
+            for obj in self.build_covid19_objects(frame):
+                obj.pk = existing.get((obj.observation_date, obj.region_id))
+                (to_create if obj.pk is None else to_update).append(obj)
+
+        started = time.perf_counter()
+        with stats.phase('write'), transaction.atomic():
+            bulk_insert(Covid19Data, to_create, batch_size=len(frame))
+            Covid19Data.objects.bulk_update(to_update, COVID19_UPDATE_FIELDS, batch_size=len(frame))
+            save_fingerprints(source, {keys[index]: digests[index] for index in changed})
+        stats.record_batch(len(frame), time.perf_counter() - started)
+        return first_date, last_date
+
+    def load_time_series_data(self, filepath, data_type, batch_size=None, progress=None):
+        """
+        Load time series data related to COVID-19 from a CSV file.
+
+        The wide file is streamed in bounded blocks (see read_time_series_blocks);
+        each block is melted and merged into TimeSeriesData with a single keyed
+        lookup followed by bulk inserts and bulk updates.
+
+        Args:
+            filepath (str): The path to the CSV file.
+            data_type (str): The type of data (e.g., 'confirmed', 'deaths', 'recovered').
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+        """
+        return self.load_time_series_files({data_type: filepath}, batch_size, progress)
+
+    def load_time_series_files(self, filepaths, batch_size=None, progress=None):
+        """
+        Load several time series files in a single pass.
+
+        The files are streamed in blocks of dates; within a block the long
+        frames are joined on (Province/State, Country/Region, date), and every
+        TimeSeriesData row is written once with all metrics filled in. Each
+        date column is hashed and only the dates whose column changed in any
+        file since the last load are read and written; files identical to the
+        last ones loaded are skipped.
+
+        Args:
+            filepaths (dict): Maps a data type ('confirmed', 'deaths', 'recovered') to its CSV path.
+            batch_size (int, optional): The number of rows written per batch.
+            progress (callable, optional): Called with the IngestStats after every written batch.
+
+        Returns:
+            IngestStats: Row counts and throughput of the load.
+        """
+        label = ", ".join(data_type.capitalize() for data_type in filepaths)
+        sources = {data_type: TIME_SERIES_SOURCE.format(data_type) for data_type in filepaths}
+        stats = IngestStats(progress, ','.join(sources.values()))
+        with stats.phase('hash'):
+            file_digests = {data_type: get_file_digest(filepath) for data_type, filepath in filepaths.items()}
+        if all(get_fingerprint(sources[data_type], FILE_KEY) == digest for data_type, digest in file_digests.items()):
+            stats.stop()
+            print(f'{label} data unchanged since the last load, nothing to do')
+            return stats
+
+        digests, changed_dates = {}, set()
+        with stats.phase('diff'):
+            for data_type, filepath in filepaths.items():
+                digests[data_type] = self.get_time_series_digests(filepath)
+                known = get_fingerprints(sources[data_type])
+                changed_dates.update(date for date, digest in digests[data_type].items() if known.get(date.isoformat()) != digest)
+        blocks = self.read_time_series_blocks(filepaths, stats=stats, dates=changed_dates)
+        while True:
+            with stats.phase('parse'):
+                df = next(blocks, None)
+            if df is None:
+                break
+            self.merge_time_series(df, list(filepaths), stats, batch_size)
+        if changed_dates and get_store_root() is not None:
+            with stats.phase('columnar'):
+                refresh_stores(TIME_SERIES_DATA)
+        for data_type, source in sources.items():
+            save_fingerprints(source, {**{date.isoformat(): digest for date, digest in digests[data_type].items()},
+                                       FILE_KEY: file_digests[data_type]})
+        stats.stop()
+        print(f'{label} data loaded successfully, {len(changed_dates)} dates changed: {stats}')
+        return stats
+
+    def get_date_columns(self, filepath):
+        """
+        Read the header of a wide time series file and map its date columns to dates.
+
+        Args:
+            filepath (str): The path to the CSV file.
+
+        Returns:
+            dict: Column name to date, in file order.
+        """
+        columns = [column for column in pd.read_csv(filepath, nrows=0).columns
+                   if column not in TIME_SERIES_ID_COLUMNS + ['Lat', 'Long']]
+        dates, _ = self.parse_date_column(pd.Series(columns, dtype=object))
+        if dates.isna().any():
+            raise ValueError(f'Unrecognised date columns in {filepath}: {list(dates.index[dates.isna()].map(columns.__getitem__))}')
+        return dict(zip(columns, dates.dt.date))
+
+    def get_time_series_digests(self, filepath, rows_per_chunk=None):
+        """
+        Hash each date column of a wide time series file, together with the region columns.
+
+        Args:
+            filepath (str): The path to the CSV file.
+            rows_per_chunk (int, optional): Rows read at a time; defaults to settings.INGEST_ROWS_PER_CHUNK.
+
+        Returns:
+            dict: Hex digest by date.
+        """
+        rows_per_chunk = rows_per_chunk or getattr(settings, 'INGEST_ROWS_PER_CHUNK', 10000)
+        date_columns = self.get_date_columns(filepath)
+        hashes = {column: hashlib.sha256() for column in date_columns}
+        for chunk in pd.read_csv(filepath, dtype=str, keep_default_na=False, chunksize=rows_per_chunk):
+            for column, digest in hashes.items():
+                digest.update(pd.util.hash_pandas_object(chunk[TIME_SERIES_ID_COLUMNS + [column]], index=False).values.tobytes())
+        return {date: hashes[column].hexdigest() for column, date in date_columns.items()}
+
+    def read_time_series_blocks(self, filepaths, dates_per_block=None, rows_per_chunk=None, stats=None, dates=None):
+        """
+        Yield long-form frames covering consecutive blocks of dates.
+
+        Only the region columns and one block of date columns are read at a time
+        (usecols), with categorical region columns, so memory is bounded by the
+        block size rather than by the width of the file. A single file is also
+        read in chunks of rows; several files are joined block by block.
+
+        Args:
+            filepaths (dict): Maps a data type to its CSV path.
+            dates_per_block (int, optional): Date columns per block; defaults to settings.INGEST_DATES_PER_BLOCK.
+            rows_per_chunk (int, optional): Rows per chunk of a single file; defaults to settings.INGEST_ROWS_PER_CHUNK.
+            stats (IngestStats, optional): Counters updated with the unparseable values.
+            dates (set, optional): Only read these dates; defaults to every date of the files.
+
+        Yields:
+            DataFrame: Columns province_state, country_region, date and one column per data type.
+        """
+        dates_per_block = dates_per_block or getattr(settings, 'INGEST_DATES_PER_BLOCK', 60)
+        rows_per_chunk = rows_per_chunk or getattr(settings, 'INGEST_ROWS_PER_CHUNK', 10000)
+        keys = ['province_state', 'country_region', 'date']
+        dtype = {column: 'category' for column in TIME_SERIES_ID_COLUMNS}
+
+        date_columns = {data_type: self.get_date_columns(filepath) for data_type, filepath in filepaths.items()}
+        all_dates = sorted(set().union(*(columns.values() for columns in date_columns.values())))
+        if dates is not None:
+            all_dates = [date for date in all_dates if date in dates]
+        for start in range(0, len(all_dates), dates_per_block):
+            block = set(all_dates[start:start + dates_per_block])
+            merged = None
+            for data_type, filepath in filepaths.items():
+                columns = [column for column, date in date_columns[data_type].items() if date in block]
+                if not columns:
+                    continue
+                chunks = (
+                    self.melt_time_series(chunk, data_type, date_columns[data_type], stats)
+                    for chunk in pd.read_csv(filepath, usecols=TIME_SERIES_ID_COLUMNS + columns, dtype=dtype,
+                                             chunksize=rows_per_chunk)
+                )
+                if len(filepaths) == 1:
+                    yield from chunks
+                    continue
+                df_melted = pd.concat(chunks).drop_duplicates(subset=keys, keep='last')
+                merged = df_melted if merged is None else merged.merge(df_melted, on=keys, how='outer')
+            if merged is not None:
+                yield merged
+
+    def melt_time_series(self, df, data_type, column_dates=None, stats=None):
+        """
+        Convert a wide time series frame (one column per date) into long form.
+
+        Args:
+            df (DataFrame): The wide frame read from a time_series_covid_19_* file.
+            data_type (str): The metric held in the date columns.
+            column_dates (dict, optional): Date column name to date, as returned by get_date_columns.
+            stats (IngestStats, optional): Counters updated with the unparseable values.
+
+        Returns:
+            DataFrame: Columns province_state, country_region, date and data_type.
+        """
+        df_melted = df.drop(columns=['Lat', 'Long'], errors='ignore').melt(
+            id_vars=TIME_SERIES_ID_COLUMNS, var_name='date', value_name=data_type)
+        df_melted = df_melted.rename(columns={'Province/State': 'province_state', 'Country/Region': 'country_region'})
+        if column_dates is None:
+            df_melted['date'] = self.parse_date_column(df_melted['date'])[0].dt.date
+        else:
+            df_melted['date'] = df_melted['date'].map(column_dates)
+        df_melted['province_state'] = df_melted['province_state'].astype(object).where(
+            df_melted['province_state'].notna(), None)
+        df_melted[data_type], invalid = self.parse_int_column(df_melted[data_type])
+        if stats is not None:
+            stats.invalid += invalid
+        return df_melted
+
+    def merge_time_series(self, df, data_types, stats, batch_size=None):
+        """
+        Upsert long-form time series rows into TimeSeriesData.
+
+        Existing rows are found with one query over the frame's date range; new
+        keys are inserted with bulk_insert (COPY on PostgreSQL) and existing
+        ones updated with bulk_update, batch by batch inside a transaction that
+        also invalidates cached TimeSeriesData responses.
+
+        Args:
+            df (DataFrame): Long-form rows with province_state, country_region, date and the data_types columns.
+            data_types (list): The metric columns to write.
+            stats (IngestStats): Counters updated with the written rows.
+            batch_size (int, optional): The number of rows written per batch.
+        """
+        batch_size = self.get_batch_size(batch_size)
+        keys = ['country_region', 'province_state', 'date']
+        df = df.drop_duplicates(subset=keys, keep='last')
+        if df.empty:
+            return
+
+        existing = {
+            (region_id, date): pk
+            for pk, region_id, date in TimeSeriesData.objects.filter(
+                date__range=(df['date'].min(), df['date'].max())
+            ).values_list('id', 'region_id', 'date').iterator()
+        }
+
+        to_create, to_update = [], []
+        columns = [
+            get_region_ids(zip(df['country_region'].astype(object).tolist(), df['province_state'].astype(object).tolist())),
+            df['date'].tolist(),
+        ]
+        for data_type in data_types:
+            # Metrics missing from an outer join are stored as NULL rather than NaN
+            values = df[data_type].astype('Int64').astype(object)
+            columns.append(values.where(df[data_type].notna(), None).tolist())
+        for values in zip(*columns):
+            obj = TimeSeriesData(**dict(zip(['region_id', 'date'] + list(data_types), values)))
+            obj.pk = existing.get(values[:2])
+            if obj.pk is None:
+                to_create.append(obj)
+            else:
+                to_update.append(obj)
+
+        with stats.phase('write'), transaction.atomic():
+            for start in range(0, len(to_create), batch_size):
+                batch, started = to_create[start:start + batch_size], time.perf_counter()
+                bulk_insert(TimeSeriesData, batch)
+                stats.record_batch(len(batch), time.perf_counter() - started)
+            for start in range(0, len(to_update), batch_size):
+                batch, started = to_update[start:start + batch_size], time.perf_counter()
+                TimeSeriesData.objects.bulk_update(batch, list(data_types))
+                stats.record_batch(len(batch), time.perf_counter() - started)
+            bump_data_version(TIME_SERIES_DATA)
+
+    def detect_date_format(self, values, sample_size=100):
+        """
+        Detect the date format of a column from a sample of its values.
+
+        Args:
+            values (Series): The date strings.
+            sample_size (int): The number of non-empty values to try.
+
+        Returns:
+            str: The format of DATE_FORMATS parsing the most sampled values, or None if none parses any.
+        """
+        sample = values[values.notna() & (values != '')].head(sample_size)
+        best_format, best_count = None, 0
+        for fmt in DATE_FORMATS:
+            count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+            if count == len(sample):
+                return fmt
+            if count > best_count:
+                best_format, best_count = fmt, count
+        return best_format
+
+    def parse_date_column(self, values, date_format=None):
+        """
+        Parse a column of date strings in one vectorized pass per format.
+
+        Values the detected format misses are retried with the other formats,
+        so columns mixing formats still parse.
+
+        Args:
+            values (Series): The date strings.
+            date_format (str, optional): The format to try first; detected from the column when omitted.
+
+        Returns:
+            tuple: (Series of datetime64 with NaT where unparseable, format tried first).
+        """
+        date_format = date_format or self.detect_date_format(values)
+        parsed = pd.to_datetime(values, format=date_format or DATE_FORMATS[0], errors='coerce')
+        for fmt in DATE_FORMATS:
+            missing = parsed.isna() & values.notna() & (values != '')
+            if not missing.any():
+                break
+            if fmt != date_format:
+                parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+        return parsed, date_format
+
+    def parse_int_column(self, values):
+        """
+        Parse a column of counts, storing blank and unparseable values as 0.
+
+        Args:
+            values (Series): The counts, as strings or numbers.
+
+        Returns:
+            tuple: (Series of int64, number of non-empty values that were not numbers).
+        """
+        numbers = pd.to_numeric(values, errors='coerce')
+        # Blank cells are read as '' (keep_default_na=False) or NaN; they mean no count, not a parse error
+        blank = values.isna()
+        if not pd.api.types.is_numeric_dtype(values):
+            blank |= values.astype(str).str.strip() == ''
+        invalid = int((numbers.isna() & ~blank).sum())
+        return numbers.fillna(0).astype('int64'), invalid
@@ -0,0 +1,66 @@
+import threading
+from django.db import transaction
+from .models import Region
+
+# Region ids by (country_region, province_state), shared by the loaders and serializers of this process
+_region_ids = {}
+_lock = threading.Lock()
+
+
+def get_region_key(country_region, province_state=None):
+    """
+    Returns the lookup key of a region, with an empty province stored as None.
+    """
+    return country_region, province_state or None
+
+
+def get_region_ids(regions):
+    """
+    Returns the ids of regions given by name, creating the ones that do not exist yet.
+
+    Ids are looked up in a cache held by the process, so ingestion resolves the
+    names of millions of rows with a query per new region at most. An id read or
+    created inside a transaction is only cached once it commits, so a rollback
+    never leaves the cache pointing at a region that does not exist.
+
+    Args:
+        regions (iterable): (country_region, province_state) pairs.
+
+    Returns:
+        list: The id of every region, in order.
+    """
+    keys = [get_region_key(*region) for region in regions]
+    with _lock:
+        missing = set(keys).difference(_region_ids)
+    if not missing:
+        return [_region_ids[key] for key in keys]
+
+    Region.objects.bulk_create([Region(country_region=country, province_state=province) for country, province in missing],
+                               batch_size=1000, ignore_conflicts=True)
+    countries = {country for country, _ in missing}
+    found = {
+        get_region_key(country, province): pk
+        for pk, country, province in Region.objects.filter(country_region__in=countries).values_list(
+            'id', 'country_region', 'province_state').iterator()
+    }
+
+    def remember():
+        with _lock:
+            _region_ids.update(found)
+    transaction.on_commit(remember)
+    return [found[key] if key in found else _region_ids[key] for key in keys]
+
+
+def get_region_id(country_region, province_state=None):
+    """
+    Returns the id of a region given by name, creating it if it does not exist yet.
+    """
+    return get_region_ids([(country_region, province_state)])[0]
+
+
+def clear_region_cache():
+    """
+    Forget the cached region ids, e.g. after the regions were deleted.
+    """
+    with _lock:
+        _region_ids.clear()
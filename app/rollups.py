@@ -0,0 +1,211 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Trunc, TruncMonth
+from .cache import COVID19_DATA, bump_data_version
+from .models import Covid19Data, Covid19Rollup
+
+METRICS = ('confirmed', 'deaths', 'recovered')
+
+# Response key and label format of each period granularity
+PERIOD_KEYS = {
+    'day': ('date', '%Y-%m-%d'),
+    'week': ('week_start', '%Y-%m-%d'),
+    'month': ('year_month', '%Y-%m'),
+    'year': ('year', '%Y'),
+}
+GRANULARITIES = tuple(PERIOD_KEYS)
+
+
+def month_start(day):
+    """
+    Returns the first day of the month containing day.
+    """
+    return day.replace(day=1)
+
+
+def next_month(day):
+    """
+    Returns the first day of the month after the one containing day.
+    """
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def totals():
+    """
+    Returns the Sum annotations of the metrics, named total_<metric>.
+    """
+    return {f'total_{metric}': Sum(metric) for metric in METRICS}
+
+
+def refresh_rollups(start_date=None, end_date=None):
+    """
+    Recompute the rollups covering a range of observation dates.
+
+    The daily rollups of every day in the range and the monthly rollups of every
+    month touching it are rebuilt from Covid19Data, so ingestion only pays for
+    the dates it wrote. Without a range all rollups are rebuilt. Cached
+    Covid19Data responses are invalidated in the same transaction.
+
+    Args:
+        start_date (date, optional): The first observation date to refresh.
+        end_date (date, optional): The last observation date to refresh.
+    """
+    data = Covid19Data.objects.all()
+    days = Covid19Rollup.objects.filter(granularity=Covid19Rollup.DAY)
+    months = Covid19Rollup.objects.filter(granularity=Covid19Rollup.MONTH)
+    if start_date is not None:
+        data = data.filter(observation_date__range=(start_date, end_date))
+        days = days.filter(period_start__range=(start_date, end_date))
+        months = months.filter(period_start__gte=month_start(start_date), period_start__lt=next_month(end_date))
+
+    with transaction.atomic():
+        days.delete()
+        rollups = []
+        for fields in (['observation_date', 'region__country_region'], ['observation_date']):
+            for row in data.values(*fields).annotate(**totals()).order_by():
+                rollups.append(Covid19Rollup(
+                    granularity=Covid19Rollup.DAY,
+                    period_start=row['observation_date'],
+                    country_region=row.get('region__country_region', ''),
+                    **{metric: row[f'total_{metric}'] or 0 for metric in METRICS}
+                ))
+        Covid19Rollup.objects.bulk_create(rollups, batch_size=1000)
+
+        months.delete()
+        day_rollups = Covid19Rollup.objects.filter(granularity=Covid19Rollup.DAY)
+        if start_date is not None:
+            day_rollups = day_rollups.filter(period_start__gte=month_start(start_date), period_start__lt=next_month(end_date))
+        rollups = [
+            Covid19Rollup(
+                granularity=Covid19Rollup.MONTH,
+                period_start=row['month'],
+                country_region=row['country_region'],
+                **{metric: row[f'total_{metric}'] or 0 for metric in METRICS}
+            )
+            for row in day_rollups.annotate(month=TruncMonth('period_start')).values(
+                'month', 'country_region').annotate(**totals()).order_by()
+        ]
+        Covid19Rollup.objects.bulk_create(rollups, batch_size=1000)
+        bump_data_version(COVID19_DATA)
+
+
+def get_rollup_querysets(start_date=None, end_date=None, by_country=False, granularity='month', country=None):
+    """
+    Returns the queries that sum the rollups of rollup_totals, and the fields their rows are grouped by.
+
+    Bucketing is done in the query with Trunc. For months and years, the months
+    lying entirely inside the range are read from the monthly rollups and only
+    the partial months at its edges are summed from the daily rollups, so there
+    are up to three queries whose rows are merged by merge_rollup_rows.
+
+    Returns:
+        tuple: (list of querysets, list of group by fields).
+    """
+    if country is not None:
+        rollups = Covid19Rollup.objects.filter(country_region=country)
+    elif by_country:
+        rollups = Covid19Rollup.objects.exclude(country_region='')
+    else:
+        rollups = Covid19Rollup.objects.filter(country_region='')
+    months = rollups.filter(granularity=Covid19Rollup.MONTH)
+    days = rollups.filter(granularity=Covid19Rollup.DAY)
+    if granularity in ('day', 'week'):
+        if start_date is not None:
+            days = days.filter(period_start__range=(start_date, end_date))
+        parts = [days]
+    elif start_date is None:
+        parts = [months]
+    else:
+        full_start = start_date if start_date.day == 1 else next_month(start_date)
+        full_end = month_start(end_date + timedelta(days=1))  # Months before this one end inside the range
+        if full_start < full_end:
+            parts = [
+                months.filter(period_start__gte=full_start, period_start__lt=full_end),
+                days.filter(period_start__gte=start_date, period_start__lt=full_start),
+                days.filter(period_start__gte=full_end, period_start__lte=end_date),
+            ]
+        else:
+            parts = [days.filter(period_start__range=(start_date, end_date))]
+
+    fields = ['country_region', 'period'] if by_country and country is None else ['period']
+    period = F('period_start') if granularity == 'day' else Trunc('period_start', granularity)
+    return [part.annotate(period=period).values(*fields).annotate(**totals()).order_by(*fields) for part in parts], fields
+
+
+def merge_rollup_rows(results, rows, fields):
+    """
+    Add the rows of one of the queries of get_rollup_querysets to the results, a dict of rows by group.
+    """
+    for row in rows:
+        key = tuple(row[field] for field in fields)
+        if key in results:
+            for metric in METRICS:
+                results[key][f'total_{metric}'] += row[f'total_{metric}']
+        else:
+            results[key] = row
+
+
+def format_rollup_row(row, by_country, granularity):
+    """
+    Returns a row of the rollup queries as rollup_totals yields it.
+    """
+    period_key, period_format = PERIOD_KEYS[granularity]
+    record = {'country_region': row['country_region']} if by_country else {}
+    record[period_key] = row['period'].strftime(period_format)
+    record.update({f'total_{metric}': row[f'total_{metric}'] for metric in METRICS})
+    return record
+
+
+def rollup_totals(start_date=None, end_date=None, by_country=False, granularity='month', country=None):
+    """
+    Yields Covid19Data totals per day, week, month or year, read from the rollups.
+
+    Args:
+        start_date (date, optional): The first observation date to include.
+        end_date (date, optional): The last observation date to include.
+        by_country (bool): Return one series per country instead of global totals.
+        granularity (str): One of GRANULARITIES.
+        country (str, optional): Return the totals of this country only, as a single series.
+
+    Yields:
+        dict: The period label under PERIOD_KEYS[granularity] and total_<metric>
+            keys (after country_region when by_country), ordered by country and period.
+    """
+    querysets, fields = get_rollup_querysets(start_date, end_date, by_country, granularity, country)
+    by_country = 'country_region' in fields
+    if len(querysets) == 1:
+        rows = querysets[0].iterator()
+    else:
+        # Merge the full months with the edge days; a handful of rows per series
+        results = {}
+        for queryset in querysets:
+            merge_rollup_rows(results, queryset, fields)
+        rows = (results[key] for key in sorted(results))
+    for row in rows:
+        yield format_rollup_row(row, by_country, granularity)
+
+
+async def arollup_totals(start_date=None, end_date=None, by_country=False, granularity='month', country=None):
+    """
+    The async counterpart of rollup_totals, reading the rollups with the async ORM.
+    """
+    querysets, fields = get_rollup_querysets(start_date, end_date, by_country, granularity, country)
+    by_country = 'country_region' in fields
+    if len(querysets) == 1:
+        async for row in querysets[0].aiterator():
+            yield format_rollup_row(row, by_country, granularity)
+        return
+    results = {}
+    for queryset in querysets:
+        merge_rollup_rows(results, [row async for row in queryset], fields)
+    for key in sorted(results):
+        yield format_rollup_row(results[key], by_country, granularity)
+
+
+def rollup_countries():
+    """
+    Returns the names of the countries that have rollups, sorted.
+    """
+    return list(Covid19Rollup.objects.filter(granularity=Covid19Rollup.MONTH).exclude(country_region='')
+                .values_list('country_region', flat=True).distinct().order_by('country_region'))
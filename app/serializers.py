@@ -1,23 +1,167 @@
+from functools import lru_cache
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Covid19Data, TimeSeriesData, FileUpload, Comment
+from rest_framework.fields import ISO_8601
+from .models import Covid19Data, TimeSeriesData, FileUpload, FileUploadPart, Comment
+from .regions import get_region_id
 
-class Covid19DataSerializer(serializers.ModelSerializer):
+class ProjectedFieldsMixin:
+    """
+    Serializer mixin limiting the output to the fields named in the 'fields' keyword argument.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class RowEncoder:
+    """
+    Read-only fast path of a serializer, encoding the dicts of a .values() queryset.
+
+    The per-field conversions are resolved once per call instead of going through
+    the serializer's field lookup and to_representation machinery on every row.
+    The output is identical to the serializer's.
+    """
+    def __init__(self, serializer_class, fields=None):
+        """
+        Args:
+            serializer_class (type): The serializer whose output to reproduce.
+            fields (tuple, optional): The fields to output; defaults to all of them.
+        """
+        serializer_fields = serializer_class().fields
+        self.fields = tuple(fields or serializer_fields)
+        self.serializer_fields = tuple(serializer_fields[name] for name in self.fields)
+        # values() lookups following the field sources, e.g. 'region.name' -> 'region__name'
+        self.lookups = tuple(field.source.replace('.', '__') for field in self.serializer_fields)
+
+    @staticmethod
+    def get_converter(field, current_timezone):
+        """
+        Returns a function converting a non-null database value like field.to_representation does.
+        """
+        output_format = getattr(field, 'format', ISO_8601)
+        iso_8601 = bool(output_format) and output_format.lower() == ISO_8601
+        if type(field) is serializers.IntegerField:
+            return int
+        if type(field) is serializers.CharField:
+            return str
+        if type(field) is serializers.DateField and iso_8601:
+            return lambda value: value.isoformat()
+        if type(field) is serializers.DateTimeField and iso_8601 and settings.USE_TZ:
+            field_timezone = getattr(field, 'timezone', current_timezone)
+
+            def convert_datetime(value):
+                if value.tzinfo is None:
+                    return field.to_representation(value)
+                # As DateTimeField does: converted to the field's time zone, UTC written as Z
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert_datetime
+        return field.to_representation
+
+    def encode(self, rows):
+        """
+        Returns the representation of each row, as the serializer's .data with many=True would.
+
+        Args:
+            rows (iterable): Dicts holding the lookups.
+        """
+        current_timezone = timezone.get_current_timezone()
+        converters = [self.get_converter(field, current_timezone) for field in self.serializer_fields]
+        items = tuple(zip(self.fields, self.lookups, converters))
+        return [
+            {name: None if (value := row[lookup]) is None else convert(value) for name, lookup, convert in items}
+            for row in rows
+        ]
+
+@lru_cache(maxsize=None)
+def get_row_encoder(serializer_class, fields=None):
+    """
+    Returns the RowEncoder of a serializer and field subset, built once per process.
+    """
+    return RowEncoder(serializer_class, fields)
+
+class RegionFieldsMixin(serializers.Serializer):
+    """
+    Serializer mixin exposing the region of a row as its country_region and province_state names.
+
+    The names are read from the joined Region row, and written by resolving them to
+    the Region key through the regions lookup cache; a partial update may change
+    either name alone.
+    """
+    country_region = serializers.CharField(source='region.country_region', max_length=100)
+    province_state = serializers.CharField(source='region.province_state', max_length=100, required=False,
+                                           allow_null=True, allow_blank=True)
+
+    def validate(self, attrs):
+        """
+        Replaces the validated region names with the id of their Region, and rejects a row that
+        would duplicate another on a unique constraint including the region.
+
+        DRF only derives a UniqueTogetherValidator from model fields it writes directly, so the
+        constraint on the region key would otherwise surface as an IntegrityError.
+        """
+        names = attrs.pop('region', None)
+        if names is not None:
+            region = self.instance.region if self.instance is not None else None
+            country_region = names.get('country_region', region.country_region if region else None)
+            province_state = names.get('province_state', region.province_state if region else None)
+            attrs['region_id'] = get_region_id(country_region, province_state)
+        key = self.get_unique_key(attrs)
+        if key is not None:
+            conflicts = self.Meta.model.objects.filter(**key)
+            if self.instance is not None:
+                conflicts = conflicts.exclude(pk=self.instance.pk)
+            if conflicts.exists():
+                raise serializers.ValidationError(self.get_unique_message())
+        return super().validate(attrs)
+
+    def get_unique_fields(self):
+        """
+        Returns the model fields, with region as region_id, of the unique constraint including the region, or None.
+        """
+        for constraint in self.Meta.model._meta.constraints:
+            if isinstance(constraint, models.UniqueConstraint) and 'region' in constraint.fields:
+                return ['region_id' if name == 'region' else name for name in constraint.fields]
+        return None
+
+    def get_unique_key(self, attrs):
+        """
+        Returns the values of the unique fields a row would have once attrs are applied, by field, or None.
+        """
+        fields = self.get_unique_fields()
+        if fields is None:
+            return None
+        key = {name: attrs.get(name, getattr(self.instance, name, None)) for name in fields}
+        return key if None not in key.values() else None
+
+    def get_unique_message(self):
+        """
+        Returns the error of a row duplicating another, worded as DRF's UniqueTogetherValidator.
+        """
+        names = ', '.join(name for name in self.get_unique_fields() if name != 'region_id')
+        return f'The fields country_region, province_state, {names} must make a unique set.'
+
+class Covid19DataSerializer(ProjectedFieldsMixin, RegionFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Covid19Data model.
-    Serializes all fields in the model.
+    Serializes all fields in the model, with the region as names, or the subset given as 'fields'.
     """
     class Meta:
         model = Covid19Data  # Specify the model to serialize
-        fields = '__all__'  # Serialize all fields in the model
+        fields = ['id', 'observation_date', 'province_state', 'country_region', 'last_update', 'confirmed', 'deaths', 'recovered']
 
-class TimeSeriesDataSerializer(serializers.ModelSerializer):
+class TimeSeriesDataSerializer(ProjectedFieldsMixin, RegionFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the TimeSeriesData model.
-    Serializes all fields in the model.
+    Serializes all fields in the model, with the region as names, or the subset given as 'fields'.
     """
     class Meta:
         model = TimeSeriesData  # Specify the model to serialize
-        fields = '__all__'  # Serialize all fields in the model
+        fields = ['id', 'date', 'country_region', 'province_state', 'confirmed', 'deaths', 'recovered']
 
 class FileUploadSerializer(serializers.ModelSerializer):
     """
@@ -27,6 +171,16 @@ class FileUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = FileUpload  # Specify the model to serialize
         fields = '__all__'  # Serialize all fields in the model
+        read_only_fields = ['chunked', 'part_count', 'parts_assembled', 'bytes_ingested']  # Maintained by the chunked upload API
+
+
+class FileUploadPartSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the received parts of a chunked FileUpload.
+    """
+    class Meta:
+        model = FileUploadPart
+        fields = ['number', 'size', 'sha256', 'received_at']
         
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import COVID19_DATA, TIME_SERIES_DATA, bump_data_version
+from .models import Covid19Data, TimeSeriesData
+
+
+@receiver([post_save, post_delete], sender=Covid19Data)
+def covid19_data_changed(sender, **kwargs):
+    """
+    Invalidates cached Covid19Data responses when a single row is saved or deleted.
+    """
+    bump_data_version(COVID19_DATA)
+
+
+@receiver([post_save, post_delete], sender=TimeSeriesData)
+def time_series_data_changed(sender, **kwargs):
+    """
+    Invalidates cached TimeSeriesData responses when a single row is saved or deleted.
+    """
+    bump_data_version(TIME_SERIES_DATA)
@@ -0,0 +1,155 @@
+import math
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+# First observation date of the synthetic files, as in the real dataset
+FIRST_DATE = date(2020, 1, 22)
+
+# Data types of the wide time_series_covid_19_* files
+DATA_TYPES = ('confirmed', 'deaths', 'recovered')
+
+# Columns of covid_19_data.csv
+COVID19_COLUMNS = ['SNo', 'ObservationDate', 'Province/State', 'Country/Region', 'Last Update', 'Confirmed', 'Deaths', 'Recovered']
+
+
+class SyntheticDataset:
+    """
+    Reproducible synthetic COVID-19 data shaped like covid_19_data.csv and the wide
+    time_series_covid_19_* files, at any scale.
+
+    The data is a grid of regions by dates. The cumulative counts of a region on a day
+    are a function of the seed, the region and the day only, so the files are identical
+    from run to run, agree with each other, and can be written in chunks of any size.
+    """
+    def __init__(self, regions, dates, seed=0):
+        """
+        Draw the parameters of every region.
+
+        Args:
+            regions (int): Number of province/country pairs.
+            dates (int): Number of days, which is also the number of date columns of the time series files.
+            seed (int): Seed of the random parameters.
+        """
+        self.regions = regions
+        self.dates = dates
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.scale = rng.lognormal(1.5, 1.0, regions)
+        self.growth = rng.uniform(1.0, 1.8, regions)
+        self.death_ratio = rng.uniform(0.005, 0.05, regions)
+        self.recovery_ratio = rng.uniform(0.3, 0.9, regions)
+        self.latitude = rng.uniform(-60, 70, regions).round(4)
+        self.longitude = rng.uniform(-180, 180, regions).round(4)
+        self.provinces, self.countries = self.get_regions()
+        self.days = [FIRST_DATE + timedelta(days=day) for day in range(dates)]
+
+    @classmethod
+    def for_rows(cls, rows, dates=100, seed=0):
+        """
+        Returns a dataset of about the given number of rows (regions times dates).
+        """
+        return cls(max(1, math.ceil(rows / dates)), dates, seed)
+
+    @property
+    def rows(self):
+        """
+        Returns the number of rows of covid_19_data.csv, and of the long form of each time series file.
+        """
+        return self.regions * self.dates
+
+    def get_regions(self):
+        """
+        Returns the province and country names of every region: one country in five is split into
+        three provinces, the others have no province, as in the real files.
+        """
+        provinces, countries, country = [], [], 0
+        while len(countries) < self.regions:
+            names = [f'Province {index}' for index in range(3)] if country % 5 == 0 else ['']
+            provinces.extend(names)
+            countries.extend([f'Country {country}'] * len(names))
+            country += 1
+        return np.array(provinces[:self.regions], dtype=object), np.array(countries[:self.regions], dtype=object)
+
+    def get_counts(self, regions=slice(None), days=slice(None)):
+        """
+        Returns the cumulative confirmed, deaths and recovered counts of some regions and days.
+
+        Args:
+            regions (slice): The regions to compute.
+            days (slice): The days to compute.
+
+        Returns:
+            dict: An int64 array of shape (regions, days) by data type.
+        """
+        day = np.arange(self.dates)[days] + 1
+        confirmed = np.floor(self.scale[regions, None] * day[None, :] ** self.growth[regions, None]).astype(np.int64)
+        return {
+            'confirmed': confirmed,
+            'deaths': np.floor(confirmed * self.death_ratio[regions, None]).astype(np.int64),
+            'recovered': np.floor(confirmed * self.recovery_ratio[regions, None]).astype(np.int64),
+        }
+
+    def write_covid19_csv(self, filepath, rows_per_chunk=100000):
+        """
+        Write the dataset as covid_19_data.csv: one row per day and region, ordered by day.
+
+        Args:
+            filepath (str): The file to write.
+            rows_per_chunk (int): Rows generated and written at a time.
+        """
+        days_per_chunk = max(1, rows_per_chunk // self.regions)
+        with open(filepath, 'w', newline='', encoding='utf-8') as file:
+            for start in range(0, self.dates, days_per_chunk):
+                days = slice(start, min(start + days_per_chunk, self.dates))
+                counts = self.get_counts(days=days)
+                labels = [f'{day.month:02d}/{day.day:02d}/{day.year}' for day in self.days[days]]
+                updates = [f'{day.month}/{day.day}/{day.year} 17:00' for day in self.days[days]]
+                pd.DataFrame({
+                    'SNo': np.arange(start * self.regions, days.stop * self.regions) + 1,
+                    'ObservationDate': np.repeat(labels, self.regions),
+                    'Province/State': np.tile(self.provinces, len(labels)),
+                    'Country/Region': np.tile(self.countries, len(labels)),
+                    'Last Update': np.repeat(updates, self.regions),
+                    # Day-major order, with counts as floats like the real file
+                    **{column: counts[data_type].T.ravel().astype(float)
+                       for column, data_type in zip(COVID19_COLUMNS[-3:], DATA_TYPES)},
+                }).to_csv(file, header=start == 0, index=False, float_format='%.1f')
+
+    def write_time_series_csv(self, filepath, data_type, rows_per_chunk=100000):
+        """
+        Write one data type of the dataset as a wide time_series_covid_19_* file: one row per region,
+        one column per day.
+
+        Args:
+            filepath (str): The file to write.
+            data_type (str): One of DATA_TYPES.
+            rows_per_chunk (int): Long rows (regions times dates) generated and written at a time.
+        """
+        regions_per_chunk = max(1, rows_per_chunk // self.dates)
+        labels = [f'{day.month}/{day.day}/{day.year % 100:02d}' for day in self.days]
+        with open(filepath, 'w', newline='', encoding='utf-8') as file:
+            for start in range(0, self.regions, regions_per_chunk):
+                regions = slice(start, min(start + regions_per_chunk, self.regions))
+                frame = pd.DataFrame(self.get_counts(regions=regions)[data_type], columns=labels)
+                frame.insert(0, 'Long', self.longitude[regions])
+                frame.insert(0, 'Lat', self.latitude[regions])
+                frame.insert(0, 'Country/Region', self.countries[regions])
+                frame.insert(0, 'Province/State', self.provinces[regions])
+                frame.to_csv(file, header=start == 0, index=False)
+
+    def write(self, directory, rows_per_chunk=100000):
+        """
+        Write covid_19_data.csv and the three time series files into a directory.
+
+        Returns:
+            dict: The path of covid_19_data.csv under 'covid_19_data', and of each time series file under its data type.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = {'covid_19_data': os.path.join(directory, 'covid_19_data.csv')}
+        self.write_covid19_csv(paths['covid_19_data'], rows_per_chunk)
+        for data_type in DATA_TYPES:
+            paths[data_type] = os.path.join(directory, f'time_series_covid_19_{data_type}.csv')
+            self.write_time_series_csv(paths[data_type], data_type, rows_per_chunk)
+        return paths
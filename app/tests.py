@@ -1,8 +1,45 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
+from unittest import skipUnless
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from .models import Covid19Data, TimeSeriesData, FileUpload
-from datetime import datetime
+from .models import Covid19Data, Region, TimeSeriesData, FileUpload
+from .process_excel_file import ProcessExcelFile, parse_covid19_range
+from .serializers import Covid19DataSerializer, TimeSeriesDataSerializer, RowEncoder
+from .jobs import run_pending_jobs
+from .metrics import REGISTRY, render_metrics
+from .middleware import MetricsMiddleware
+from .synthetic import DATA_TYPES, SyntheticDataset
+from .rollups import GRANULARITIES, refresh_rollups, rollup_totals
+from .columnar import build_store, get_store
+from .analytics import analytics
+from .regions import clear_region_cache, get_region_id, get_region_ids
+from .cache import COVID19_DATA, TIME_SERIES_DATA
+from .compression import accepts_encoding
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import pandas as pd
+import os
+import tempfile
+
+
+def read_json(response):
+    """
+    Decode the JSON body of a response, whether it was streamed or not.
+    """
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return json.loads(content)
 
 class Covid19DataTests(TestCase):
     """
@@ -15,8 +52,7 @@ class Covid19DataTests(TestCase):
         self.client = APIClient()
         Covid19Data.objects.create(
             observation_date='2020-01-22',
-            province_state='Hubei',
-            country_region='China',
+            region_id=get_region_id('China', 'Hubei'),
             last_update=datetime.strptime('2020-01-22 17:00:00', '%Y-%m-%d %H:%M:%S'),
             confirmed=548,
             deaths=17,
@@ -60,8 +96,7 @@ class TimeSeriesDataTests(TestCase):
         self.client = APIClient()
         TimeSeriesData.objects.create(
             date='2020-01-22',
-            country_region='China',
-            province_state='Hubei',
+            region_id=get_region_id('China', 'Hubei'),
             confirmed=548,
             deaths=17,
             recovered=28
@@ -92,6 +127,342 @@ class TimeSeriesDataTests(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(TimeSeriesData.objects.count(), 2)
 
+    def test_duplicate_timeseriesdata_is_rejected(self):
+        """
+        Test that creating or updating an entry onto the region and date of another returns a 400, not a 500.
+        """
+        data = {"date": "2020-01-22", "country_region": "China", "province_state": "Hubei",
+                "confirmed": 600, "deaths": 20, "recovered": 30}
+        response = self.client.post('/api/timeseriesdata/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('must make a unique set', response.data['non_field_errors'][0])
+
+        other = self.client.post('/api/timeseriesdata/', {**data, "date": "2020-01-23"}, format='json').data
+        response = self.client.put(f'/api/timeseriesdata/{other["id"]}/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+        response = self.client.put(f'/api/timeseriesdata/{other["id"]}/', {**data, "date": "2020-01-23", "confirmed": 1},
+                                   format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TimeSeriesData.objects.count(), 2)
+
+class ListPaginationTests(TestCase):
+    """
+    Test cases for the cursor pagination and field projection of the list endpoints.
+    """
+    def setUp(self):
+        """
+        Set up the test client and a few days of Covid19Data.
+        """
+        self.client = APIClient()
+        for day in (24, 22, 23, 22, 25):
+            Covid19Data.objects.create(observation_date=f'2020-01-{day}', region_id=get_region_id(f'Country {day}'),
+                                       last_update=datetime(2020, 1, day), confirmed=day, deaths=0, recovered=0)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        """
+        Test that following the next links returns every row once, ordered by date and id.
+        """
+        url, rows = '/api/covid19data/?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertLessEqual(len(response.data['results']), 2)
+            rows += response.data['results']
+            url = response.data['next']
+        expected = list(Covid19Data.objects.order_by('observation_date', 'id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
+
+    def test_pages_inside_a_single_date(self):
+        """
+        Test that paging through more rows than the page size on a single date returns each
+        row exactly once and ends, and that the previous link leads back to the page before.
+        """
+        region_id = get_region_id('Crowded')
+        Covid19Data.objects.bulk_create([
+            Covid19Data(observation_date='2020-01-23', region_id=region_id, last_update=datetime(2020, 1, 23),
+                        confirmed=number, deaths=0, recovered=0)
+            for number in range(2500)
+        ])
+        url, pages, ids = '/api/covid19data/?page_size=1000', [], []
+        while url:
+            self.assertLess(len(pages), 10)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sorted(ids), sorted(Covid19Data.objects.values_list('id', flat=True)))
+        self.assertEqual(len(ids), len(set(ids)))
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual([row['id'] for row in previous['results']], [row['id'] for row in pages[-2]['results']])
+        self.assertEqual(self.client.get('/api/covid19data/?cursor=bad').status_code, 404)
+
+    def test_fields_projection(self):
+        """
+        Test that fields= narrows both the response and the SELECT, and rejects unknown fields.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/covid19data/?fields=country_region,confirmed')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'country_region', 'confirmed'})
+        self.assertFalse([query for query in queries if 'last_update' in query['sql']])
+        response = self.client.get('/api/covid19data/?fields=country_region,population')
+        self.assertEqual(response.status_code, 400)
+
+
+class RowEncoderTests(TestCase):
+    """
+    Test cases for the .values() read path of the list endpoints.
+    """
+    def test_output_matches_serializer(self):
+        """
+        Test that list pages render to the same bytes as the ModelSerializers.
+        """
+        client = APIClient()
+        Covid19Data.objects.create(observation_date='2020-01-22', region_id=get_region_id('Japan'),
+                                   last_update=datetime(2020, 1, 22, 17, 30, 5, 123456, tzinfo=dt_timezone.utc),
+                                   confirmed=2, deaths=0, recovered=0)
+        TimeSeriesData.objects.create(date='2020-01-22', region_id=get_region_id('China', 'Hubei'),
+                                      confirmed=444, deaths=17, recovered=None)
+        for url, model, serializer_class, ordering in (
+                ('/api/covid19data/', Covid19Data, Covid19DataSerializer, ('observation_date', 'id')),
+                ('/api/timeseriesdata/', TimeSeriesData, TimeSeriesDataSerializer, ('date', 'id'))):
+            results = client.get(url).data['results']
+            expected = serializer_class(model.objects.order_by(*ordering), many=True).data
+            self.assertEqual(JSONRenderer().render(results), JSONRenderer().render(expected))
+        encoder = RowEncoder(Covid19DataSerializer, ('last_update', 'province_state'))
+        self.assertEqual(encoder.encode(Covid19Data.objects.values(*encoder.lookups)),
+                         [{'last_update': '2020-01-22T17:30:05.123456Z', 'province_state': None}])
+
+
+class BulkTests(TestCase):
+    """
+    Test cases for the bulk endpoints of the data viewsets.
+    """
+    def setUp(self):
+        """
+        Set up the test client.
+        """
+        self.client = APIClient()
+
+    def get_global_confirmed(self):
+        """
+        Returns the global confirmed totals per day, read from the rollups.
+        """
+        return {row['date']: row['total_confirmed'] for row in rollup_totals(by_country=False, granularity='day')}
+
+    def test_bulk_create_reports_invalid_items(self):
+        """
+        Test that valid items are created in one request and invalid ones reported by index.
+        """
+        items = [
+            {'observation_date': '2020-01-22', 'country_region': 'China', 'last_update': '2020-01-22T17:00:00Z',
+             'confirmed': 444, 'deaths': 17, 'recovered': 28},
+            {'observation_date': 'yesterday', 'country_region': 'Japan', 'last_update': '2020-01-22T17:00:00Z',
+             'confirmed': 2, 'deaths': 0, 'recovered': 0},
+            {'observation_date': '2020-01-22', 'country_region': 'Japan', 'last_update': '2020-01-22T17:00:00Z',
+             'confirmed': 2, 'deaths': 0, 'recovered': 0},
+        ]
+        response = self.client.post('/api/covid19data/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('observation_date', response.data['errors'][0]['errors'])
+        self.assertEqual(self.get_global_confirmed(), {'2020-01-22': 446})
+
+    def test_bulk_update_and_delete(self):
+        """
+        Test NDJSON partial updates and deletes by id, with unknown ids reported.
+        """
+        rows = [TimeSeriesData.objects.create(date=f'2020-01-2{day}', region_id=get_region_id('China'), confirmed=day)
+                for day in (2, 3, 4)]
+        payload = ''.join(json.dumps({'id': row.id, 'deaths': 1}) + '\n' for row in rows[:2]) + '{"id": 0, "deaths": 1}\n'
+        response = self.client.generic('PATCH', '/api/timeseriesdata/bulk/', payload, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['updated'], response.data['errors'][0]['index']), (2, 2))
+        self.assertEqual(list(TimeSeriesData.objects.order_by('date').values_list('confirmed', 'deaths')),
+                         [(2, 1), (3, 1), (4, None)])
+
+        response = self.client.delete('/api/timeseriesdata/bulk/', [rows[0].id, {'id': rows[2].id}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': 2, 'errors': []})
+        self.assertEqual(list(TimeSeriesData.objects.values_list('id', flat=True)), [rows[1].id])
+        self.assertEqual(self.client.post('/api/timeseriesdata/bulk/', {'date': '2020-01-22'}, format='json').status_code, 400)
+
+    def test_bulk_reports_conflicting_items(self):
+        """
+        Test that items repeating the region and date of a row, or of an earlier item, are reported
+        by index while the other items are applied.
+        """
+        existing = TimeSeriesData.objects.create(date='2020-01-22', region_id=get_region_id('China'), confirmed=1)
+        items = [
+            {'date': '2020-01-22', 'country_region': 'China', 'confirmed': 2},  # Taken by existing
+            {'date': '2020-01-23', 'country_region': 'China', 'confirmed': 3},
+            {'date': '2020-01-23', 'country_region': 'China', 'confirmed': 4},  # Repeats the item before
+            {'date': '2020-01-23', 'country_region': 'Japan', 'confirmed': 5},
+        ]
+        response = self.client.post('/api/timeseriesdata/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 2])
+        self.assertIn('must make a unique set', response.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertEqual(sorted(TimeSeriesData.objects.values_list('confirmed', flat=True)), [1, 3, 5])
+
+        japan = TimeSeriesData.objects.get(confirmed=5)
+        items = [{'id': japan.id, 'country_region': 'China'}, {'id': existing.id, 'confirmed': 6}]
+        response = self.client.patch('/api/timeseriesdata/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['updated'], [error['index'] for error in response.data['errors']]), (1, [0]))
+        self.assertEqual(sorted(TimeSeriesData.objects.values_list('confirmed', flat=True)), [3, 5, 6])
+
+
+class DatabaseConfigurationTests(TestCase):
+    """
+    Test cases for the database connection settings.
+    """
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_sqlite_pragmas(self):
+        """
+        Test that new SQLite connections run in WAL mode with the configured pragmas.
+        """
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(lambda: [os.remove(name) for name in (path, path + '-wal', path + '-shm') if os.path.exists(name)])
+        wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': path})
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+
+class MetricsTests(TestCase):
+    """
+    Test cases for the request metrics middleware and the metrics endpoint.
+    """
+    def setUp(self):
+        for metric in REGISTRY:
+            metric.clear()
+        Covid19Data.objects.create(observation_date=date(2020, 1, 22), region_id=get_region_id('China', 'Hubei'),
+                                   last_update=datetime(2020, 1, 22, tzinfo=dt_timezone.utc), confirmed=1, deaths=0, recovered=0)
+
+    def test_request_metrics_are_exposed(self):
+        """
+        Test that a request's latency, query count and size appear in the metrics endpoint.
+        """
+        self.client.get('/api/covid19data/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="covid19data-list",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_count{method="GET",view="covid19data-list"} 1', body)
+        self.assertIn('http_response_size_bytes_bucket{method="GET",view="covid19data-list",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_REPEATED_QUERY_COUNT=3)
+    def test_repeated_queries_are_logged(self):
+        """
+        Test that a request running the same SQL repeatedly is logged and counted as a likely N+1 pattern.
+        """
+        def get_response(request):
+            for pk in range(3):
+                Covid19Data.objects.filter(pk=pk).first()
+            return HttpResponse('ok')
+
+        with self.assertLogs('app.metrics', 'WARNING') as logs:
+            MetricsMiddleware(get_response)(RequestFactory().get('/report/'))
+        event = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((event['event'], event['view'], event['repeats']), ('repeated_query', 'unmatched', 3))
+        self.assertIn('http_request_repeated_queries_total{view="unmatched"} 1', render_metrics())
+
+
+class RegionTests(TestCase):
+    """
+    Test cases for the Region dimension of the data rows.
+    """
+    def setUp(self):
+        self.addCleanup(clear_region_cache)  # Ids cached by a test are rolled back with it
+
+    def test_regions_are_resolved_through_the_cache(self):
+        """
+        Test that names resolve to one Region each, and to cached ids once committed.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = get_region_ids([('China', 'Hubei'), ('Japan', ''), ('China', 'Hubei')])
+        self.assertEqual(ids[0], ids[2])
+        self.assertEqual(Region.objects.count(), 2)
+        self.assertIsNone(Region.objects.get(pk=ids[1]).province_state)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_region_ids([('Japan', None), ('China', 'Hubei')]), [ids[1], ids[0]])
+
+    def test_api_writes_region_names(self):
+        """
+        Test that the API reads and writes the region as names, and a partial update may change one of them.
+        """
+        client = APIClient()
+        response = client.post('/api/timeseriesdata/', {'date': '2020-01-22', 'country_region': 'China',
+                                                         'province_state': 'Hubei', 'confirmed': 1}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TimeSeriesData.objects.get().region_id, get_region_id('China', 'Hubei'))
+        response = client.patch(f'/api/timeseriesdata/{response.data["id"]}/', {'province_state': 'Beijing'}, format='json')
+        self.assertEqual((response.data['country_region'], response.data['province_state']), ('China', 'Beijing'))
+        self.assertEqual(Region.objects.count(), 2)
+        response = client.get(f'/api/timeseriesdata/{response.data["id"]}/?fields=confirmed')
+        self.assertEqual(response.data, {'confirmed': 1})
+
+
+class ExportTests(TestCase):
+    """
+    Test cases for the streaming export endpoints.
+    """
+    def setUp(self):
+        """
+        Set up the test client and TimeSeriesData for two countries.
+        """
+        self.client = APIClient()
+        for day in (22, 23, 24):
+            for country in ('China', 'Japan'):
+                TimeSeriesData.objects.create(date=f'2020-01-{day}', region_id=get_region_id(country), confirmed=day, deaths=0, recovered=None)
+
+    def test_csv_export(self):
+        """
+        Test that the CSV export streams the filtered rows in order.
+        """
+        response = self.client.get('/api/timeseriesdata/export/?country=Japan&start_date=2020-01-23&end_date=2020-01-24'
+                                   '&fields=date,confirmed,recovered')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('timeseriesdata.csv', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(),
+                         ['date,confirmed,recovered', '2020-01-23,23,', '2020-01-24,24,'])
+
+    def test_ndjson_export(self):
+        """
+        Test that the NDJSON export has one object per row.
+        """
+        response = self.client.get('/api/timeseriesdata/export/?output=ndjson&country=China')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['date'] for row in rows], ['2020-01-22', '2020-01-23', '2020-01-24'])
+        self.assertEqual(self.client.get('/api/timeseriesdata/export/?output=xml').status_code, 400)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    @patch('app.export.EXPORT_CHUNK_ROWS', 4)
+    def test_parquet_export(self):
+        """
+        Test that the Parquet export, written a record batch at a time, reads back.
+        """
+        response = self.client.get('/api/timeseriesdata/export/?output=parquet')
+        table = pd.read_parquet(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(table), 6)
+        self.assertEqual(list(table.columns), ['id', 'date', 'country_region', 'province_state', 'confirmed', 'deaths', 'recovered'])
+
+
 class FileUploadTests(TestCase):
     """
     Test cases for the FileUpload model and its related API endpoints.
@@ -111,4 +482,649 @@ class FileUploadTests(TestCase):
             response = self.client.post('/api/fileupload/', {'title': 'Test File', 'file': upload_file}, format='multipart')
             self.assertEqual(response.status_code, 201)
             self.assertEqual(FileUpload.objects.count(), 1)
-            self.assertEqual(FileUpload.objects.first().title, 'Test File')
\ No newline at end of file
+            self.assertEqual(FileUpload.objects.first().title, 'Test File')
+
+class ProcessExcelFileTests(TestCase):
+    """
+    Test cases for loading CSV files through ProcessExcelFile.
+    """
+    def write_csv(self, content):
+        """
+        Write content to a temporary CSV file and return its path.
+        """
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load_covid19_data_in_batches(self):
+        """
+        Test that rows are written in batches and short rows are skipped.
+        """
+        path = self.write_csv(
+            "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+            "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"
+            "2,01/22/2020,,Japan,1/22/2020 17:00,2.0,0.0,0.0\n"
+            "3,01/22/2020,Macau\n"
+            "4,01/23/2020,Hubei,Mainland China,1/23/2020 17:00,444.0,17.0,28.0\n"
+        )
+        stats = ProcessExcelFile().load_covid19_data(path, batch_size=2)
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.batches, 2)
+        self.assertEqual(Covid19Data.objects.count(), 3)
+        self.assertIsNone(Covid19Data.objects.get(region__country_region='Japan').region.province_state)
+
+    def test_load_time_series_data_upserts(self):
+        """
+        Test that a second metric updates the rows created by the first one.
+        """
+        header = "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20\n"
+        confirmed = self.write_csv(header + "Hubei,China,30.9,112.2,444,444\n,Japan,36.2,138.2,2,x\n")
+        deaths = self.write_csv(header + "Hubei,China,30.9,112.2,17,18\n,Japan,36.2,138.2,0,1\n")
+        loader = ProcessExcelFile()
+        self.assertEqual(loader.load_time_series_data(confirmed, 'confirmed').rows, 4)
+        loader.load_time_series_data(deaths, 'deaths')
+        self.assertEqual(TimeSeriesData.objects.count(), 4)
+        japan = TimeSeriesData.objects.get(region__country_region='Japan', region__province_state=None, date='2020-01-23')
+        self.assertEqual((japan.confirmed, japan.deaths), (0, 1))
+        hubei = TimeSeriesData.objects.get(region__province_state='Hubei', date='2020-01-22')
+        self.assertEqual((hubei.confirmed, hubei.deaths, hubei.recovered), (444, 17, None))
+
+    def test_load_time_series_files_merges_metrics(self):
+        """
+        Test that the merged loader writes each row once with every metric.
+        """
+        header = "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20\n"
+        filepaths = {
+            'confirmed': self.write_csv(header + "Hubei,China,30.9,112.2,444,444\n,Japan,36.2,138.2,2,2\n"),
+            'deaths': self.write_csv(header + "Hubei,China,30.9,112.2,17,18\n,Japan,36.2,138.2,0,1\n"),
+            'recovered': self.write_csv(header + "Hubei,China,30.9,112.2,28,28\n"),
+        }
+        stats = ProcessExcelFile().load_time_series_files(filepaths)
+        self.assertEqual(stats.rows, 4)
+        hubei = TimeSeriesData.objects.get(region__province_state='Hubei', date='2020-01-23')
+        self.assertEqual((hubei.confirmed, hubei.deaths, hubei.recovered), (444, 18, 28))
+        japan = TimeSeriesData.objects.get(region__country_region='Japan', date='2020-01-22')
+        self.assertEqual((japan.confirmed, japan.deaths, japan.recovered), (2, 0, None))
+
+    def test_load_covid19_data_parallel(self):
+        """
+        Test that files split across worker processes load every row once.
+        """
+        header = "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+        rows = [f"{i},01/{22 + i % 5}/2020,,Country {i},1/22/2020 17:00,{i}.0,0.0,0.0\n" for i in range(50)]
+        filepaths = [self.write_csv(header + ''.join(rows[:30])), self.write_csv(header + ''.join(rows[30:]) + "51,01/22/2020\n")]
+        stats = ProcessExcelFile().load_covid19_data_parallel(filepaths, workers=2, batch_size=7)
+        self.assertEqual((stats.rows, stats.failed), (50, 1))
+        self.assertEqual(sorted(Covid19Data.objects.values_list('confirmed', flat=True)), list(range(50)))
+
+    def test_parallel_range_starting_with_a_short_row(self):
+        """
+        Test that a byte range starting with a short row skips that row and parses the full rows after it.
+        """
+        header = "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+        path = self.write_csv(header + "1,01/22/2020,Macau\n2,01/22/2020,,Japan,1/22/2020 17:00,2.0,0.0,0.0\n"
+                              "3,01/23/2020,,Japan,1/23/2020 17:00,4.0,0.0,0.0\n")
+        frame, failed, invalid = parse_covid19_range(path, len(header), os.path.getsize(path))
+        self.assertEqual((len(frame), failed, invalid), (2, 1, 0))
+        self.assertEqual(frame['confirmed'].tolist(), [2, 4])
+
+    @override_settings(INGEST_DATES_PER_BLOCK=1, INGEST_ROWS_PER_CHUNK=1)
+    def test_load_time_series_in_blocks(self):
+        """
+        Test that streaming one date and one row at a time gives the same rows.
+        """
+        header = "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20,1/24/20\n"
+        filepaths = {
+            'confirmed': self.write_csv(header + "Hubei,China,30.9,112.2,1,2,3\n,Japan,36.2,138.2,4,5,6\n"),
+            'deaths': self.write_csv(header + "Hubei,China,30.9,112.2,0,0,1\n,Japan,36.2,138.2,0,1,1\n"),
+        }
+        loader = ProcessExcelFile()
+        self.assertEqual(len(list(loader.read_time_series_blocks(filepaths))), 3)
+        self.assertEqual(len(list(loader.read_time_series_blocks({'confirmed': filepaths['confirmed']}))), 6)
+        stats = loader.load_time_series_files(filepaths)
+        self.assertEqual(stats.rows, 6)
+        self.assertEqual(list(TimeSeriesData.objects.filter(region__country_region='Japan').order_by('date').values_list(
+            'confirmed', 'deaths')), [(4, 0), (5, 1), (6, 1)])
+
+    def test_unparseable_values_are_counted(self):
+        """
+        Test that bad dates skip their row, bad counts are stored as 0, and both are reported,
+        while blank counts are stored as 0 without being reported.
+        """
+        path = self.write_csv(
+            "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+            "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"
+            "2,01/23/2020,Hubei,Mainland China,2020-01-23T17:00:00,n/a,17.0,28.0\n"
+            "3,not a date,Hubei,Mainland China,1/24/2020 17:00,1.0,0.0,0.0\n"
+            "4,01/23/2020,,Japan,1/23/2020 17:00,2.0,,\n"
+        )
+        stats = ProcessExcelFile().load_covid19_data(path)
+        self.assertEqual((stats.rows, stats.failed, stats.invalid), (3, 1, 1))
+        self.assertIn('1 unparseable values', str(stats))
+        row = Covid19Data.objects.get(observation_date='2020-01-23', region__country_region='Mainland China')
+        self.assertEqual((row.confirmed, row.last_update.hour), (0, 17))
+        row = Covid19Data.objects.get(region__country_region='Japan')
+        self.assertEqual((row.confirmed, row.deaths, row.recovered), (2, 0, 0))
+
+    def test_reload_writes_only_changes(self):
+        """
+        Test that reloading covid_19_data only writes new and changed rows, and an identical file nothing.
+        """
+        header = "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+        rows = ["1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n",
+                "2,01/22/2020,,Japan,1/22/2020 17:00,2.0,0.0,0.0\n"]
+        loader = ProcessExcelFile()
+        self.assertEqual(loader.load_covid19_data(self.write_csv(header + ''.join(rows))).rows, 2)
+        self.assertEqual(loader.load_covid19_data(self.write_csv(header + ''.join(rows))).rows, 0)
+
+        rows[1] = "2,01/22/2020,,Japan,1/22/2020 17:00,3.0,0.0,0.0\n"
+        rows.append("3,01/23/2020,,Japan,1/23/2020 17:00,4.0,0.0,0.0\n")
+        stats = loader.load_covid19_data(self.write_csv(header + ''.join(rows)))
+        self.assertEqual((stats.rows, stats.unchanged), (2, 1))
+        self.assertEqual(list(Covid19Data.objects.filter(region__country_region='Japan').order_by('observation_date').values_list(
+            'confirmed', flat=True)), [3, 4])
+        self.assertEqual(Covid19Data.objects.count(), 3)
+
+    def test_reload_restores_rows_edited_through_the_api(self):
+        """
+        Test that loading a file again restores the rows edited or deleted through the API since its last load.
+        """
+        path = self.write_csv(
+            "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+            "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"
+            "2,01/23/2020,,Japan,1/23/2020 17:00,2.0,0.0,0.0\n"
+        )
+        loader, client = ProcessExcelFile(), APIClient()
+        loader.load_covid19_data(path)
+        row = Covid19Data.objects.get(region__country_region='Mainland China')
+        self.assertEqual(client.patch(f'/api/covid19data/{row.id}/', {'confirmed': 1}, format='json').status_code, 200)
+        self.assertEqual(loader.load_covid19_data(path).rows, 1)
+        self.assertEqual(Covid19Data.objects.get(pk=row.id).confirmed, 444)
+
+        japan = Covid19Data.objects.get(region__country_region='Japan')
+        self.assertEqual(client.delete('/api/covid19data/bulk/', [japan.id], format='json').status_code, 200)
+        self.assertEqual(loader.load_covid19_data(path).rows, 1)
+        self.assertEqual(Covid19Data.objects.count(), 2)
+
+        path = self.write_csv("Province/State,Country/Region,Lat,Long,1/22/20,1/23/20\nHubei,China,30.9,112.2,1,2\n")
+        loader.load_time_series_data(path, 'confirmed')
+        entry = TimeSeriesData.objects.get(date='2020-01-23')
+        self.assertEqual(client.patch(f'/api/timeseriesdata/{entry.id}/', {'confirmed': 9}, format='json').status_code, 200)
+        self.assertEqual(loader.load_time_series_data(path, 'confirmed').rows, 1)
+        self.assertEqual(TimeSeriesData.objects.get(pk=entry.id).confirmed, 2)
+
+    def test_time_series_reload_writes_changed_dates(self):
+        """
+        Test that reloading a time series file only merges the dates whose column changed.
+        """
+        header = "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20,1/24/20\n"
+        loader = ProcessExcelFile()
+        path = self.write_csv(header + "Hubei,China,30.9,112.2,1,2,3\n,Japan,36.2,138.2,4,5,6\n")
+        self.assertEqual(loader.load_time_series_data(path, 'confirmed').rows, 6)
+        self.assertEqual(loader.load_time_series_data(path, 'confirmed').rows, 0)
+        path = self.write_csv(header + "Hubei,China,30.9,112.2,1,2,3\n,Japan,36.2,138.2,4,5,7\n")
+        self.assertEqual(loader.load_time_series_data(path, 'confirmed').rows, 2)
+        self.assertEqual(TimeSeriesData.objects.count(), 6)
+        self.assertEqual(TimeSeriesData.objects.get(region__country_region='Japan', date='2020-01-24').confirmed, 7)
+
+    def test_ingestion_metrics(self):
+        """
+        Test that a load records its rows, batch timings and phase timings in the metrics.
+        """
+        header = "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+        stats = ProcessExcelFile().load_covid19_data(
+            self.write_csv(header + "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"), source='metrics_test')
+        self.assertEqual(set(stats.phases), {'hash', 'parse', 'diff', 'write', 'rollups'})
+        body = render_metrics()
+        self.assertIn('ingest_rows_total{source="metrics_test"} 1', body)
+        self.assertIn('ingest_batch_duration_seconds_count{source="metrics_test"} 1', body)
+        self.assertIn('ingest_phase_duration_seconds_count{source="metrics_test",phase="write"} 1', body)
+
+    def test_detect_date_format(self):
+        """
+        Test that the date format is detected from a column sample.
+        """
+        loader = ProcessExcelFile()
+        self.assertEqual(loader.detect_date_format(pd.Series(['1/22/20', '12/31/20'])), '%m/%d/%y')
+        self.assertEqual(loader.detect_date_format(pd.Series(['2020-01-22 17:00:00', ''])), '%Y-%m-%d %H:%M:%S')
+
+
+@override_settings(FILE_JOBS_RUN_IN_PROCESS=False)
+class SyntheticDatasetTests(TestCase):
+    """
+    Test cases for the synthetic benchmark dataset.
+    """
+    def test_files_load_and_agree(self):
+        """
+        Test that the synthetic files are reproducible, load completely, and agree with each other.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        dataset = SyntheticDataset.for_rows(40, dates=8, seed=3)
+        paths = dataset.write(directory.name, rows_per_chunk=7)
+        self.assertEqual((dataset.regions, dataset.rows), (5, 40))
+        copy = SyntheticDataset(5, 8, seed=3).write(os.path.join(directory.name, 'copy'))
+        for name, path in paths.items():
+            with open(path, 'rb') as file, open(copy[name], 'rb') as copy_file:
+                self.assertEqual(file.read(), copy_file.read())
+
+        loader = ProcessExcelFile()
+        self.assertEqual(loader.load_covid19_data(paths['covid_19_data']).rows, 40)
+        self.assertEqual(loader.load_time_series_files({data_type: paths[data_type] for data_type in DATA_TYPES}).rows, 40)
+        self.assertEqual(TimeSeriesData.objects.count(), 40)
+        region_id = get_region_id('Country 0', 'Province 2')
+        row = Covid19Data.objects.get(region_id=region_id, observation_date=date(2020, 1, 29))
+        self.assertEqual(TimeSeriesData.objects.get(region_id=region_id, date=date(2020, 1, 29)).confirmed, row.confirmed)
+
+
+class ColumnarStoreTests(TestCase):
+    """
+    Test cases for the memory-mapped columnar store.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(COLUMNAR_STORE_DIR=os.path.join(directory.name, 'store'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        paths = SyntheticDataset(7, 70, seed=1).write(directory.name)
+        loader = ProcessExcelFile()
+        loader.load_covid19_data(paths['covid_19_data'])
+        loader.load_time_series_files({data_type: paths[data_type] for data_type in DATA_TYPES})
+
+    def test_totals_match_rollups(self):
+        """
+        Test that the store, rebuilt by ingestion, sums the same totals as the rollups.
+        """
+        store = get_store(COVID19_DATA)
+        self.assertIsNotNone(store)
+        for start_date, end_date in ((None, None), (date(2020, 2, 3), date(2020, 3, 10)), (date(2020, 3, 31), date(2020, 5, 1))):
+            for granularity in GRANULARITIES:
+                for by_country in (False, True):
+                    self.assertEqual(list(store.totals(start_date, end_date, by_country, granularity)),
+                                     list(rollup_totals(start_date, end_date, by_country, granularity)))
+                for country in ('Country 1', 'Nowhere'):
+                    self.assertEqual(list(store.totals(start_date, end_date, granularity=granularity, country=country)),
+                                     list(rollup_totals(start_date, end_date, granularity=granularity, country=country)))
+
+        days, series = get_store(TIME_SERIES_DATA).country_series('Country 0', date(2020, 2, 1), date(2020, 2, 10))
+        self.assertEqual(len(days), 10)
+        self.assertEqual(series['confirmed'].tolist(), [
+            sum(TimeSeriesData.objects.filter(region__country_region='Country 0', date=day).values_list('confirmed', flat=True))
+            for day in days.astype(object)])
+
+    def test_chart_data_is_compressed(self):
+        """
+        Test that the chart payload, summed from the store, is gzipped when the client accepts it.
+        """
+        url = '/api/chart-data/?country=Country 1&granularity=day'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        payload = json.loads(gzip.decompress(response.content))
+        self.assertEqual(payload['confirmed'], [row['total_confirmed'] for row in rollup_totals(granularity='day', country='Country 1')])
+        self.assertFalse(self.client.get(url).has_header('Content-Encoding'))
+        self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, deflate').has_header('Content-Encoding'))
+
+    def test_accepts_encoding_honours_quality_values(self):
+        """
+        Test that codings refused with q=0 are not accepted, whether listed by name or through *.
+        """
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual((accepts_encoding(request, 'br'), accepts_encoding(request, 'gzip')), (False, True))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='GZIP; q=0.5, *;q=0')
+        self.assertEqual((accepts_encoding(request, 'gzip'), accepts_encoding(request, 'br')), (True, False))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='*')
+        self.assertTrue(accepts_encoding(request, 'br'))
+
+    def test_stale_store_is_not_used(self):
+        """
+        Test that the store is ignored once the data changes, and the API falls back to the rollups.
+        """
+        self.assertIsNotNone(get_store(COVID19_DATA))
+        Covid19Data.objects.create(observation_date=date(2021, 1, 1), region_id=get_region_id('Elsewhere'),
+                                   last_update=datetime(2021, 1, 1, tzinfo=dt_timezone.utc), confirmed=5, deaths=0, recovered=0)
+        refresh_rollups(date(2021, 1, 1), date(2021, 1, 1))
+        self.assertIsNone(get_store(COVID19_DATA))
+        response = self.client.get('/api/covid19-country-data/', {'start_date': '2021-01-01', 'end_date': '2021-01-31'})
+        self.assertEqual(read_json(response), [{'country_region': 'Elsewhere', 'year_month': '2021-01',
+                                                'total_confirmed': 5, 'total_deaths': 0, 'total_recovered': 0}])
+
+
+class AnalyticsTests(TestCase):
+    """
+    Test cases for the derived time series metrics.
+    """
+    def setUp(self):
+        """
+        Set up ten days of a country with two provinces; the first one doubles every day.
+        """
+        TimeSeriesData.objects.bulk_create(
+            [TimeSeriesData(date=date(2020, 1, day + 1), region_id=get_region_id('A', 'P1'),
+                            confirmed=2 ** day, deaths=0, recovered=day) for day in range(10)]
+            + [TimeSeriesData(date=date(2020, 1, day + 1), region_id=get_region_id('A', 'P2'),
+                              confirmed=10 * day, deaths=day, recovered=0) for day in range(10) if day != 4])
+
+    def test_derived_metrics(self):
+        """
+        Test the deltas, rolling means, doubling times and per-capita rates, with the days before the range read for them.
+        """
+        response = self.client.get('/api/analytics/', {'country': 'A', 'province': 'P1', 'start_date': '2020-01-04',
+                                                       'end_date': '2020-01-10', 'window': 3, 'population': 1000,
+                                                       'metrics': 'confirmed'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['dates'], [f'2020-01-{day:02d}' for day in range(4, 11)])
+        self.assertEqual(data['confirmed'], [2 ** day for day in range(3, 10)])
+        self.assertEqual(data['new_confirmed'], [2 ** (day - 1) for day in range(3, 10)])
+        self.assertEqual(data['new_confirmed_avg'], [round(7 * 2 ** day / 3, 3) for day in range(7)])
+        self.assertEqual(data['confirmed_doubling_days'], [1.0] * 7)
+        self.assertEqual(data['confirmed_per_100k'], [100.0 * 2 ** day for day in range(3, 10)])
+        self.assertNotIn('new_deaths', data)
+
+        data = analytics('A', 'P2', window=3)  # P2 has no row on day 5, so it carries day 4 over
+        self.assertEqual(data['new_deaths'], [None, 1, 1, 1, 0, 2, 1, 1, 1, 1])
+        self.assertEqual(data['new_confirmed_avg'][:3], [None, None, None])
+
+        for params in ({'window': 0}, {'points': 'many'}, {'metrics': 'cases'}):
+            self.assertEqual(self.client.get('/api/analytics/', params).status_code, 400)
+
+    def test_downsampling_and_store(self):
+        """
+        Test that buckets end on the last day and sum the deltas, and that the columnar store gives the same results.
+        """
+        data = analytics('A', points=3)
+        self.assertEqual(data['bucket_days'], 4)
+        self.assertEqual(data['dates'], ['2020-01-02', '2020-01-06', '2020-01-10'])
+        self.assertEqual(data['confirmed'], [2 + 10, 32 + 50, 512 + 90])
+        self.assertEqual(data['new_confirmed'], [None, 82 - 12, 602 - 82])
+
+        expected = {country: analytics(country, start_date=date(2020, 1, 3), end_date=date(2020, 1, 9), points=4)
+                    for country in ('A', None)}
+        with tempfile.TemporaryDirectory() as directory, self.settings(COLUMNAR_STORE_DIR=directory):
+            self.assertIsNotNone(build_store(TIME_SERIES_DATA))
+            for country, result in expected.items():
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(analytics(country, start_date=date(2020, 1, 3), end_date=date(2020, 1, 9), points=4), result)
+                self.assertFalse([query for query in queries if 'GROUP BY' in query['sql']])
+
+
+class FileJobTests(TestCase):
+    """
+    Test cases for queueing uploaded files for background processing.
+    """
+    def setUp(self):
+        """
+        Set up the test client and a media directory for uploaded files.
+        """
+        self.client = APIClient()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def create_upload(self, title, content):
+        """
+        Create a FileUpload holding the given CSV content.
+        """
+        return FileUpload.objects.create(
+            title=title, file=SimpleUploadedFile(f'{title}.csv', content.encode(), content_type='text/csv'))
+
+    def test_process_file_is_queued_then_processed(self):
+        """
+        Test that processing returns at once and the worker records progress.
+        """
+        file_upload = self.create_upload('covid_19_data', (
+            "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+            "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"
+            "2,01/22/2020,Macau\n"
+        ))
+        response = self.client.post(f'/api/fileupload/{file_upload.pk}/process_file/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'Queued')
+        self.assertEqual(Covid19Data.objects.count(), 0)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'Processed')
+        self.assertEqual((file_upload.rows_done, file_upload.rows_failed), (1, 1))
+        self.assertIsNotNone(file_upload.duration)
+        self.assertEqual(Covid19Data.objects.count(), 1)
+
+    def test_unknown_file_fails(self):
+        """
+        Test that a file the loaders do not recognise is marked as failed.
+        """
+        file_upload = self.create_upload('notes', 'a,b\n1,2\n')
+        self.client.post(f'/process-file/{file_upload.pk}/')
+        run_pending_jobs()
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'Failed')
+        self.assertIn('notes', file_upload.error)
+
+    def put_part(self, file_upload, number, content, sha256=None):
+        """
+        Send a part of a chunked upload with its checksum.
+        """
+        return self.client.put(f'/api/fileupload/{file_upload}/parts/{number}/', content, content_type='application/octet-stream',
+                               HTTP_X_CHECKSUM_SHA256=sha256 or hashlib.sha256(content).hexdigest())
+
+    def test_chunked_upload_is_loaded_as_parts_arrive(self):
+        """
+        Test that parts sent out of order are assembled in order, and rows are loaded as soon as
+        their lines are complete, before the upload is completed.
+        """
+        content = (
+            "SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+            "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n"
+            "2,01/22/2020,,Japan,1/22/2020 17:00,2.0,0.0,0.0\n"
+            "3,01/23/2020,,Japan,1/23/2020 17:00,4.0,0.0,0.0\n"
+        ).encode()
+        parts = [content[:170], content[170:220], content[220:]]  # Both boundaries split a row
+        response = self.client.post('/api/fileupload/chunked/', {'filename': 'covid_19_data.csv'}, format='json')
+        self.assertEqual((response.status_code, response.data['status']), (201, 'Uploading'))
+        upload = response.data['id']
+
+        self.assertEqual(self.put_part(upload, 1, parts[0]).status_code, 201)
+        self.assertEqual(self.put_part(upload, 3, parts[2]).status_code, 201)
+        run_pending_jobs()
+        file_upload = FileUpload.objects.get(pk=upload)
+        self.assertEqual((file_upload.status, file_upload.parts_assembled, file_upload.rows_done), ('Uploading', 1, 1))
+        self.assertEqual(Covid19Data.objects.count(), 1)
+
+        self.assertEqual(self.put_part(upload, 2, parts[1]).status_code, 201)
+        self.assertEqual([part['number'] for part in self.client.get(f'/api/fileupload/{upload}/parts/').data], [1, 2, 3])
+        run_pending_jobs()
+        self.assertEqual(Covid19Data.objects.count(), 3)
+        response = self.client.post(f'/api/fileupload/{upload}/complete/', {'part_count': 3}, format='json')
+        self.assertEqual(response.status_code, 202)
+        run_pending_jobs()
+        file_upload.refresh_from_db()
+        self.assertEqual((file_upload.status, file_upload.parts_assembled, file_upload.rows_done), ('Processed', 3, 3))
+        with file_upload.file.open('rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_abandoned_job_is_queued_again(self):
+        """
+        Test that a job that stopped reporting progress is queued again and run, and a live one left alone.
+        """
+        content = ("SNo,ObservationDate,Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+                   "1,01/22/2020,Hubei,Mainland China,1/22/2020 17:00,444.0,17.0,28.0\n")
+        abandoned, live = self.create_upload('covid_19_data', content), self.create_upload('covid_19_data', content)
+        now = datetime.now(dt_timezone.utc)
+        FileUpload.objects.filter(pk=abandoned.pk).update(status='Processing', started_at=now - timedelta(hours=2),
+                                                          heartbeat_at=now - timedelta(hours=1), rows_done=7)
+        FileUpload.objects.filter(pk=live.pk).update(status='Processing', started_at=now - timedelta(hours=2), heartbeat_at=now)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        abandoned.refresh_from_db()
+        self.assertEqual((abandoned.status, abandoned.rows_done), ('Processed', 1))
+        self.assertEqual(FileUpload.objects.get(pk=live.pk).status, 'Processing')
+        self.assertEqual(Covid19Data.objects.count(), 1)
+
+    def test_runner_is_resumed_only_when_enabled(self):
+        """
+        Test that loading the apps starts the in-process runner only with FILE_JOBS_RESUME_ON_START.
+        """
+        config = apps.get_app_config('app')
+        for enabled, in_process, calls in ((False, True, 0), (True, False, 0), (True, True, 1)):
+            with self.settings(FILE_JOBS_RESUME_ON_START=enabled, FILE_JOBS_RUN_IN_PROCESS=in_process), \
+                    patch('app.jobs.start_worker') as start_worker:
+                config.ready()
+            self.assertEqual(start_worker.call_count, calls)
+
+    def test_chunked_upload_checks_parts(self):
+        """
+        Test that a part not matching its checksum is rejected, and an upload missing parts cannot be completed.
+        """
+        upload = self.client.post('/api/fileupload/chunked/', {'filename': 'covid_19_data.csv'}, format='json').data['id']
+        response = self.put_part(upload, 1, b'SNo,ObservationDate\n', sha256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('checksum', response.data['error'])
+        self.assertEqual(self.put_part(upload, 2, b'1,01/22/2020\n').status_code, 201)
+        response = self.client.post(f'/api/fileupload/{upload}/complete/', {'part_count': 2}, format='json')
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Missing parts: 1'))
+
+
+class RollupTests(TestCase):
+    """
+    Test cases for the Covid19Data rollups behind the aggregate APIs.
+    """
+    def setUp(self):
+        """
+        Set up the test client and Covid19Data spanning two months.
+        """
+        self.client = APIClient()
+        last_update = datetime.strptime('2020-02-01 17:00:00', '%Y-%m-%d %H:%M:%S')
+        for observation_date, country_region, confirmed in [
+            ('2020-01-30', 'China', 10), ('2020-01-31', 'China', 20), ('2020-01-31', 'Japan', 1),
+            ('2020-02-01', 'China', 30), ('2020-02-29', 'Japan', 5),
+        ]:
+            Covid19Data.objects.create(observation_date=observation_date, region_id=get_region_id(country_region),
+                                       last_update=last_update, confirmed=confirmed, deaths=0, recovered=0)
+        refresh_rollups()
+
+    def test_global_monthly_totals(self):
+        """
+        Test the global monthly totals with and without a date range.
+        """
+        response = self.client.get('/api/covid19-data/')
+        self.assertEqual([(row['year_month'], row['total_confirmed']) for row in read_json(response)],
+                         [('2020-01', 31), ('2020-02', 35)])
+        response = self.client.get('/api/covid19-data/?start_date=2020-01-31&end_date=2020-02-01')
+        self.assertEqual([(row['year_month'], row['total_confirmed']) for row in read_json(response)],
+                         [('2020-01', 21), ('2020-02', 30)])
+
+    def test_country_monthly_totals(self):
+        """
+        Test the per-country monthly totals over a range covering a full month.
+        """
+        response = self.client.get('/api/covid19-country-data/?start_date=2020-01-31&end_date=2020-02-29')
+        self.assertEqual(read_json(response), [
+            {'country_region': 'China', 'year_month': '2020-01', 'total_confirmed': 20, 'total_deaths': 0, 'total_recovered': 0},
+            {'country_region': 'China', 'year_month': '2020-02', 'total_confirmed': 30, 'total_deaths': 0, 'total_recovered': 0},
+            {'country_region': 'Japan', 'year_month': '2020-01', 'total_confirmed': 1, 'total_deaths': 0, 'total_recovered': 0},
+            {'country_region': 'Japan', 'year_month': '2020-02', 'total_confirmed': 5, 'total_deaths': 0, 'total_recovered': 0},
+        ])
+
+    def test_incremental_refresh(self):
+        """
+        Test that refreshing a single day updates its month and leaves other months alone.
+        """
+        Covid19Data.objects.filter(observation_date='2020-02-01').update(confirmed=100)
+        refresh_rollups(date(2020, 2, 1), date(2020, 2, 1))
+        response = self.client.get('/api/covid19-data/')
+        self.assertEqual([row['total_confirmed'] for row in read_json(response)], [31, 105])
+
+    def test_granularity(self):
+        """
+        Test the day, week and year granularities.
+        """
+        response = self.client.get('/api/covid19-data/?granularity=week&start_date=2020-01-27&end_date=2020-02-09')
+        self.assertEqual([(row['week_start'], row['total_confirmed']) for row in read_json(response)],
+                         [('2020-01-27', 61)])
+        response = self.client.get('/api/covid19-country-data/?granularity=day&start_date=2020-01-31&end_date=2020-01-31')
+        self.assertEqual([(row['country_region'], row['date']) for row in read_json(response)],
+                         [('China', '2020-01-31'), ('Japan', '2020-01-31')])
+        response = self.client.get('/api/covid19-data/?granularity=year&start_date=2020-01-31&end_date=2020-12-31')
+        self.assertEqual(read_json(response), [{'year': '2020', 'total_confirmed': 56, 'total_deaths': 0, 'total_recovered': 0}])
+        self.assertEqual(self.client.get('/api/covid19-data/?granularity=hour').status_code, 400)
+
+    def test_invalid_date_range(self):
+        """
+        Test that a malformed date range is rejected.
+        """
+        response = self.client.get('/api/covid19-data/?start_date=2020-13-01&end_date=x')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_async_streaming_over_asgi(self):
+        """
+        Test that, served over ASGI, the aggregate APIs stream from an async iterator the same
+        rows as over WSGI, and are cached the same way.
+        """
+        async def read_async_json(response):
+            return json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+
+        for url in ('/api/covid19-data/?start_date=2020-01-31&end_date=2020-02-29',
+                    '/api/covid19-country-data/?granularity=week'):
+            response = await self.async_client.get(url)
+            self.assertTrue(response.is_async)
+            self.assertEqual(await read_async_json(response), read_json(await sync_to_async(self.client.get)(url)))
+            cached = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+            self.assertEqual(cached.status_code, 304)
+
+    def test_chart_data(self):
+        """
+        Test the chart payload of the world and of a country.
+        """
+        response = self.client.get('/api/chart-data/?start_date=2020-01-31&end_date=2020-02-29')
+        self.assertEqual(read_json(response), {
+            'country': None, 'granularity': 'month', 'labels': ['2020-01', '2020-02'],
+            'confirmed': [21, 35], 'deaths': [0, 0], 'recovered': [0, 0], 'countries': ['China', 'Japan'],
+        })
+        payload = read_json(self.client.get('/api/chart-data/?country=Japan&granularity=day'))
+        self.assertEqual((payload['labels'], payload['confirmed']), (['2020-01-31', '2020-02-29'], [1, 5]))
+        self.assertNotIn('countries', payload)
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Test cases for caching the aggregate and list API responses.
+    """
+    def setUp(self):
+        """
+        Set up the test client, an empty cache and one Covid19Data entry.
+        """
+        self.client = APIClient()
+        cache.clear()
+        Covid19Data.objects.create(observation_date='2020-01-22', region_id=get_region_id('China'), last_update=datetime(2020, 1, 22),
+                                   confirmed=548, deaths=17, recovered=28)
+        refresh_rollups()
+
+    def test_cached_until_data_changes(self):
+        """
+        Test that repeated requests are served from the cache until new data is committed.
+        """
+        url = '/api/covid19-data/?start_date=2020-01-01&end_date=2020-01-31'
+        first = read_json(self.client.get(url))
+        with self.assertNumQueries(1):  # Only the data version lookup
+            second = read_json(self.client.get(url))
+        self.assertEqual(first, second)
+
+        Covid19Data.objects.create(observation_date='2020-01-23', region_id=get_region_id('China'), last_update=datetime(2020, 1, 23),
+                                   confirmed=600, deaths=20, recovered=30)
+        refresh_rollups(date(2020, 1, 23), date(2020, 1, 23))
+        self.assertEqual(read_json(self.client.get(url))[0]['total_confirmed'], 1148)
+
+    def test_conditional_requests(self):
+        """
+        Test that a matching ETag is answered with 304 Not Modified.
+        """
+        response = self.client.get('/api/covid19data/')
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get('/api/covid19data/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
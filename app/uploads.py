@@ -0,0 +1,191 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Sum
+from .jobs import STATUS_UPLOADING
+from .models import FileUpload, FileUploadPart
+
+# Directory, under MEDIA_ROOT, of the parts waiting to be appended to their upload
+PARTS_DIR = 'uploads/parts'
+
+# Bytes read from the request or copied between files at a time
+BLOCK_SIZE = 2 ** 20
+
+
+def get_upload_path(file_upload):
+    """
+    Returns the path of the (possibly partly assembled) file of an upload.
+    """
+    return os.path.join(settings.MEDIA_ROOT, file_upload.file.name)
+
+
+def get_part_path(file_upload, number):
+    """
+    Returns the path a received part is stored at until it is appended.
+    """
+    return os.path.join(settings.MEDIA_ROOT, PARTS_DIR, str(file_upload.pk), f'{number:06d}')
+
+
+def start_upload(title, filename):
+    """
+    Create a chunked upload and its empty file.
+
+    Args:
+        title (str): The title of the file, which tells the loader what data it holds.
+        filename (str): The name of the file, made unique under uploads/.
+
+    Returns:
+        FileUpload: The upload, with status Uploading.
+    """
+    file_upload = FileUpload(title=title, chunked=True, status=STATUS_UPLOADING)
+    file_upload.file.save(os.path.basename(filename), ContentFile(b''), save=False)
+    file_upload.save()
+    return file_upload
+
+
+def save_part(file_upload, number, stream, sha256):
+    """
+    Store a part of a chunked upload, streaming it to disk while hashing it.
+
+    Sending a part again replaces it, so a client resumes by resending the parts
+    missing from the upload's parts listing.
+
+    Args:
+        file_upload (FileUpload): The upload.
+        number (int): The position of the part, starting at 1.
+        stream: A file-like object to read the part from, such as the request.
+        sha256 (str): The expected SHA-256 hex digest of the part.
+
+    Returns:
+        FileUploadPart: The stored part.
+
+    Raises:
+        ValueError: If the number is out of range, the part is too large, already
+            assembled with a different content, or does not match its checksum.
+    """
+    if number < 1 or (file_upload.part_count is not None and number > file_upload.part_count):
+        raise ValueError(f'Part number must be between 1 and {file_upload.part_count or "the number of parts"}')
+    sha256 = sha256.lower()
+    if number <= file_upload.parts_assembled:
+        part = file_upload.parts.get(number=number)
+        if part.sha256 != sha256:
+            raise ValueError(f'Part {number} was already assembled with a different content')
+        return part
+
+    max_size = getattr(settings, 'UPLOAD_MAX_PART_SIZE', 100 * 2 ** 20)
+    path = get_part_path(file_upload, number)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    # A name of its own, so concurrent PUTs of the same part, even from one process, never share a temporary file
+    file = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=f'{os.path.basename(path)}.', suffix='.tmp',
+                                       delete=False)
+    temp_path = file.name
+    try:
+        with file:
+            while block := stream.read(BLOCK_SIZE):
+                size += len(block)
+                if size > max_size:
+                    raise ValueError(f'Parts must not be larger than {max_size} bytes')
+                digest.update(block)
+                file.write(block)
+        if digest.hexdigest() != sha256:
+            raise ValueError(f'Part {number} does not match its checksum')
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    part, _ = FileUploadPart.objects.update_or_create(file_upload=file_upload, number=number,
+                                                      defaults={'size': size, 'sha256': sha256})
+    return part
+
+
+def complete_upload(file_upload, part_count):
+    """
+    Record that every part of a chunked upload was sent.
+
+    Raises:
+        ValueError: If some of the parts 1 to part_count were not received.
+    """
+    received = set(file_upload.parts.filter(number__lte=part_count).values_list('number', flat=True))
+    missing = [number for number in range(1, part_count + 1) if number not in received]
+    if part_count < 1 or missing:
+        raise ValueError(f'Missing parts: {", ".join(map(str, missing[:20]))}' if missing else 'part_count must be at least 1')
+    file_upload.part_count = part_count
+    file_upload.save(update_fields=['part_count'])
+
+
+def is_assembled(file_upload):
+    """
+    Returns whether every part of a chunked upload was appended to its file.
+    """
+    return file_upload.part_count is not None and file_upload.parts_assembled == file_upload.part_count
+
+
+def append_file(source_path, destination):
+    """
+    Append a file to an open binary file, in the kernel with sendfile where the platform allows it.
+    """
+    with open(source_path, 'rb') as source:
+        destination.flush()
+        start = destination.tell()
+        try:
+            offset, size = 0, os.fstat(source.fileno()).st_size
+            while offset < size:
+                sent = os.sendfile(destination.fileno(), source.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):  # No sendfile, or not between these files
+            destination.seek(start)
+            destination.truncate()
+            shutil.copyfileobj(source, destination, BLOCK_SIZE)
+        destination.seek(0, os.SEEK_END)
+
+
+def assemble_parts(file_upload):
+    """
+    Append the received parts that follow the assembled ones, in order, to the upload's file.
+
+    Parts are never read into memory. The file is first truncated to the size of
+    the parts already assembled, so an append interrupted by a crash is redone
+    rather than duplicated. Only one job works on an upload at a time.
+
+    Returns:
+        int: The number of parts appended.
+    """
+    received = dict(file_upload.parts.filter(number__gt=file_upload.parts_assembled).values_list('number', 'size'))
+    assembled_size = file_upload.parts.filter(number__lte=file_upload.parts_assembled).aggregate(size=Sum('size'))['size'] or 0
+    appended = 0
+    with open(get_upload_path(file_upload), 'r+b') as file:
+        file.truncate(assembled_size)
+        file.seek(assembled_size)
+        while file_upload.parts_assembled + 1 in received:
+            number = file_upload.parts_assembled + 1
+            append_file(get_part_path(file_upload, number), file)
+            file.flush()
+            file_upload.parts_assembled = number
+            file_upload.save(update_fields=['parts_assembled'])
+            os.remove(get_part_path(file_upload, number))
+            appended += 1
+    if is_assembled(file_upload):
+        shutil.rmtree(os.path.dirname(get_part_path(file_upload, 1)), ignore_errors=True)
+    return appended
+
+
+def get_complete_lines_end(filepath):
+    """
+    Returns the offset just past the last newline of a file, or 0 when it has none.
+    """
+    with open(filepath, 'rb') as file:
+        end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - BLOCK_SIZE, 0)
+            file.seek(start)
+            position = file.read(end - start).rfind(b'\n')
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
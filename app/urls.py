@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import home_page, upload_page, process_file, chart_page, covid19_data_api, covid19_country_data_api, get_comments
+from .views import home_page, upload_page, process_file, chart_page, covid19_data_api, covid19_country_data_api, chart_data_api, analytics_api, get_comments, metrics
 from rest_framework.routers import DefaultRouter
 from .views import Covid19DataViewSet, TimeSeriesDataViewSet, FileUploadViewSet, CommentViewSet
 
@@ -18,4 +18,7 @@ urlpatterns = [
     path('api/comments/', get_comments, name='api-comments'),
     path('api/covid19-data/', covid19_data_api, name='covid19-data-api'),
     path('api/covid19-country-data/', covid19_country_data_api, name='covid19-country-data-api'),
+    path('api/chart-data/', chart_data_api, name='chart-data-api'),
+    path('api/analytics/', analytics_api, name='analytics-api'),
+    path('metrics/', metrics, name='metrics'),
 ]
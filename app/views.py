@@ -1,28 +1,458 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from django.core.management import call_command
-from django.db.models import Sum
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import Covid19Data, TimeSeriesData, FileUpload, Comment
-from .serializers import Covid19DataSerializer, TimeSeriesDataSerializer, FileUploadSerializer, CommentSerializer
-from django.http import JsonResponse
+from .serializers import Covid19DataSerializer, TimeSeriesDataSerializer, FileUploadSerializer, FileUploadPartSerializer, CommentSerializer, get_row_encoder
+from .jobs import enqueue_file, enqueue_upload
+from .uploads import complete_upload, save_part, start_upload
+from .rollups import GRANULARITIES, METRICS, PERIOD_KEYS, arollup_totals, refresh_rollups, rollup_countries, rollup_totals
+from .analytics import DEFAULT_WINDOW, MAX_WINDOW, analytics
+from .columnar import get_store, get_store_root
+from .cache import COVID19_DATA, TIME_SERIES_DATA, CachedListMixin, bump_data_version, cache_data_response
+from .export import export_response
+from .parsers import NDJSONParser
+from .metrics import render_metrics
+from .compression import compressed
+from .fingerprints import forget_date_fingerprints
+from .process_excel_file import COVID19_SOURCE, TIME_SERIES_SOURCE
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils.dateparse import parse_date
-import pandas as pd
+from base64 import b64decode, b64encode
+from urllib import parse
+import binascii
+import io
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-class Covid19DataViewSet(viewsets.ModelViewSet):
+# Rows encoded per chunk of the responses streamed from async iterators
+STREAM_BATCH_SIZE = 200
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on (date, id), the ordering of the list endpoints.
+
+    The cursor holds the date and id of the row a page starts after (or, going back,
+    before), and the page is read with WHERE date > d OR (date = d AND id > last_id).
+    Unlike CursorPagination, which seeks on the date only and pages through the rows
+    sharing a date with an OFFSET, there is no OFFSET at all, so deep pages and dates
+    with any number of rows cost the same as the first page.
+    """
+    ordering = None  # (date field, 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the page the request's cursor points at.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        date_field, id_field = self.ordering
+        reverse = self.cursor is not None and self.cursor[2]
+        if self.cursor is not None:
+            value, last_id, _ = self.cursor
+            compare = 'lt' if reverse else 'gt'
+            queryset = queryset.filter(Q(**{f'{date_field}__{compare}': value})
+                                       | Q(**{date_field: value, f'{id_field}__{compare}': last_id}))
+        order = [f'-{date_field}', f'-{id_field}'] if reverse else [date_field, id_field]
+        rows = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_position(self, row):
+        """
+        Returns the (date, id) of a row, a model instance or a .values() dict.
+        """
+        if isinstance(row, dict):
+            return tuple(row[field] for field in self.ordering)
+        return tuple(getattr(row, field) for field in self.ordering)
+
+    def get_next_link(self):
+        """
+        Returns the URL of the page after the last row of this one.
+        """
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor((*self.get_position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        """
+        Returns the URL of the page before the first row of this one.
+        """
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor((*self.get_position(self.page[0]), True))
+
+    def encode_cursor(self, cursor):
+        """
+        Returns the URL of a (date, id, reverse) cursor.
+        """
+        value, last_id, reverse = cursor
+        tokens = {'d': str(value), 'i': str(last_id)}
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """
+        Returns the (date, id, reverse) cursor of a request, or None on the first page.
+
+        Raises:
+            NotFound: If the cursor is malformed.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+            value = parse_date(tokens['d'][0])
+            last_id = int(tokens['i'][0])
+            reverse = tokens.get('r', ['0'])[0] == '1'
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id, reverse
+
+class Covid19DataPagination(KeysetPagination):
+    """
+    Keyset pagination for COVID-19 data entries.
+    """
+    ordering = ('observation_date', 'id')
+
+class TimeSeriesDataPagination(KeysetPagination):
+    """
+    Keyset pagination for time series data entries.
+    """
+    ordering = ('date', 'id')
+
+class FieldProjectionMixin:
+    """
+    ViewSet mixin applying the 'fields' query param of read requests,
+    e.g. ?fields=observation_date,confirmed, to both the serializer and the SELECT.
+    """
+    def get_projected_fields(self):
+        """
+        Returns the requested field names, or None to return every field.
+
+        Raises:
+            ValidationError: If a requested field does not exist.
+        """
+        value = self.request.query_params.get('fields') if self.request.method in ('GET', 'HEAD') else None
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(self.get_serializer_class()().fields)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Returns the serializer, limited to the requested fields.
+        """
+        fields = self.get_projected_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        """
+        Returns the queryset, loading only the requested fields and the ones pagination orders on.
+        """
+        queryset = super().get_queryset()
+        fields = self.get_projected_fields()
+        if fields is not None:
+            serializer_fields = self.get_serializer_class()().fields
+            sources = [serializer_fields[name].source.split('.')[0] for name in fields]  # The region of its names
+            ordering = [name.lstrip('-') for name in self.pagination_class.ordering]
+            if 'region' not in sources:
+                queryset = queryset.select_related(None)  # A deferred relation cannot be joined
+            queryset = queryset.only(*dict.fromkeys(sources + ordering))
+        return queryset
+
+class ValuesListMixin:
+    """
+    ViewSet mixin serving list requests from .values() rows encoded by a RowEncoder,
+    skipping model instances and the per-field serializer machinery.
+    The response is the same as the serializer's.
+    """
+    def list(self, request, *args, **kwargs):
+        """
+        Returns a page of rows, encoded with the serializer's cached RowEncoder.
+        """
+        fields = self.get_projected_fields()
+        encoder = get_row_encoder(self.get_serializer_class(), tuple(fields) if fields else None)
+        ordering = tuple(name.lstrip('-') for name in self.pagination_class.ordering)
+        queryset = self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(encoder.lookups + ordering))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(encoder.encode(page))
+        return Response(encoder.encode(queryset))
+
+class ExportMixin:
+    """
+    ViewSet mixin adding an export action that streams the filtered rows as a file.
+    """
+    export_filename = None
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams every row matching the date and country filters, ordered like the list pages.
+
+        The output param selects csv (default), ndjson, parquet or arrow, and fields= the columns.
+        Rows are read from a database cursor and encoded as they arrive.
+        """
+        fields = self.get_projected_fields() or list(self.get_serializer_class()().fields)
+        encoder = get_row_encoder(self.get_serializer_class())
+        lookups = dict(zip(encoder.fields, encoder.lookups))
+        queryset = self.get_queryset().order_by(*self.pagination_class.ordering).annotate(
+            **{name: F(lookups[name]) for name in fields if lookups[name] != name})  # Region names, joined
+        try:
+            return export_response(queryset, fields, request.query_params.get('output', 'csv'), self.export_filename)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class BulkMixin:
+    """
+    ViewSet mixin adding a bulk endpoint that applies a list of items in one transaction.
+
+    The payload is a JSON array or NDJSON. POST creates the items, PUT and PATCH update
+    them by id, and DELETE deletes them (ids, or objects with an id). Items are validated
+    one by one: the valid ones are written with bulk_create, bulk_update or a single
+    delete, and the invalid ones are reported by index so only those need resending.
+    """
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
+    date_field = None
+    # IngestionFingerprint sources of the files loading the model
+    fingerprint_sources = ()
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], url_path='bulk',
+            parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Applies the items of the payload and returns the count of applied items and the per-item errors.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a JSON array or NDJSON payload'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response({'error': f'At most {self.bulk_max_items} items per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'POST':
+            key, apply_items = 'created', self.bulk_create_items
+        elif request.method == 'DELETE':
+            key, apply_items = 'deleted', self.bulk_destroy_items
+        else:
+            key, apply_items = 'updated', lambda items: self.bulk_update_items(items, partial=request.method == 'PATCH')
+        try:
+            with transaction.atomic():
+                applied, errors, dates = apply_items(items)
+                if dates:
+                    self.rows_changed(dates)
+                    self.bulk_changed(dates)
+        except IntegrityError:
+            # Conflicts are reported per item by validation, so this is a row written by a concurrent request
+            return Response({'error': 'The items conflict with rows written meanwhile; nothing was applied'},
+                            status=status.HTTP_409_CONFLICT)
+
+        if errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif request.method == 'POST':
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({key: applied, 'errors': errors}, status=response_status)
+
+    def bulk_create_items(self, items):
+        """
+        Validates the items and creates the valid ones.
+
+        Returns:
+            tuple: (number created, per-item errors, dates of the created rows).
+        """
+        model = self.queryset.model
+        instances, errors, keys = [], [], set()
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+            elif conflict := self.get_item_conflict(serializer, keys):
+                errors.append({'index': index, 'errors': conflict})
+            else:
+                instances.append(model(**serializer.validated_data))
+        model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+        return len(instances), errors, [getattr(instance, self.date_field) for instance in instances]
+
+    def bulk_update_items(self, items, partial):
+        """
+        Validates the items against the rows with their id and updates the valid ones.
+
+        Returns:
+            tuple: (number updated, per-item errors, previous and new dates of the updated rows).
+        """
+        ids = [self.get_item_id(item) for item in items]
+        existing = self.queryset.in_bulk([pk for pk in ids if pk is not None])
+        updated, fields, errors, dates, keys = {}, set(), [], [], set()
+        for index, (pk, item) in enumerate(zip(ids, items)):
+            instance = existing.get(pk)
+            if instance is None:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                continue
+            serializer = self.get_serializer(instance, data=item, partial=partial)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            if conflict := self.get_item_conflict(serializer, keys):
+                errors.append({'index': index, 'errors': conflict})
+                continue
+            dates.append(getattr(instance, self.date_field))
+            for attr, value in serializer.validated_data.items():
+                setattr(instance, attr, value)
+            fields.update(serializer.validated_data)
+            dates.append(getattr(instance, self.date_field))
+            updated[pk] = instance
+        if fields:
+            self.queryset.model.objects.bulk_update(updated.values(), sorted(fields), batch_size=self.bulk_batch_size)
+        return len(updated), errors, dates
+
+    @staticmethod
+    def get_item_conflict(serializer, keys):
+        """
+        Returns the errors of a validated item whose unique key, e.g. region and date, repeats the key
+        of an earlier item of the payload, or None after recording its key. The serializer already
+        rejects keys taken by other rows in the database.
+
+        Args:
+            serializer (Serializer): The validated serializer of the item.
+            keys (set): The keys of the earlier valid items.
+        """
+        get_unique_key = getattr(serializer, 'get_unique_key', None)
+        key = get_unique_key(serializer.validated_data) if get_unique_key else None
+        if key is None:
+            return None
+        key = tuple(key.items())
+        if key in keys:
+            return {'non_field_errors': [serializer.get_unique_message()]}
+        keys.add(key)
+        return None
+
+    def bulk_destroy_items(self, items):
+        """
+        Deletes the rows with the ids of the items.
+
+        Returns:
+            tuple: (number deleted, per-item errors, dates of the deleted rows).
+        """
+        ids = [self.get_item_id(item) for item in items]
+        existing = dict(self.queryset.filter(pk__in=[pk for pk in ids if pk is not None]).values_list('pk', self.date_field))
+        errors = [{'index': index, 'errors': {'id': ['Not found.']}} for index, pk in enumerate(ids) if pk not in existing]
+        self.queryset.filter(pk__in=existing).delete()
+        return len(existing), errors, list(existing.values())
+
+    @staticmethod
+    def get_item_id(item):
+        """
+        Returns the integer id of a bulk item, given as an id or an object with an id, or None.
+        """
+        pk = item.get('id') if isinstance(item, dict) else item
+        try:
+            return int(pk)
+        except (TypeError, ValueError):
+            return None
+
+    def rows_changed(self, dates):
+        """
+        Forgets the ingestion fingerprints of the dates of rows written through the API, so
+        that loading a file again restores those rows instead of skipping them as unchanged.
+
+        Args:
+            dates (list): The dates of the written rows.
+        """
+        forget_date_fingerprints(self.fingerprint_sources, dates)
+
+    def bulk_changed(self, dates):
+        """
+        Invalidates what depends on the rows a bulk request wrote; bulk writes send no model signals.
+
+        Args:
+            dates (list): The dates of the written rows.
+        """
+        bump_data_version(self.data_version_name)
+
+class Covid19DataViewSet(BulkMixin, ExportMixin, FieldProjectionMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling COVID-19 data entries.
     """
-    queryset = Covid19Data.objects.all()
+    queryset = Covid19Data.objects.select_related('region')
     serializer_class = Covid19DataSerializer
+    pagination_class = Covid19DataPagination
+    data_version_name = COVID19_DATA
+    export_filename = 'covid19data'
+    date_field = 'observation_date'
+    fingerprint_sources = (COVID19_SOURCE,)
+
+    def perform_create(self, serializer):
+        """
+        Saves a new entry and refreshes the rollups of its date.
+        """
+        instance = serializer.save()
+        self.rows_changed([instance.observation_date])
+        refresh_rollups(instance.observation_date, instance.observation_date)
+
+    def perform_update(self, serializer):
+        """
+        Saves an updated entry and refreshes the rollups of its old and new dates.
+        """
+        previous_date = serializer.instance.observation_date
+        instance = serializer.save()
+        self.rows_changed([previous_date, instance.observation_date])
+        for observation_date in {previous_date, instance.observation_date}:
+            refresh_rollups(observation_date, observation_date)
+
+    def perform_destroy(self, instance):
+        """
+        Deletes an entry and refreshes the rollups of its date.
+        """
+        observation_date = instance.observation_date
+        instance.delete()
+        self.rows_changed([observation_date])
+        refresh_rollups(observation_date, observation_date)
+
+    def bulk_changed(self, dates):
+        """
+        Refreshes the rollups of the dates a bulk request wrote, which also invalidates the cached responses.
+        """
+        refresh_rollups(min(dates), max(dates))
 
     def get_queryset(self):
         """
-        Optionally filters the queryset by date range.
+        Optionally filters the queryset by date range and country.
         """
         queryset = super().get_queryset()
         start_date = self.request.query_params.get('start_date')
@@ -31,18 +461,49 @@ class Covid19DataViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 observation_date__range=[start_date, end_date]
             )
+        country = self.request.query_params.get('country')
+        if country:
+            queryset = queryset.filter(region__country_region=country)
         return queryset
 
-class TimeSeriesDataViewSet(viewsets.ModelViewSet):
+class TimeSeriesDataViewSet(BulkMixin, ExportMixin, FieldProjectionMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling time series data entries.
     """
-    queryset = TimeSeriesData.objects.all()
+    queryset = TimeSeriesData.objects.select_related('region')
     serializer_class = TimeSeriesDataSerializer
+    pagination_class = TimeSeriesDataPagination
+    data_version_name = TIME_SERIES_DATA
+    export_filename = 'timeseriesdata'
+    date_field = 'date'
+    fingerprint_sources = tuple(TIME_SERIES_SOURCE.format(metric) for metric in METRICS)
+
+    def perform_create(self, serializer):
+        """
+        Saves a new entry and forgets the ingestion fingerprints of its date.
+        """
+        instance = serializer.save()
+        self.rows_changed([instance.date])
+
+    def perform_update(self, serializer):
+        """
+        Saves an updated entry and forgets the ingestion fingerprints of its old and new dates.
+        """
+        previous_date = serializer.instance.date
+        instance = serializer.save()
+        self.rows_changed([previous_date, instance.date])
+
+    def perform_destroy(self, instance):
+        """
+        Deletes an entry and forgets the ingestion fingerprints of its date.
+        """
+        date = instance.date
+        instance.delete()
+        self.rows_changed([date])
 
     def get_queryset(self):
         """
-        Optionally filters the queryset by date range.
+        Optionally filters the queryset by date range and country.
         """
         queryset = super().get_queryset()
         start_date = self.request.query_params.get('start_date')
@@ -51,6 +512,9 @@ class TimeSeriesDataViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 date__range=[start_date, end_date]
             )
+        country = self.request.query_params.get('country')
+        if country:
+            queryset = queryset.filter(region__country_region=country)
         return queryset
 
 class FileUploadViewSet(viewsets.ModelViewSet):
@@ -63,13 +527,76 @@ class FileUploadViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def process_file(self, request, pk=None):
         """
-        Processes the uploaded file by running a management command.
+        Queues the uploaded file for background processing.
+
+        Returns immediately; poll the file's detail endpoint for its status and progress.
         """
         file_upload = self.get_object()
-        file_upload.status = 'Processing'
-        file_upload.save()
-        call_command('process_uploaded_file', pk)
-        return redirect('upload-page')
+        enqueue_file(file_upload)
+        return Response(self.get_serializer(file_upload).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['post'])
+    def chunked(self, request):
+        """
+        Starts a chunked upload from a filename and an optional title.
+
+        Then PUT each part's raw bytes to parts/<number>/ with its SHA-256 hex digest in
+        the X-Checksum-SHA256 header, and POST the number of parts to complete/. Parts
+        may be sent in any order and resent; GET parts/ lists the received ones, to
+        resume an interrupted upload. Parts are assembled, and covid_19_data files
+        loaded, in the background as they arrive.
+        """
+        filename = request.data.get('filename')
+        if not filename:
+            return Response({'error': 'filename is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_upload = start_upload(request.data.get('title') or filename.split('.')[0], filename)
+        return Response(self.get_serializer(file_upload).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def parts(self, request, pk=None):
+        """
+        Lists the received parts of a chunked upload.
+        """
+        file_upload = self.get_object()
+        return Response(FileUploadPartSerializer(file_upload.parts.order_by('number'), many=True).data)
+
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<number>[0-9]+)')
+    def upload_part(self, request, pk=None, number=None):
+        """
+        Stores a part of a chunked upload, streamed from the raw request body and verified against
+        the X-Checksum-SHA256 header, and queues the upload to assemble it.
+        """
+        file_upload = self.get_object()
+        sha256 = request.headers.get('X-Checksum-SHA256')
+        if not file_upload.chunked or not sha256:
+            error = 'Not a chunked upload' if not file_upload.chunked else 'The X-Checksum-SHA256 header is required'
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            part = save_part(file_upload, int(number), request.stream or io.BytesIO(), sha256)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue_upload(file_upload)
+        return Response(FileUploadPartSerializer(part).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Records the number of parts of a chunked upload once all were sent, and queues it to finish.
+        """
+        file_upload = self.get_object()
+        try:
+            part_count = int(request.data.get('part_count'))
+        except (TypeError, ValueError):
+            return Response({'error': 'part_count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not file_upload.chunked:
+            return Response({'error': 'Not a chunked upload'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            complete_upload(file_upload, part_count)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue_upload(file_upload)
+        file_upload.refresh_from_db()
+        return Response(self.get_serializer(file_upload).data, status=status.HTTP_202_ACCEPTED)
 
 class CommentPagination(PageNumberPagination):
     """
@@ -95,79 +622,201 @@ class CommentViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(created_at__date=date)
         return queryset
 
-def covid19_data_api(request):
+def get_date_range(request):
     """
-    API endpoint for global COVID-19 data aggregated by month.
+    Returns the (start_date, end_date) filter of a request, or (None, None) unless both are given.
+
+    Raises:
+        ValueError: If either date is malformed.
     """
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-    if start_date and end_date:
-        data = Covid19Data.objects.filter(
-            observation_date__range=[start_date, end_date]
-        ).values('observation_date').annotate(
-            total_confirmed=Sum('confirmed'),
-            total_deaths=Sum('deaths'),
-            total_recovered=Sum('recovered')
-        )
-    else:
-        data = Covid19Data.objects.values('observation_date').annotate(
-            total_confirmed=Sum('confirmed'),
-            total_deaths=Sum('deaths'),
-            total_recovered=Sum('recovered')
-        )
-    
-    df = pd.DataFrame(list(data))
-    if not df.empty:
-        df['observation_date'] = pd.to_datetime(df['observation_date'])
-        df['year_month'] = df['observation_date'].dt.to_period('M')
-
-        monthly_data = df.groupby('year_month').agg({
-            'total_confirmed': 'sum',
-            'total_deaths': 'sum',
-            'total_recovered': 'sum'
-        }).reset_index()
-        monthly_data['year_month'] = monthly_data['year_month'].astype(str)
-        response_data = monthly_data.to_dict(orient='records')
-    else:
-        response_data = []
-    return JsonResponse(response_data, safe=False)
+    if not (start_date and end_date):
+        return None, None
+    start_date, end_date = parse_date(start_date), parse_date(end_date)
+    if start_date is None or end_date is None:
+        raise ValueError('start_date and end_date must be dates in YYYY-MM-DD format')
+    return start_date, end_date
 
-def covid19_country_data_api(request):
+def get_granularity(request):
     """
-    API endpoint for country-wise COVID-19 data aggregated by month.
+    Returns the period granularity of a request, defaulting to month.
+
+    Raises:
+        ValueError: If the granularity is not supported.
     """
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    if start_date and end_date:
-        data = Covid19Data.objects.filter(
-            observation_date__range=[start_date, end_date]
-        ).values('country_region', 'observation_date').annotate(
-            total_confirmed=Sum('confirmed'),
-            total_deaths=Sum('deaths'),
-            total_recovered=Sum('recovered')
-        )
+    granularity = request.GET.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return granularity
+
+def get_int_param(request, name, default=None, minimum=1, maximum=None):
+    """
+    Returns an integer query param of a request, or the default when it is not given.
+
+    Raises:
+        ValueError: If the value is not an integer within [minimum, maximum].
+    """
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        value = None
+    if value is None or value < minimum or (maximum is not None and value > maximum):
+        bounds = f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'
+        raise ValueError(f'{name} must be an integer {bounds}')
+    return value
+
+def get_metrics(request):
+    """
+    Returns the metrics selected by the comma-separated metrics param of a request, all of them by default.
+
+    Raises:
+        ValueError: If a metric is unknown.
+    """
+    value = request.GET.get('metrics')
+    if not value:
+        return METRICS
+    metrics = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = set(metrics) - set(METRICS)
+    if unknown or not metrics:
+        raise ValueError(f"metrics must be among {', '.join(METRICS)}")
+    return metrics
+
+def stream_json_array(rows):
+    """
+    Yields a JSON array one encoded row at a time.
+    """
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + json.dumps(row, cls=DjangoJSONEncoder)
+    yield ']'
+
+async def astream_json_array(rows, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yields a JSON array from an async iterable of rows, batch_size encoded rows at a time,
+    as every chunk sent is awaited through the middleware and the ASGI server.
+    """
+    chunk, separator = ['['], ''
+    async for row in rows:
+        chunk.append(separator + json.dumps(row, cls=DjangoJSONEncoder))
+        separator = ','
+        if len(chunk) >= batch_size:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(']')
+    yield ''.join(chunk)
+
+async def aiterate(rows):
+    """
+    Yields the rows of an iterable that does no I/O, as an async iterable.
+    """
+    for row in rows:
+        yield row
+
+async def aggregate_response(request, by_country):
+    """
+    Streams the totals selected by the request's date range and granularity, summed from the
+    columnar store when it is enabled and current, and read from the rollups otherwise.
+
+    Served over ASGI, the rollups are read with the async ORM and the response streams
+    from an async iterator, so the event loop serves other requests while the queries
+    run. Over WSGI, the rows are read while the server sends the response, as before.
+    """
+    try:
+        start_date, end_date = get_date_range(request)
+        granularity = get_granularity(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    # Opening the store checks its version in the database; there is nothing to open when it is disabled
+    store = await sync_to_async(get_store)(COVID19_DATA) if get_store_root() is not None else None
+    if not isinstance(request, ASGIRequest):
+        totals = store.totals if store is not None else rollup_totals
+        rows = totals(start_date, end_date, by_country=by_country, granularity=granularity)
+        return StreamingHttpResponse(stream_json_array(rows), content_type='application/json')
+    if store is not None:  # Summed in memory
+        rows = aiterate(store.totals(start_date, end_date, by_country=by_country, granularity=granularity))
     else:
-        data = Covid19Data.objects.values('country_region', 'observation_date').annotate(
-            total_confirmed=Sum('confirmed'),
-            total_deaths=Sum('deaths'),
-            total_recovered=Sum('recovered')
+        rows = arollup_totals(start_date, end_date, by_country=by_country, granularity=granularity)
+    return StreamingHttpResponse(astream_json_array(rows), content_type='application/json')
+
+@cache_data_response(COVID19_DATA)
+async def covid19_data_api(request):
+    """
+    API endpoint for global COVID-19 data aggregated by month, or by the given granularity
+    (day, week, month or year).
+    """
+    return await aggregate_response(request, by_country=False)
+
+@cache_data_response(COVID19_DATA)
+async def covid19_country_data_api(request):
+    """
+    API endpoint for country-wise COVID-19 data aggregated by month, or by the given granularity
+    (day, week, month or year).
+    """
+    return await aggregate_response(request, by_country=True)
+
+@compressed
+@cache_data_response(COVID19_DATA)
+def chart_data_api(request):
+    """
+    API endpoint for the chart page: the totals of the world, or of the given country, as
+    columnar arrays (the period labels once, then one array per metric), aggregated by
+    month or the given granularity. Without a country, the names of the countries to
+    pick from are listed too, so the page draws its first chart from a single request.
+    """
+    try:
+        start_date, end_date = get_date_range(request)
+        granularity = get_granularity(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    country = request.GET.get('country') or None
+    store = get_store(COVID19_DATA)
+    totals = store.totals if store is not None else rollup_totals
+    rows = list(totals(start_date, end_date, granularity=granularity, country=country))
+    period_key = PERIOD_KEYS[granularity][0]
+    payload = {'country': country, 'granularity': granularity, 'labels': [row[period_key] for row in rows]}
+    payload.update({metric: [row[f'total_{metric}'] for row in rows] for metric in METRICS})
+    if country is None:
+        payload['countries'] = [name for name in store.countries if name] if store is not None else rollup_countries()
+    return JsonResponse(payload)
+
+@cache_data_response(TIME_SERIES_DATA)
+def analytics_api(request):
+    """
+    API endpoint for the metrics derived from the time series of the world, a country or a
+    province: daily new counts, their rolling mean, growth rate, doubling time and, given
+    a population, per-capita rates.
+
+    Query params: country, province, start_date and end_date, metrics (comma-separated),
+    window (days of the rolling windows, 7 by default), population, and points (the
+    most values returned per series, to size the response for a chart).
+    """
+    try:
+        start_date, end_date = get_date_range(request)
+        result = analytics(
+            country=request.GET.get('country') or None,
+            province=request.GET.get('province') or None,
+            start_date=start_date,
+            end_date=end_date,
+            metrics=get_metrics(request),
+            window=get_int_param(request, 'window', DEFAULT_WINDOW, maximum=MAX_WINDOW),
+            population=get_int_param(request, 'population'),
+            points=get_int_param(request, 'points'),
         )
-    
-    df = pd.DataFrame(list(data))
-    if not df.empty:
-        df['observation_date'] = pd.to_datetime(df['observation_date'])
-        df['year_month'] = df['observation_date'].dt.to_period('M')
-
-        country_month_data = df.groupby(['country_region', 'year_month']).agg({
-            'total_confirmed': 'sum',
-            'total_deaths': 'sum',
-            'total_recovered': 'sum'
-        }).reset_index()
-        country_month_data['year_month'] = country_month_data['year_month'].astype(str)
-        response_data = country_month_data.to_dict(orient='records')
-    else:
-        response_data = []
-    return JsonResponse(response_data, safe=False)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(result)
+
+
+def metrics(request):
+    """
+    Serves the request and ingestion metrics of this process in the Prometheus text format.
+    """
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 
 def chart_page(request):
     """
@@ -200,28 +849,13 @@ def process_file(request, pk):
     
     # Retrieve the FileUpload instance or return a 404 if not found
     file_upload = get_object_or_404(FileUpload, pk=pk)
-    
-    # Update the status to 'Processing'
-    file_upload.status = 'Processing'
-    file_upload.save()
 
-    try:
-        # Call the custom management command to process the uploaded file
-        call_command('process_uploaded_file', pk)
-    except Exception as e:
-        # Update the status to 'Failed' if an error occurs
-        file_upload.status = 'Failed'
-        file_upload.save()
-        logger.error(f"Error processing file {pk}: {e}")
-        return redirect('upload-page')
+    # Queue the file; the background worker moves it through Processing to Processed or Failed
+    enqueue_file(file_upload)
 
-    # Update the status to 'Processed' if the command succeeds
-    file_upload.status = 'Processed'
-    file_upload.save()
-    
     return redirect('upload-page')
     
-def get_comments(request):
+async def get_comments(request):
     date_str = request.GET.get('date')
     if date_str:
         date = parse_date(date_str)
@@ -229,6 +863,5 @@ def get_comments(request):
     else:
         comments = Comment.objects.all()
 
-    # Serialize and return comments
-    # Assuming you have a serializer or a simple JsonResponse setup
-    return JsonResponse({'comments': list(comments.values())})
\ No newline at end of file
+    # Read with the async ORM, so the worker is not blocked while the query runs
+    return JsonResponse({'comments': [comment async for comment in comments.values()]})
\ No newline at end of file
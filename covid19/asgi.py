@@ -3,6 +3,36 @@ ASGI config for covid19 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served over ASGI, the aggregate APIs (api/covid19-data/ and api/covid19-country-data/)
+run as async views: they read the rollups with the async ORM and stream their JSON
+from an async iterator, so one process keeps serving other requests while slow
+chart queries wait on the database, instead of holding a worker thread each. The
+middleware is async-capable, so requests stay on the event loop. The other views
+are synchronous and Django runs them on a thread, as under WSGI.
+
+This only pays off when each query waits on the database for roughly 20 ms or more,
+e.g. a database across the network or under load. Django's async ORM still runs every
+query on a thread, so with a fast local database the event loop only adds overhead:
+``load_test`` measured ASGI at about 0.7x the throughput of threaded WSGI with no added
+latency and with 5 ms per query, 1.1x at 20 ms and 2.8x at 50 ms. Keep serving over
+WSGI unless the database latency of the deployment is in that range.
+
+To deploy in this mode, run an ASGI server instead of a WSGI one, e.g.:
+
+    pip install uvicorn
+    uvicorn covid19.asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+or with gunicorn managing uvicorn workers:
+
+    gunicorn covid19.asgi:application -k uvicorn.workers.UvicornWorker --workers 2
+
+Set DATABASE_CONN_MAX_AGE=0 in this mode: Django does not reuse persistent
+connections across async requests, so pool them in front of the database
+(e.g. with PgBouncer, see settings.DATABASES) instead. To check whether a deployment
+gains, run ``python manage.py load_test --query-delay <ms>`` with the measured latency
+of its queries; it compares the throughput and latency of both modes under concurrent
+chart requests.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -51,7 +51,8 @@ PROJECT_APPS = [
 INSTALLED_APPS = DEFAULT_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 MIDDLEWARE = [
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app.middleware.StaticFilesMiddleware',  # WhiteNoise static files, in sync or async mode
+    'app.middleware.MetricsMiddleware',  # Request latency, query and response size metrics
     'django.middleware.security.SecurityMiddleware',  # Security middleware
     'django.contrib.sessions.middleware.SessionMiddleware',  # Session middleware
     'django.middleware.common.CommonMiddleware',  # Common middleware
@@ -83,10 +84,55 @@ WSGI_APPLICATION = 'covid19.wsgi.application'
 
 # Database configuration
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
-DATABASES = {
+# Selected with environment variables: DATABASE_ENGINE is sqlite (default) or postgresql
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',  # Database engine
+            'NAME': os.environ.get('DATABASE_NAME', 'covid19'),  # Database name
+            'USER': os.environ.get('DATABASE_USER', ''),  # Database user
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),  # Database password
+            'HOST': os.environ.get('DATABASE_HOST', ''),  # Host, or a PgBouncer in front of it for pooling
+            'PORT': os.environ.get('DATABASE_PORT', ''),  # Port
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),  # Seconds a connection is reused
+            'CONN_HEALTH_CHECKS': True,  # Check reused connections before handling a request
+            # Required behind a transaction-mode pooler such as PgBouncer
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DATABASE_POOLER', '') == 'transaction',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',  # Database engine
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),  # Database name and location
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),  # Seconds a connection is reused
+            'CONN_HEALTH_CHECKS': True,  # Check reused connections before handling a request
+            'OPTIONS': {
+                'timeout': 20,  # Seconds a connection waits for a lock before raising "database is locked"
+            },
+        }
+    }
+
+# PRAGMAs run on every new SQLite connection (see app/db.py).
+# WAL lets readers proceed while ingestion writes, and NORMAL sync is safe in WAL mode.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # Milliseconds, matching the connection timeout
+    'cache_size': -64000,  # 64 MB page cache per connection
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 2 ** 20,
+}
+
+# Cache configuration
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Cached API responses are keyed by the DataVersion of their dataset, so a per-process cache stays consistent
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',  # Database engine
-        'NAME': BASE_DIR / 'db.sqlite3',  # Database name and location
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # Cache backend
+        'LOCATION': 'covid19-api',  # Cache name
+        'TIMEOUT': 3600,  # Seconds before an entry expires
     }
 }
 
@@ -132,6 +178,27 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10  # Default page size for paginated responses
 }
 
+# Data ingestion settings
+INGEST_BATCH_SIZE = 5000  # Number of rows written per bulk_create batch and transaction
+INGEST_DATES_PER_BLOCK = 60  # Date columns of a wide time series file read and merged at a time
+INGEST_ROWS_PER_CHUNK = 10000  # Rows of a wide time series file read at a time
+INGEST_PARALLEL_CHUNK_BYTES = 4 * 2 ** 20  # Largest byte range of a CSV file parsed by one worker process
+
+# Background file processing
+FILE_JOBS_RUN_IN_PROCESS = True  # Drain the queue on a web-process thread; set False when running run_file_jobs
+FILE_JOBS_WORKERS = 1  # Worker threads per process (keep at 1 on SQLite, which allows a single writer)
+FILE_JOBS_STALE_AFTER = 600  # Seconds without progress after which a Processing job is taken as abandoned and queued again
+# Drain the queue left by a previous process when the apps load; set FILE_JOBS_RESUME_ON_START=1 in one web process only
+FILE_JOBS_RESUME_ON_START = os.environ.get('FILE_JOBS_RESUME_ON_START', '') == '1'
+UPLOAD_MAX_PART_SIZE = 100 * 2 ** 20  # Largest part of a chunked upload, in bytes
+
+# Columnar analytical store (see app/columnar.py)
+# Directory of the memory-mapped arrays rebuilt after ingestion; unset disables the store
+COLUMNAR_STORE_DIR = os.environ.get('COLUMNAR_STORE_DIR') or None
+
+# Request metrics
+METRICS_REPEATED_QUERY_COUNT = 10  # Runs of the same SQL in one request logged as a likely N+1 pattern
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -148,5 +215,10 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'app': {
+            'handlers': ['file'],
+            'level': 'INFO',  # Structured request and ingestion events from app.metrics
+            'propagate': True,
+        },
     },
 }